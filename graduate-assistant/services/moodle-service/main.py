@@ -5,26 +5,225 @@ This service provides REST API endpoints for interacting with Moodle platform.
 It uses Selenium for web scraping to fetch course and assignment data.
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
+from functools import partial
 import uvicorn
+from datetime import datetime
 import os
 from dotenv import load_dotenv
-from scraper.adapter import MoodleService
+from scraper.adapter import ENGINES, MoodleService
+from scraper.browser_profile import validate_profile
+from scraper.budget import BrowserBudget
+from scraper.cache import CacheEntry, ResultCache
+from scraper.cursors import SyncCursorStore
+from scraper.downloads import ResourceDownloader
+from scraper.fingerprint import reconcile
+from scraper.driver_pool import DriverPool
+from scraper.encoding import CompressionMiddleware, FastJSONResponse, available_encodings, negotiated_response
+from scraper.executor import ExecutorBusyError, ScrapeExecutor
+from scraper.jobs import JobStore
+from scraper.metrics import render_metrics
+from scraper.scheduler import AccountSync, SyncScheduler
+from scraper.streaming import encode_ndjson, encode_sse, stream_in_executor
+from scraper.http_scraper import create_http_client
+from scraper.moodle_scraper import launch_driver
+from scraper.session_store import SessionStore
+from scraper.singleflight import SingleFlight
+from scraper.snapshots import Snapshot, SnapshotStore
+from scraper.waits import parse_wait_timeouts
 
 # Load environment variables
 load_dotenv()
 
+HEADLESS = os.getenv("HEADLESS", "true").lower() == "true"
+
+# Default scraping engine: "selenium" (browser for every page) or "http" (browser for SSO only)
+SCRAPER_ENGINE = os.getenv("SCRAPER_ENGINE", "selenium")
+
+# Browser profiles: "lean" blocks images, fonts, stylesheets and third-party hosts
+# per page; "full" loads everything (used for the SSO login). Browsers load pages
+# eagerly only when both profiles are "lean"
+BROWSER_PROFILE = validate_profile(os.getenv("BROWSER_PROFILE", "lean"))
+LOGIN_BROWSER_PROFILE = validate_profile(os.getenv("LOGIN_BROWSER_PROFILE", "full"))
+
+# Upper bounds of the browser's condition waits, e.g. "course_page=8,login_done=30"
+WAIT_TIMEOUTS = parse_wait_timeouts(os.getenv("WAIT_TIMEOUTS", ""))
+
+# Fill in assignment due dates and submission status from Moodle's aggregated views
+ENRICH_ASSIGNMENTS = os.getenv("ENRICH_ASSIGNMENTS", "true").lower() == "true"
+
+# Course pages scraped in parallel per sync (browser engine is also capped by DRIVER_POOL_SIZE)
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", 3))
+
+# Web services token of the MOODLE_USERNAME account; selects the webservice engine when set
+MOODLE_WS_TOKEN = os.getenv("MOODLE_WS_TOKEN")
+
+# Calendar export URL (with authtoken) of the MOODLE_USERNAME account; its deadlines are merged into /assignments
+MOODLE_ICAL_URL = os.getenv("MOODLE_ICAL_URL")
+
+def is_env_account(base_url: str, username: str) -> bool:
+    """Whether this is the account configured in the environment"""
+    env_base_url = (os.getenv("MOODLE_BASE_URL") or "").rstrip("/")
+    return base_url.rstrip("/") == env_base_url and username == os.getenv("MOODLE_USERNAME")
+
+def env_ws_token(base_url: str, username: str) -> Optional[str]:
+    """The configured web services token, if it belongs to this account"""
+    return MOODLE_WS_TOKEN if is_env_account(base_url, username) else None
+
+def env_ical_url(base_url: str, username: str) -> Optional[str]:
+    """The configured calendar export URL, if it belongs to this account"""
+    return MOODLE_ICAL_URL if is_env_account(base_url, username) else None
+
+# Shared WebDriver pool (created at startup, disabled with DRIVER_POOL_SIZE=0)
+driver_pool: Optional[DriverPool] = None
+
+# Thread pool that runs blocking scrapes off the event loop
+scrape_executor = ScrapeExecutor(
+    max_workers=int(os.getenv("SCRAPE_WORKERS", 4)),
+    max_queue=int(os.getenv("SCRAPE_QUEUE_SIZE", 16))
+)
+
+# Background sync jobs, kept for JOB_TTL_SECONDS after they finish
+job_store = JobStore(ttl_seconds=int(os.getenv("JOB_TTL_SECONDS", 3600)))
+
+# Multi-account syncs: SCHEDULER_CONCURRENCY accounts at a time, each as a job in job_store
+sync_scheduler = SyncScheduler(
+    job_store,
+    max_accounts=int(os.getenv("SCHEDULER_CONCURRENCY", 4)),
+    window_seconds=int(os.getenv("SCHEDULER_WINDOW_SECONDS", 600))
+)
+
+# Round-robin share of the pool's browsers between accounts (created with the pool)
+browser_budget: Optional[BrowserBudget] = None
+
+# SQLite file holding the latest sync per account; the GET endpoints read from it
+# (SNAPSHOT_DB= disables it, opened at startup)
+SNAPSHOT_DB = os.getenv("SNAPSHOT_DB", "moodle_snapshots.db")
+
+# Snapshots older than this are still served, and refreshed by a background sync
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", 3600))
+
+# An account's background refresh is queued at most once per this many seconds
+SNAPSHOT_REFRESH_INTERVAL_SECONDS = int(os.getenv("SNAPSHOT_REFRESH_INTERVAL_SECONDS", 300))
+
+snapshot_store: Optional[SnapshotStore] = None
+
+# Content-addressed store of downloaded resource files (DOWNLOAD_DIR= disables downloads)
+DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "moodle_resources")
+
+# Files fetched at a time across all accounts, and their combined rate cap (0 = no cap)
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", 4))
+DOWNLOAD_MAX_BYTES_PER_SECOND = int(os.getenv("DOWNLOAD_MAX_BYTES_PER_SECOND", 0))
+
+resource_downloader: Optional[ResourceDownloader] = None
+
+# Keep-alive HTTP client shared by the http scraping engine
+http_client = None
+
+# Authenticated Moodle cookies, reused across requests for the same account
+session_store = SessionStore(ttl_seconds=int(os.getenv("SESSION_TTL_SECONDS", 4 * 3600)))
+
+def create_result_cache() -> Optional[ResultCache]:
+    """Build the GET result cache from environment settings (CACHE_MAX_MB=0 disables it)"""
+    max_mb = int(os.getenv("CACHE_MAX_MB", 64))
+    if max_mb <= 0:
+        return None
+
+    return ResultCache(
+        ttls={
+            "courses": int(os.getenv("CACHE_TTL_COURSES", 3600)),
+            "course_detail": int(os.getenv("CACHE_TTL_COURSE_DETAIL", 3600)),
+            "assignments": int(os.getenv("CACHE_TTL_ASSIGNMENTS", 600)),
+            "sync": int(os.getenv("CACHE_TTL_SYNC", 600)),
+        },
+        max_bytes=max_mb * 1024 * 1024
+    )
+
+# Recent GET results per (base_url, username, resource)
+result_cache = create_result_cache()
+
+# Scrapes running per account; concurrent requests needing the same scrape wait for it
+scrape_flights = SingleFlight()
+
+# Fingerprint snapshots behind sync cursors, for incremental syncs (?since=<cursor>)
+cursor_store = SyncCursorStore(ttl_seconds=int(os.getenv("SYNC_CURSOR_TTL_SECONDS", 7 * 86400)))
+
+def create_driver_pool() -> Optional[DriverPool]:
+    """Build the WebDriver pool from environment settings"""
+    max_size = int(os.getenv("DRIVER_POOL_SIZE", 2))
+    if max_size <= 0:
+        return None
+
+    max_rss_mb = int(os.getenv("DRIVER_MAX_RSS_MB", 1024))
+    return DriverPool(
+        driver_factory=partial(launch_driver, HEADLESS, BROWSER_PROFILE, LOGIN_BROWSER_PROFILE),
+        max_size=max_size,
+        min_size=int(os.getenv("DRIVER_POOL_MIN", 1)),
+        max_pages=int(os.getenv("DRIVER_MAX_PAGES", 50)),
+        max_rss_mb=max_rss_mb if max_rss_mb > 0 else None,
+        acquire_timeout=float(os.getenv("DRIVER_ACQUIRE_TIMEOUT", 60)),
+        profile=BROWSER_PROFILE,
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up shared resources on startup and release them on shutdown"""
+    global driver_pool, http_client, browser_budget, snapshot_store, resource_downloader
+    http_client = create_http_client()
+    if SNAPSHOT_DB:
+        snapshot_store = SnapshotStore(SNAPSHOT_DB)
+    if DOWNLOAD_DIR:
+        resource_downloader = ResourceDownloader(
+            DOWNLOAD_DIR,
+            http_client,
+            concurrency=DOWNLOAD_CONCURRENCY,
+            max_bytes_per_second=DOWNLOAD_MAX_BYTES_PER_SECOND,
+            chunk_size=int(os.getenv("DOWNLOAD_CHUNK_BYTES", 256 * 1024))
+        )
+    driver_pool = create_driver_pool()
+    if driver_pool:
+        # An account gives its browser back after BROWSER_QUANTUM_PAGES pages when others wait
+        browser_budget = BrowserBudget(
+            driver_pool.max_size,
+            quantum=int(os.getenv("BROWSER_QUANTUM_PAGES", 10))
+        )
+        try:
+            driver_pool.start()
+        except Exception as e:
+            # Drivers are launched lazily on first checkout instead
+            print(f"WebDriver pool warm-up failed: {e}")
+
+    yield
+
+    sync_scheduler.shutdown()
+    scrape_executor.shutdown()
+    if resource_downloader:
+        resource_downloader.shutdown()
+    if driver_pool:
+        driver_pool.shutdown()
+    http_client.close()
+    if snapshot_store:
+        snapshot_store.close()
+
 # Create FastAPI app
 app = FastAPI(
     title="Moodle Integration Service",
     description="REST API for Moodle course and assignment data extraction",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Compress bodies of at least COMPRESS_MIN_BYTES with brotli or gzip (0 disables)
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+if COMPRESS_MIN_BYTES > 0:
+    app.add_middleware(CompressionMiddleware, min_bytes=COMPRESS_MIN_BYTES)
+
 # Configure CORS
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
 app.add_middleware(
@@ -44,6 +243,189 @@ def verify_api_key(x_api_key: str = Header(...)):
         raise HTTPException(status_code=403, detail="Invalid API Key")
     return x_api_key
 
+def create_service(
+    base_url: str,
+    username: str,
+    password: str,
+    engine: Optional[str] = None,
+    ws_token: Optional[str] = None
+) -> MoodleService:
+    """Create a MoodleService bound to the shared WebDriver pool and HTTP client"""
+    ws_token = ws_token or env_ws_token(base_url, username)
+    if not engine:
+        # A configured web services token wins over DOM scraping
+        engine = "webservice" if ws_token else SCRAPER_ENGINE
+    if engine not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"engine must be one of: {', '.join(ENGINES)}")
+    if engine == "webservice" and not ws_token:
+        raise HTTPException(status_code=400, detail="The webservice engine requires a web services token")
+
+    return MoodleService(
+        base_url=base_url,
+        username=username,
+        password=password,
+        headless=HEADLESS,
+        pool=driver_pool,
+        session_store=session_store,
+        engine=engine,
+        http_client=http_client,
+        ws_token=ws_token,
+        concurrency=SCRAPE_CONCURRENCY,
+        cache=result_cache,
+        cursor_store=cursor_store,
+        profile=BROWSER_PROFILE,
+        login_profile=LOGIN_BROWSER_PROFILE,
+        wait_timeouts=WAIT_TIMEOUTS,
+        enrich_assignments=ENRICH_ASSIGNMENTS,
+        ical_url=env_ical_url(base_url, username),
+        budget=browser_budget,
+        snapshot_store=snapshot_store,
+        flights=scrape_flights
+    )
+
+def session_service(session_id: str, engine: Optional[str] = None) -> MoodleService:
+    """Create a MoodleService for the account behind a login session handle"""
+    session = session_store.get_by_handle(session_id)
+    if not session:
+        raise HTTPException(status_code=401, detail="Moodle session expired or unknown, please log in again")
+
+    # No password: the stored cookies are used and re-login is not possible
+    return create_service(session.base_url, session.username, "", engine)
+
+def env_service(x_moodle_session: Optional[str] = None, engine: Optional[str] = None) -> MoodleService:
+    """
+    Create a MoodleService for the caller
+
+    Uses the account behind the X-Moodle-Session handle when given,
+    otherwise the credentials configured in the environment.
+    """
+    if x_moodle_session:
+        return session_service(x_moodle_session, engine)
+
+    base_url = os.getenv("MOODLE_BASE_URL")
+    username = os.getenv("MOODLE_USERNAME")
+    password = os.getenv("MOODLE_PASSWORD")
+
+    if not all([base_url, username, password]):
+        raise HTTPException(
+            status_code=500,
+            detail="Moodle credentials not configured in environment"
+        )
+
+    return create_service(base_url, username, password, engine)
+
+def request_service(request: "SyncRequest") -> MoodleService:
+    """Create a MoodleService from a session handle or credentials in the request body"""
+    if request.session_id:
+        return session_service(request.session_id, request.engine)
+
+    base_url = request.base_url or os.getenv("MOODLE_BASE_URL")
+    if not base_url:
+        raise HTTPException(status_code=400, detail="Moodle base URL is required")
+    if not request.username or not (request.password or request.ws_token):
+        raise HTTPException(status_code=400, detail="username and password (or ws_token), or session_id, are required")
+    if not request.password and request.engine not in (None, "webservice"):
+        # Without a password the stored cookies of this username would be used unchecked
+        raise HTTPException(status_code=400, detail=f"The {request.engine} engine requires a password or session_id")
+
+    return create_service(base_url, request.username, request.password, request.engine, request.ws_token)
+
+def scheduled_account(request: "SyncRequest") -> AccountSync:
+    """Account sync for the scheduler, from a session handle or credentials"""
+    service = request_service(request)
+    return AccountSync(service.account, service.username, service.sync_all)
+
+async def run_scrape(fn, *args, **kwargs):
+    """Run a blocking MoodleService call on the scrape executor, answering 503 when saturated"""
+    try:
+        return await scrape_executor.run(fn, *args, **kwargs)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+def cached_response(request: Request, entry) -> Response:
+    """JSON response for a cache entry, or 304 when the client's copy is current"""
+    headers = entry.headers()
+    if entry.not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def serialize(model, value):
+    """Validate a result against its response model and dump it as JSON-ready data"""
+    adapter = TypeAdapter(model)
+    return adapter.dump_python(adapter.validate_python(value), mode="json")
+
+def parse_due_before(due_before: Optional[str]) -> Optional[str]:
+    """Normalize the due_before filter to the ISO form due dates are stored in"""
+    if not due_before:
+        return None
+    try:
+        return datetime.fromisoformat(due_before).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="due_before must be an ISO date or datetime")
+
+async def load_snapshot(service: MoodleService, fresh: bool, wait: bool = True) -> Optional[Snapshot]:
+    """
+    The account's stored snapshot, for answering a GET without scraping
+
+    The first read of an account (no snapshot yet) scrapes it into the store
+    and answers from there, joining a full scrape of the account that is
+    already running, so it never scrapes live next to a background sync.
+    A snapshot older than SNAPSHOT_MAX_AGE_SECONDS is refreshed by a
+    background sync on the scheduler and served as it is meanwhile. At most
+    one refresh per account is queued or running, and a new one is queued at
+    most once per SNAPSHOT_REFRESH_INTERVAL_SECONDS, so reads never turn into
+    a sync each.
+
+    Args:
+        service: Account to read
+        fresh: fresh=1 was asked for; the caller scrapes live
+        wait: Whether the first read waits for its scrape; otherwise it only
+            queues a background sync and gets None
+
+    Returns:
+        Snapshot, or None when the store is disabled, fresh=1 was asked for
+        or the account still has no snapshot (the caller then scrapes live)
+
+    Raises:
+        ScrapeError: The first read's login failed
+    """
+    if not snapshot_store or fresh:
+        return None
+
+    snapshot = snapshot_store.snapshot(*service.account)
+    if snapshot is None and wait:
+        await run_scrape(service.refresh_snapshot)
+        return snapshot_store.snapshot(*service.account)
+    if snapshot is None or snapshot.age_seconds > SNAPSHOT_MAX_AGE_SECONDS:
+        sync_scheduler.refresh(
+            AccountSync(service.account, service.username, service.sync_all),
+            min_interval=SNAPSHOT_REFRESH_INTERVAL_SECONDS
+        )
+    return snapshot
+
+def snapshot_response(request: Request, snapshot: Snapshot, value) -> Response:
+    """JSON response for data read from the snapshot store, revalidated against its sync time"""
+    return cached_response(request, CacheEntry(value, last_modified=snapshot.last_modified))
+
+async def load_cached(service: MoodleService, resource: str, model, fresh: bool, fn, *args):
+    """
+    Return the cached entry for a resource, scraping it on a miss
+
+    The result is serialized through the response model before it is cached,
+    so cache hits produce exactly the body a live scrape would.
+
+    Returns:
+        Cache entry, or None when the scrape found nothing
+    """
+    entry = None if fresh else service.cached(resource)
+    if entry is not None:
+        return entry
+
+    value = await run_scrape(fn, *args)
+    if value is None:
+        return None
+    return service.remember(resource, serialize(model, value))
+
 # Request/Response Models
 class LoginRequest(BaseModel):
     username: str = Field(..., description="Moodle username/student ID")
@@ -54,6 +436,7 @@ class LoginResponse(BaseModel):
     success: bool
     message: str
     session_id: Optional[str] = None
+    expires_at: Optional[str] = None
 
 class Course(BaseModel):
     id: str
@@ -81,23 +464,173 @@ class Assignment(BaseModel):
     status: Optional[str] = None
     url: str
 
+class Activity(BaseModel):
+    course_id: str
+    course_name: str
+    section_name: str
+    type: str
+    name: str
+    url: str
+    description: Optional[str] = None
+
 class SyncRequest(BaseModel):
-    username: str
-    password: str
+    username: Optional[str] = None
+    password: Optional[str] = None
     base_url: Optional[str] = None
+    session_id: Optional[str] = Field(None, description="Session handle from /api/moodle/login, instead of credentials")
+    engine: Optional[str] = Field(None, description="Scraping engine: selenium, http or webservice")
+    ws_token: Optional[str] = Field(None, description="Moodle web services token (selects the webservice engine)")
 
 class SyncResponse(BaseModel):
     success: bool
     message: str
     courses_count: int
     assignments_count: int
+    cursor: Optional[str] = Field(None, description="Pass as ?since= on the next sync to receive only changes")
+    incremental: bool = Field(False, description="True when data holds changes since the given cursor")
+    timings: Optional[Dict[str, Dict[str, Any]]] = Field(None, description="Count, total/max seconds and failures per scrape phase")
+    data: Dict[str, Any]
+
+class ReconcileRequest(SyncRequest):
+    known_courses: Dict[str, str] = Field(default_factory=dict, description="Course moodleId -> hash the caller has stored")
+    known_assignments: Dict[str, str] = Field(default_factory=dict, description="Assignment moodleId -> hash the caller has stored")
+
+class ReconciledEntity(BaseModel):
+    id: str
+    hash: str
     data: Dict[str, Any]
 
+class ReconcileResponse(BaseModel):
+    success: bool
+    message: str
+    courses: List[ReconciledEntity] = []
+    assignments: List[ReconciledEntity] = []
+    deleted_courses: List[str] = []
+    deleted_assignments: List[str] = []
+    unchanged_courses: int = 0
+    unchanged_assignments: int = 0
+    synced_at: Optional[str] = None
+
+class SyncJobSubmitted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    result_url: str
+
+class SyncJobStatus(BaseModel):
+    job_id: str
+    status: str
+    phase: str
+    courses_done: int
+    courses_total: int
+    elapsed_seconds: float
+    created_at: str
+    error: Optional[str] = None
+
+class ResourceDownloadRequest(SyncRequest):
+    course_id: Optional[str] = Field(None, description="Only download this course's resources")
+    force: bool = Field(False, description="Download again files already stored for their URL")
+
+class DownloadedFile(BaseModel):
+    url: str
+    name: str
+    course_id: str
+    course_name: str
+    status: str = Field(..., description="downloaded, deduplicated, cached or failed")
+    sha256: Optional[str] = None
+    size: int
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+    resumed: bool = Field(False, description="True when an interrupted download was continued")
+    error: Optional[str] = None
+
+class ResourceDownloadResponse(BaseModel):
+    success: bool
+    message: str
+    downloaded: int
+    deduplicated: int
+    cached: int
+    failed: int
+    bytes: int
+    elapsed_seconds: float
+    files: List[DownloadedFile]
+
+class StoredFile(BaseModel):
+    url: str
+    sha256: str
+    size: int
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+    course_id: Optional[str] = None
+    course_name: Optional[str] = None
+    name: Optional[str] = None
+    downloaded_at: str
+
+class SchedulerBatchRequest(BaseModel):
+    accounts: List[SyncRequest] = Field(..., description="Accounts to sync, as credentials or session handles")
+
+class ScheduleRequest(SchedulerBatchRequest):
+    interval_seconds: float = Field(..., ge=60, description="Period between two syncs of the same account")
+    jitter_seconds: float = Field(0, ge=0, description="Spread each period's runs over this many seconds")
+
+class ScheduledJobStatus(SyncJobStatus):
+    username: str
+
+class SchedulerBatchStatus(BaseModel):
+    batch_id: str
+    created_at: str
+    accounts: int
+    queued: int
+    running: int
+    succeeded: int
+    failed: int
+    finished: bool
+    elapsed_seconds: float
+    accounts_per_minute: float
+    jobs: List[ScheduledJobStatus]
+
+class ScheduleStatus(BaseModel):
+    schedule_id: str
+    interval_seconds: float
+    jitter_seconds: float
+    accounts: int
+    started_at: str
+    cancelled: bool
+    runs: int
+    skipped: int
+    next_runs: Dict[str, str]
+    jobs: List[ScheduledJobStatus]
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "moodle-integration-service"}
+    return {
+        "status": "healthy",
+        "service": "moodle-integration-service",
+        "driver_pool": driver_pool.stats() if driver_pool else None,
+        "executor": scrape_executor.stats(),
+        "cache": result_cache.stats() if result_cache else None,
+        "snapshots": snapshot_store.stats() if snapshot_store else None,
+        "browser_budget": browser_budget.stats() if browser_budget else None,
+        "scheduler": sync_scheduler.stats(),
+        "single_flight": scrape_flights.stats(),
+        "downloads": resource_downloader.stats() if resource_downloader else None,
+        "encodings": dict(zip(("formats", "compression"), available_encodings()))
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: scrape phase durations and failures, pool, cache and executor usage"""
+    body = render_metrics(
+        pool_stats=driver_pool.stats() if driver_pool else None,
+        cache_stats=result_cache.stats() if result_cache else None,
+        executor_stats=scrape_executor.stats(),
+        budget_stats=browser_budget.stats() if browser_budget else None,
+        scheduler_stats=sync_scheduler.stats(),
+        flight_stats=scrape_flights.stats()
+    )
+    return Response(content=body, media_type="text/plain; version=0.0.4")
 
 # Root endpoint
 @app.get("/")
@@ -107,7 +640,8 @@ async def root():
         "service": "Moodle Integration Service",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "metrics": "/metrics"
     }
 
 # Moodle API Endpoints
@@ -119,93 +653,103 @@ async def login(
     """
     Login to Moodle and create a session
 
-    This endpoint authenticates with Moodle using the provided credentials.
+    This endpoint always authenticates with Moodle using the provided
+    credentials, even when cookies are stored for the account. The returned
+    session_id can be sent as the X-Moodle-Session header (GET endpoints) or
+    as session_id in the sync body to reuse the login. Each login issues a
+    new session_id and the account's previous one stops working.
     """
     try:
         base_url = request.base_url or os.getenv("MOODLE_BASE_URL")
         if not base_url:
             raise HTTPException(status_code=400, detail="Moodle base URL is required")
 
-        service = MoodleService(
-            base_url=base_url,
-            username=request.username,
-            password=request.password,
-            headless=True
-        )
+        service = create_service(base_url, request.username, request.password)
 
-        result = service.login()
+        result = await run_scrape(service.login)
         return LoginResponse(**result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
 @app.get("/api/moodle/courses", response_model=List[Course])
 async def get_courses(
+    request: Request,
+    engine: Optional[str] = None,
+    fresh: bool = False,
+    x_moodle_session: Optional[str] = Header(None),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Get list of all enrolled courses
 
     Returns a list of courses the authenticated user is enrolled in.
-    Uses credentials from environment variables.
+    Uses the X-Moodle-Session account if given, otherwise credentials
+    from environment variables. Served from the snapshot of the last sync;
+    fresh=1 scrapes live instead (results of live scrapes are cached).
     """
     try:
-        base_url = os.getenv("MOODLE_BASE_URL")
-        username = os.getenv("MOODLE_USERNAME")
-        password = os.getenv("MOODLE_PASSWORD")
-
-        if not all([base_url, username, password]):
-            raise HTTPException(
-                status_code=500,
-                detail="Moodle credentials not configured in environment"
-            )
+        service = env_service(x_moodle_session, engine)
 
-        service = MoodleService(
-            base_url=base_url,
-            username=username,
-            password=password,
-            headless=True
-        )
+        snapshot = await load_snapshot(service, fresh)
+        if snapshot:
+            return snapshot_response(request, snapshot, serialize(List[Course], snapshot_store.courses(*service.account)))
 
-        courses = service.get_courses()
-        return courses
+        entry = await load_cached(service, "courses", List[Course], fresh, service.get_courses)
+        if entry is None:
+            raise HTTPException(status_code=500, detail="Failed to fetch courses: the scrape failed")
+        return cached_response(request, entry)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch courses: {str(e)}")
 
 @app.get("/api/moodle/courses/{course_id}", response_model=CourseDetail)
 async def get_course_detail(
+    request: Request,
     course_id: str,
+    type: Optional[str] = None,
+    engine: Optional[str] = None,
+    fresh: bool = False,
+    x_moodle_session: Optional[str] = Header(None),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Get detailed information about a specific course
 
-    Returns course details including all course contents and activities.
-    Uses credentials from environment variables.
+    Returns course details including all course contents and activities;
+    type=<activity type> keeps only activities of that type.
+    Uses the X-Moodle-Session account if given, otherwise credentials
+    from environment variables. Served from the snapshot of the last sync;
+    fresh=1 scrapes live instead (results of live scrapes are cached).
     """
     try:
-        base_url = os.getenv("MOODLE_BASE_URL")
-        username = os.getenv("MOODLE_USERNAME")
-        password = os.getenv("MOODLE_PASSWORD")
-
-        if not all([base_url, username, password]):
-            raise HTTPException(
-                status_code=500,
-                detail="Moodle credentials not configured in environment"
-            )
+        service = env_service(x_moodle_session, engine)
 
-        service = MoodleService(
-            base_url=base_url,
-            username=username,
-            password=password,
-            headless=True
-        )
+        snapshot = await load_snapshot(service, fresh)
+        if snapshot:
+            course = snapshot_store.course_detail(*service.account, course_id, type)
+            if not course:
+                raise HTTPException(status_code=404, detail="Course not found")
+            return snapshot_response(request, snapshot, serialize(CourseDetail, course))
 
-        course = service.get_course_detail(course_id)
+        entry = await load_cached(
+            service, f"course_detail:{course_id}", CourseDetail, fresh, service.get_course_detail, course_id
+        )
 
-        if not course:
+        if not entry:
             raise HTTPException(status_code=404, detail="Course not found")
+        if type:
+            entry = entry.derive({
+                **entry.value,
+                "contents": [
+                    {**section, "activities": [a for a in section["activities"] if a.get("type") == type]}
+                    for section in entry.value["contents"]
+                ]
+            })
 
-        return course
+        return cached_response(request, entry)
     except HTTPException:
         raise
     except Exception as e:
@@ -213,41 +757,103 @@ async def get_course_detail(
 
 @app.get("/api/moodle/assignments", response_model=List[Assignment])
 async def get_assignments(
+    request: Request,
     course_id: Optional[str] = None,
+    due_before: Optional[str] = None,
+    engine: Optional[str] = None,
+    source: str = "scrape",
+    fresh: bool = False,
+    x_moodle_session: Optional[str] = Header(None),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Get list of assignments
 
-    Optionally filter by course_id.
-    Uses credentials from environment variables.
+    Optionally filter by course_id, and by due_before=<ISO date or datetime>
+    (assignments without a due date are then left out, the rest come in due order).
+    Uses the X-Moodle-Session account if given, otherwise credentials
+    from environment variables. Served from the snapshot of the last sync;
+    fresh=1 scrapes live instead (results of live scrapes are cached).
+    When a calendar export URL is configured, its deadlines are merged into
+    the scraped assignments, live or in the snapshot; source=ical answers from
+    the calendar export alone.
     """
+    if source not in ("scrape", "ical"):
+        raise HTTPException(status_code=400, detail="source must be scrape or ical")
+    due_before = parse_due_before(due_before)
+
     try:
-        base_url = os.getenv("MOODLE_BASE_URL")
-        username = os.getenv("MOODLE_USERNAME")
-        password = os.getenv("MOODLE_PASSWORD")
-
-        if not all([base_url, username, password]):
-            raise HTTPException(
-                status_code=500,
-                detail="Moodle credentials not configured in environment"
-            )
+        service = env_service(x_moodle_session, engine)
 
-        service = MoodleService(
-            base_url=base_url,
-            username=username,
-            password=password,
-            headless=True
-        )
+        snapshot = await load_snapshot(service, fresh) if source == "scrape" else None
+        if snapshot:
+            assignments = snapshot_store.assignments(*service.account, course_id, due_before)
+            return snapshot_response(request, snapshot, serialize(List[Assignment], assignments))
 
-        assignments = service.get_assignments(course_id=course_id)
-        return assignments
+        if source == "ical":
+            if not service.ical_url:
+                raise HTTPException(status_code=400, detail="No calendar export URL configured for this account")
+            entry = await load_cached(service, "assignments:ical", List[Assignment], fresh, service.get_ical_assignments)
+        else:
+            # Every assignment is scraped either way, so filtered lists are cut from the full one
+            entry = await load_cached(service, "assignments", List[Assignment], fresh, service.get_assignments)
+        if entry is None:
+            raise HTTPException(status_code=500, detail="Failed to fetch assignments: the scrape failed")
+        if course_id:
+            entry = entry.derive([a for a in entry.value if a["course_id"] == course_id])
+        if due_before:
+            entry = entry.derive(sorted(
+                (a for a in entry.value if a["due_date"] and a["due_date"] < due_before),
+                key=lambda a: a["due_date"]
+            ))
+
+        return cached_response(request, entry)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch assignments: {str(e)}")
 
+@app.get("/api/moodle/activities", response_model=List[Activity])
+async def get_activities(
+    request: Request,
+    type: Optional[str] = None,
+    course_id: Optional[str] = None,
+    x_moodle_session: Optional[str] = Header(None),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    List activities across all courses from the snapshot of the last sync
+
+    Filter by type (e.g. assignment, resource, forum) and course_id. Needs the
+    snapshot store (SNAPSHOT_DB). The first read of an account starts a
+    background sync and answers 202 until its snapshot exists.
+    """
+    if not snapshot_store:
+        raise HTTPException(status_code=400, detail="Activities are served from the snapshot store, which is disabled")
+
+    try:
+        service = env_service(x_moodle_session)
+
+        snapshot = await load_snapshot(service, fresh=False, wait=False)
+        if not snapshot:
+            return JSONResponse(
+                status_code=202,
+                content={"detail": "This account is being synced for the first time, retry shortly"},
+                headers={"Retry-After": "30"}
+            )
+
+        activities = snapshot_store.activities(*service.account, type, course_id)
+        return snapshot_response(request, snapshot, serialize(List[Activity], activities))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch activities: {str(e)}")
+
 @app.post("/api/moodle/sync", response_model=SyncResponse)
 async def sync_moodle_data(
     request: SyncRequest,
+    since: Optional[str] = None,
+    accept: Optional[str] = Header(None),
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -256,30 +862,332 @@ async def sync_moodle_data(
     This endpoint scrapes all courses and assignments from Moodle
     and returns the complete dataset. This can take several minutes
     depending on the number of courses.
+
+    The response carries a cursor. With since=<cursor> from an earlier sync,
+    data holds only the added, changed and removed courses, activities and
+    assignments (incremental=true). Unknown or expired cursors get the full
+    dataset (incremental=false).
+
+    Send Accept: application/msgpack to receive MessagePack instead of JSON.
     """
     try:
-        base_url = request.base_url or os.getenv("MOODLE_BASE_URL")
-        if not base_url:
-            raise HTTPException(status_code=400, detail="Moodle base URL is required")
-
-        service = MoodleService(
-            base_url=base_url,
-            username=request.username,
-            password=request.password,
-            headless=True
-        )
+        service = request_service(request)
 
-        result = service.sync_all()
-        return SyncResponse(**result)
+        result = await run_scrape(service.sync_all, since=since)
+        return negotiated_response(accept, SyncResponse(**result).model_dump(mode="json"))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
 
+@app.post("/api/moodle/sync/reconcile", response_model=ReconcileResponse)
+async def reconcile_sync(
+    request: ReconcileRequest,
+    fresh: bool = False,
+    accept: Optional[str] = Header(None),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Return only the entities whose content differs from what the caller has
+
+    The caller posts moodleId -> hash maps of the courses and assignments it
+    has stored. Courses (with their contents) and assignments whose hash
+    differs come back with their new hash; ids Moodle no longer has are listed
+    as deleted. Uses the result of the last sync while it is cached
+    (CACHE_TTL_SYNC); fresh=1 always scrapes. Accepts MessagePack like /sync.
+    """
+    try:
+        service = request_service(request)
+
+        # The cached sync is only for callers whose credentials check out; others scrape (and log in)
+        entry = None if fresh else service.cached("sync")
+        if entry is not None and not await run_scrape(service.verify_credentials):
+            entry = None
+        if entry is not None:
+            data = entry.value
+        else:
+            result = await run_scrape(service.sync_all)
+            if not result["success"]:
+                return ReconcileResponse(success=False, message=result["message"])
+            data = result["data"]
+
+        diff = reconcile(request.known_courses, request.known_assignments, data["courses"], data["assignments"])
+        return negotiated_response(accept, ReconcileResponse(
+            success=True,
+            message="Reconciled against Moodle data",
+            synced_at=data["synced_at"],
+            **diff
+        ).model_dump(mode="json"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reconcile failed: {str(e)}")
+
+@app.post("/api/moodle/sync/stream")
+async def stream_sync(
+    request: SyncRequest,
+    format: str = "ndjson",
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Perform a full sync, streaming records as they are scraped
+
+    Emits one "course" record per course as soon as its page is parsed, then
+    the "assignment" records, then a "summary" trailer. Use format=ndjson
+    (default, one JSON object per line) or format=sse (Server-Sent Events).
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+
+    service = request_service(request)
+    encode, media_type = (encode_sse, "text/event-stream") if format == "sse" else (encode_ndjson, "application/x-ndjson")
+
+    try:
+        body = stream_in_executor(scrape_executor, service.iter_sync, encode)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+    return StreamingResponse(body, media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/moodle/sync/jobs", response_model=SyncJobSubmitted, status_code=202)
+async def submit_sync_job(
+    request: SyncRequest,
+    since: Optional[str] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Start a full sync in the background
+
+    Returns a job id immediately. Poll the status endpoint for progress and
+    fetch the SyncResponse from the result endpoint once the job has finished.
+    Accepts since=<cursor> like /sync.
+    """
+    service = request_service(request)
+    job = job_store.create()
+
+    try:
+        scrape_executor.submit(job.run, partial(service.sync_all, since=since))
+    except ExecutorBusyError as e:
+        job_store.discard(job.id)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+    return SyncJobSubmitted(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/api/moodle/sync/jobs/{job.id}",
+        result_url=f"/api/moodle/sync/jobs/{job.id}/result"
+    )
+
+@app.get("/api/moodle/sync/jobs/{job_id}", response_model=SyncJobStatus)
+async def get_sync_job(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Get progress of a background sync (phase, courses done/total, elapsed time)"""
+    job = job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return SyncJobStatus(**job.to_status())
+
+@app.get("/api/moodle/sync/jobs/{job_id}/result", response_model=SyncResponse)
+async def get_sync_job_result(
+    job_id: str,
+    accept: Optional[str] = Header(None),
+    api_key: str = Depends(verify_api_key)
+):
+    """Get the SyncResponse of a finished background sync (MessagePack with Accept: application/msgpack)"""
+    job = job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if not job.finished:
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}")
+    if job.result is None:
+        raise HTTPException(status_code=500, detail=f"Sync failed: {job.error}")
+    return negotiated_response(accept, SyncResponse(**job.result).model_dump(mode="json"))
+
+def require_downloader() -> ResourceDownloader:
+    if not resource_downloader:
+        raise HTTPException(status_code=400, detail="Resource downloads are disabled (DOWNLOAD_DIR is empty)")
+    return resource_downloader
+
+@app.post("/api/moodle/resources/download", response_model=SyncJobSubmitted, status_code=202)
+async def submit_resource_download(
+    request: ResourceDownloadRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Download the files of all resource activities in the background
+
+    Files are fetched over HTTP with the account's session cookies,
+    DOWNLOAD_CONCURRENCY at a time and within DOWNLOAD_MAX_BYTES_PER_SECOND.
+    Interrupted downloads resume where they stopped on the next run, and a
+    file linked from several courses is stored once. The resource list comes
+    from the snapshot of the last sync when there is one. Needs the selenium
+    or http engine (web services tokens cannot open resource pages).
+
+    Progress is on the sync job status endpoint (courses_done/courses_total
+    count files while downloading).
+    """
+    downloader = require_downloader()
+    service = request_service(request)
+    job = job_store.create()
+
+    try:
+        scrape_executor.submit(
+            job.run, partial(service.download_resources, downloader, request.course_id, force=request.force)
+        )
+    except ExecutorBusyError as e:
+        job_store.discard(job.id)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+    return SyncJobSubmitted(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/api/moodle/sync/jobs/{job.id}",
+        result_url=f"/api/moodle/resources/jobs/{job.id}/result"
+    )
+
+@app.get("/api/moodle/resources/jobs/{job_id}/result", response_model=ResourceDownloadResponse)
+async def get_resource_download_result(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Get the per-file outcome of a finished resource download"""
+    job = job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if not job.finished:
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}")
+    if job.result is None:
+        raise HTTPException(status_code=500, detail=f"Download failed: {job.error}")
+    return ResourceDownloadResponse(**job.result)
+
+@app.get("/api/moodle/resources", response_model=List[StoredFile])
+async def list_resource_files(
+    course_id: Optional[str] = None,
+    x_moodle_session: Optional[str] = Header(None),
+    api_key: str = Depends(verify_api_key)
+):
+    """List the resource files downloaded for the caller's account, optionally of one course"""
+    downloader = require_downloader()
+    service = env_service(x_moodle_session)
+    return downloader.files(service.account, course_id)
+
+@app.get("/api/moodle/resources/files/{sha256}")
+async def get_resource_file(
+    sha256: str,
+    x_moodle_session: Optional[str] = Header(None),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Get a downloaded resource file by its sha256
+
+    Only files the caller's account has downloaded are served, even when
+    another account stored the same content.
+    """
+    downloader = require_downloader()
+    service = env_service(x_moodle_session)
+
+    stored = downloader.file(service.account, sha256=sha256.lower())
+    path = downloader.object_path(sha256.lower()) if stored else None
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(
+        path,
+        media_type=stored["content_type"] or "application/octet-stream",
+        filename=stored["filename"] or sha256
+    )
+
+@app.get("/api/moodle/scheduler")
+async def get_scheduler_stats(api_key: str = Depends(verify_api_key)):
+    """Scheduler queue, outcomes and accounts per minute, and browser budget usage"""
+    return {
+        "scheduler": sync_scheduler.stats(),
+        "browser_budget": browser_budget.stats() if browser_budget else None
+    }
+
+@app.post("/api/moodle/scheduler/batches", response_model=SchedulerBatchStatus, status_code=202)
+async def submit_sync_batch(
+    request: SchedulerBatchRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Sync a batch of accounts in the background
+
+    Each account becomes a sync job (see /sync/jobs/{job_id} for its result).
+    SCHEDULER_CONCURRENCY accounts sync at a time and share the pool's
+    browsers round-robin, so an account with many courses cannot hold them
+    all. An account already queued or running is not synced twice.
+    """
+    if not request.accounts:
+        raise HTTPException(status_code=400, detail="accounts must not be empty")
+
+    batch = sync_scheduler.submit([scheduled_account(account) for account in request.accounts])
+    return SchedulerBatchStatus(**batch.to_status())
+
+@app.get("/api/moodle/scheduler/batches/{batch_id}", response_model=SchedulerBatchStatus)
+async def get_sync_batch(
+    batch_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Get per-account progress and throughput (accounts per minute) of a batch"""
+    batch = sync_scheduler.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found or expired")
+    return SchedulerBatchStatus(**batch.to_status())
+
+@app.post("/api/moodle/scheduler/schedules", response_model=ScheduleStatus, status_code=201)
+async def create_sync_schedule(
+    request: ScheduleRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Sync a set of accounts periodically
+
+    Every account is synced once per interval_seconds, at a random offset
+    within the first jitter_seconds of each period. A run is skipped when the
+    account's previous sync has not finished yet. Schedules live in memory
+    and end with the process.
+    """
+    if not request.accounts:
+        raise HTTPException(status_code=400, detail="accounts must not be empty")
+
+    schedule = sync_scheduler.schedule(
+        [scheduled_account(account) for account in request.accounts],
+        request.interval_seconds,
+        request.jitter_seconds
+    )
+    return ScheduleStatus(**schedule.to_status())
+
+@app.get("/api/moodle/scheduler/schedules/{schedule_id}", response_model=ScheduleStatus)
+async def get_sync_schedule(
+    schedule_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Get runs, skips, next run times and the latest job of every account"""
+    schedule = sync_scheduler.get_schedule(schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return ScheduleStatus(**schedule.to_status())
+
+@app.delete("/api/moodle/scheduler/schedules/{schedule_id}", response_model=ScheduleStatus)
+async def cancel_sync_schedule(
+    schedule_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Stop a schedule (syncs already queued still run)"""
+    schedule = sync_scheduler.cancel(schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return ScheduleStatus(**schedule.to_status())
+
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
@@ -294,10 +1202,15 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8000))
 
+    # APP_ENV=production runs several worker processes without auto-reload.
+    # Each worker has its own WebDriver pool and scrape executor.
+    production = os.getenv("APP_ENV", "development") == "production"
+
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
-        reload=True,
+        reload=not production,
+        workers=int(os.getenv("WORKERS", 2)) if production else None,
         log_level="info"
     )
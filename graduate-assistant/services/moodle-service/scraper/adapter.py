@@ -2,9 +2,39 @@
 Adapter module to convert Moodle scraper output to API response format
 """
 
-from typing import List, Dict, Any, Optional
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from .moodle_scraper import MoodleScraper
+from functools import partial
+import hmac
+import secrets
+import sqlite3
+import time
+import httpx
+
+from .budget import AccountPool, BrowserBudget
+from .cache import CacheEntry, ResultCache
+from .cursors import SyncCursorStore
+from .downloads import ResourceDownloader
+from .driver_pool import DriverPool
+from .fingerprint import build_snapshot, content_hash, diff_snapshots, fingerprint_course
+from .http_scraper import HttpMoodleScraper
+from .ical import fetch_ical_assignments, merge_ical_assignments
+from .moodle_scraper import MoodleScraper, ProgressCallback
+from .session_store import SessionStore
+from .singleflight import SingleFlight
+from .snapshots import SnapshotStore
+from .webservice import WebServiceScraper
+
+# Scraping engines selectable per request
+ENGINES = ("selenium", "http", "webservice")
+
+
+# Keys the credential digests in flight keys; per process, so digests are never comparable elsewhere
+_FLIGHT_SECRET = secrets.token_bytes(32)
+
+
+class ScrapeError(Exception):
+    """A scrape that produced no usable data (e.g. Moodle rejected the login)"""
 
 
 class MoodleAdapter:
@@ -45,7 +75,7 @@ class MoodleAdapter:
 
         for section in content_data:
             formatted_section = {
-                "section_name": section.get("section", ""),
+                "section_name": section.get("title", ""),
                 "activities": []
             }
 
@@ -90,7 +120,7 @@ class MoodleAdapter:
         Extract all assignments from courses data
 
         Args:
-            courses_data: List of courses with contents
+            courses_data: List of scraped courses with sections
 
         Returns:
             List of formatted assignments
@@ -101,9 +131,9 @@ class MoodleAdapter:
             course_id = course.get("id", "")
             course_name = course.get("name", "")
 
-            # Check if course has contents
-            if "contents" in course:
-                for section in course["contents"]:
+            # Check if course has sections
+            if "sections" in course:
+                for section in course["sections"]:
                     for activity in section.get("activities", []):
                         # If activity is an assignment
                         if activity.get("type", "").lower() in ["assign", "assignment", "作業"]:
@@ -113,7 +143,7 @@ class MoodleAdapter:
                                 "course_name": course_name,
                                 "name": activity.get("name", ""),
                                 "due_date": activity.get("due_date", None),
-                                "status": activity.get("status", "pending"),
+                                "status": activity.get("status") or "pending",
                                 "url": activity.get("url", ""),
                                 "description": activity.get("description", ""),
                             }
@@ -125,7 +155,29 @@ class MoodleAdapter:
 class MoodleService:
     """Service class to handle Moodle operations"""
 
-    def __init__(self, base_url: str, username: str, password: str, headless: bool = True):
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        password: str,
+        headless: bool = True,
+        pool: Optional[DriverPool] = None,
+        session_store: Optional[SessionStore] = None,
+        engine: Optional[str] = None,
+        http_client: Optional[httpx.Client] = None,
+        ws_token: Optional[str] = None,
+        concurrency: int = 1,
+        cache: Optional[ResultCache] = None,
+        cursor_store: Optional[SyncCursorStore] = None,
+        profile: str = "lean",
+        login_profile: str = "full",
+        wait_timeouts: Optional[Dict[str, float]] = None,
+        enrich_assignments: bool = True,
+        ical_url: Optional[str] = None,
+        budget: Optional[BrowserBudget] = None,
+        snapshot_store: Optional[SnapshotStore] = None,
+        flights: Optional[SingleFlight] = None
+    ):
         """
         Initialize Moodle service
 
@@ -134,27 +186,215 @@ class MoodleService:
             username: Username for login
             password: Password for login
             headless: Whether to run browser in headless mode
+            pool: Shared WebDriver pool; a fresh browser is launched per call when omitted
+            session_store: Shared store of authenticated cookies; SSO runs on every call when omitted
+            engine: "selenium" renders every page in the browser; "http" uses the browser
+                only for SSO and fetches pages over HTTP; "webservice" calls Moodle's REST
+                web services. Defaults to "webservice" when ws_token is set, else "selenium"
+            http_client: Shared keep-alive client for the http and webservice engines
+            ws_token: Moodle web services token
+            concurrency: Maximum number of course pages scraped in parallel
+            cache: Shared result cache; invalidated for this account after each sync
+            cursor_store: Shared store of sync snapshots; enables cursors and incremental syncs
+            profile: Browser profile for scraping pages ("lean" blocks images, fonts,
+                stylesheets and third-party hosts; "full" loads everything)
+            login_profile: Browser profile for the SSO login
+            wait_timeouts: Upper bound in seconds per browser wait step (login_form,
+                login_done, session_check, course_list, course_page, network_idle,
+                assignment_info)
+            enrich_assignments: Fill in assignment due dates and submission status from
+                Moodle's aggregated views (timeline, upcoming calendar, per-course
+                assignment index) after scraping
+            ical_url: Calendar export URL (calendar/export_execute.php with authtoken);
+                its assignment deadlines are merged into get_assignments
+            budget: Shared browser budget; browsers are checked out of the pool in
+                round-robin turns with other accounts (requires pool)
+            snapshot_store: On-disk store that every successful sync_all replaces
+                this account's snapshot in (not after a failed login, nor when a
+                course page failed to load)
+            flights: Shared registry of running scrapes; concurrent calls for this
+                account with the same engine and credential that need the same
+                scrape wait for one instead of each starting their own
         """
+        if engine is None:
+            engine = "webservice" if ws_token else "selenium"
+        if engine == "webservice" and not ws_token:
+            raise ValueError("The webservice engine requires a ws_token")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown scraping engine: {engine}")
+
         self.base_url = base_url
         self.username = username
         self.password = password
         self.headless = headless
+        self.pool = pool
+        self.session_store = session_store
+        self.engine = engine
+        self.http_client = http_client
+        self.ws_token = ws_token
+        self.concurrency = concurrency
+        self.cache = cache
+        self.cursor_store = cursor_store
+        self.profile = profile
+        self.login_profile = login_profile
+        self.wait_timeouts = wait_timeouts
+        self.enrich_assignments = enrich_assignments
+        self.ical_url = ical_url
+        self.budget = budget
+        self.snapshot_store = snapshot_store
+        self.flights = flights
         self.adapter = MoodleAdapter()
 
+    @property
+    def account(self) -> Tuple[str, str]:
+        """(base_url, username) that cached results and sync cursors are bound to"""
+        return (self.base_url.rstrip("/"), self.username)
+
+    def cache_key(self, resource: str) -> Tuple[str, str, str]:
+        return (*self.account, resource)
+
+    def cached(self, resource: str) -> Optional[CacheEntry]:
+        """
+        Look up a fresh cached result
+
+        Args:
+            resource: "courses", "assignments" or "course_detail:<id>"
+
+        Returns:
+            Cache entry, or None on a miss or when caching is disabled
+        """
+        if not self.cache:
+            return None
+        return self.cache.get(self.cache_key(resource))
+
+    def remember(self, resource: str, value: Any) -> CacheEntry:
+        """
+        Cache a result (empty results are not stored, they usually mean a failed scrape)
+
+        Returns:
+            Entry carrying the serialized body and its ETag/Last-Modified
+        """
+        if not self.cache or not value:
+            return CacheEntry(value)
+        return self.cache.put(self.cache_key(resource), value)
+
+    def invalidate_cache(self):
+        """Drop all cached results of this account"""
+        if self.cache:
+            self.cache.invalidate(*self.account)
+
+    def _flight_key(self, *operation: str) -> Tuple[str, ...]:
+        """
+        Key of a scrape in the flight registry
+
+        Besides the account it holds the engine and a keyed digest of the
+        credential (password, or token for the webservice engine). A caller
+        with a wrong password or another token therefore never receives the
+        result of a scrape that someone else authenticated.
+        """
+        credential = (self.ws_token if self.engine == "webservice" else self.password) or ""
+        digest = hmac.new(_FLIGHT_SECRET, credential.encode("utf-8"), "sha256").hexdigest()
+        return (*self.account, self.engine, digest, *operation)
+
+    def _coalesced(self, operation: Tuple[str, ...], fn, progress: Optional[ProgressCallback] = None) -> Any:
+        """
+        Run a scrape, or wait for the same scrape of this account already running
+
+        Args:
+            operation: What is scraped, e.g. ("scrape_all",) or ("course_detail", id)
+            fn: Scrape taking a progress callback; its result is shared, so
+                callers only read it
+            progress: Receives the progress of whichever call does the scrape
+        """
+        if not self.flights:
+            return fn(progress)
+        return self.flights.do(self._flight_key(*operation), fn, progress)
+
+    def _running_scrape_all(self) -> Optional[Dict[str, Any]]:
+        """
+        Result of a full scrape of this account that is running right now
+
+        Returns:
+            The shared scrape_all result once it finishes, or None when none is running
+        """
+        flight = self.flights.join(self._flight_key("scrape_all")) if self.flights else None
+        return flight.wait() if flight else None
+
+    def _pool(self):
+        """The shared pool, seen through the browser budget when there is one"""
+        if self.pool and self.budget:
+            return AccountPool(self.pool, self.budget, self.account)
+        return self.pool
+
+    def _scraper(self) -> MoodleScraper:
+        """Create a scraper for the selected engine, bound to this service's shared resources"""
+        if self.engine == "webservice":
+            return WebServiceScraper(
+                self.base_url,
+                self.username,
+                self.ws_token,
+                client=self.http_client,
+                concurrency=self.concurrency
+            )
+
+        if self.engine == "http":
+            return HttpMoodleScraper(
+                self.base_url,
+                self.username,
+                self.password,
+                self.headless,
+                pool=self._pool(),
+                session_store=self.session_store,
+                client=self.http_client,
+                concurrency=self.concurrency,
+                profile=self.profile,
+                login_profile=self.login_profile,
+                wait_timeouts=self.wait_timeouts
+            )
+
+        return MoodleScraper(
+            self.base_url,
+            self.username,
+            self.password,
+            self.headless,
+            pool=self._pool(),
+            session_store=self.session_store,
+            concurrency=self.concurrency,
+            profile=self.profile,
+            login_profile=self.login_profile,
+            wait_timeouts=self.wait_timeouts
+        )
+
     def login(self) -> Dict[str, Any]:
         """
-        Login to Moodle
+        Login to Moodle with the credentials, never with stored cookies
+
+        A successful login stores new cookies under a new session handle; the
+        account's previous handle stops working.
 
         Returns:
             Login result with success status
         """
         try:
-            with MoodleScraper(self.base_url, self.username, self.password, self.headless) as scraper:
-                # The scraper's __enter__ method handles login
+            with self._scraper() as scraper:
+                if not scraper.run_phase("login", scraper.login, True):
+                    return {
+                        "success": False,
+                        "message": "Login failed: Moodle rejected the credentials",
+                        "session_id": None
+                    }
+
+                expires_at = None
+                if self.session_store:
+                    session = self.session_store.get(self.base_url, self.username)
+                    if session:
+                        expires_at = datetime.fromtimestamp(session.expires_at).isoformat()
+
                 return {
                     "success": True,
                     "message": "Successfully logged in to Moodle",
-                    "session_id": "mock-session-id"  # In real implementation, extract from cookies
+                    "session_id": scraper.session_id,
+                    "expires_at": expires_at
                 }
         except Exception as e:
             return {
@@ -163,29 +403,53 @@ class MoodleService:
                 "session_id": None
             }
 
-    def get_courses(self) -> List[Dict[str, Any]]:
+    def verify_credentials(self) -> bool:
+        """
+        Whether the caller has proven it owns this account, without scraping
+
+        Cached results are keyed by account, so a caller that sent credentials
+        may only read them once those check out: the web services token must
+        belong to the username, and a password must match the stored session.
+        Callers without a password came in through a session handle.
+        """
+        if self.engine == "webservice":
+            with self._scraper() as scraper:
+                return scraper.login()
+        if not self.password:
+            return True
+        session = self.session_store.get(self.base_url, self.username) if self.session_store else None
+        return bool(session and session.verify(self.password))
+
+    def get_courses(self) -> Optional[List[Dict[str, Any]]]:
         """
         Get all enrolled courses
 
         Returns:
-            List of courses
+            List of courses (empty when the account has none), or None when
+            the scrape failed
         """
         try:
-            with MoodleScraper(self.base_url, self.username, self.password, self.headless) as scraper:
-                raw_data = scraper.scrape_all()
+            # A full scrape already running lists the courses too
+            scraped = self._running_scrape_all()
+            raw_courses = scraped["raw_courses"] if scraped else self._coalesced(("courses",), self._scrape_course_list)
+            return [self.adapter.convert_course(course) for course in raw_courses]
+        except Exception as e:
+            print(f"Error getting courses: {e}")
+            return None
 
-                if not raw_data or "courses" not in raw_data:
-                    return []
+    def _scrape_course_list(self, progress: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        """
+        Raw course list from the dashboard (shared between coalesced callers)
 
-                courses = [
-                    self.adapter.convert_course(course)
-                    for course in raw_data["courses"]
-                ]
+        Raises:
+            ScrapeError: The login failed
+        """
+        with self._scraper() as scraper:
+            if not scraper.run_phase("login", scraper.login):
+                raise ScrapeError("Login failed: Moodle rejected the credentials or the session expired")
 
-                return courses
-        except Exception as e:
-            print(f"Error getting courses: {e}")
-            return []
+            # Listing only needs the dashboard, not every course page
+            return scraper.run_phase("course_list", scraper.get_courses) or []
 
     def get_course_detail(self, course_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -196,29 +460,36 @@ class MoodleService:
 
         Returns:
             Course details with contents, or None if not found
+
+        Raises:
+            ScrapeError: The login failed
+            Exception: The course page could not be loaded (browser or connection error)
         """
-        try:
-            with MoodleScraper(self.base_url, self.username, self.password, self.headless) as scraper:
-                raw_data = scraper.scrape_all()
+        course = None
+        scraped = self._running_scrape_all()
+        if scraped:
+            course = next((c for c in scraped["raw_courses"] if str(c.get("id")) == course_id), None)
+        if not course:
+            course = self._coalesced(("course_detail", course_id), partial(self._scrape_course, course_id))
+        if not course:
+            return None
 
-                if not raw_data or "courses" not in raw_data:
-                    return None
+        course_info = self.adapter.convert_course(course)
+        course_info["contents"] = self.adapter.convert_course_content(
+            course.get("sections", [])
+        )
+        return course_info
 
-                # Find course by ID
-                for course in raw_data["courses"]:
-                    if course.get("id") == course_id:
-                        course_info = self.adapter.convert_course(course)
-                        course_info["contents"] = self.adapter.convert_course_content(
-                            course.get("contents", [])
-                        )
-                        return course_info
+    def _scrape_course(self, course_id: str, progress: Optional[ProgressCallback] = None) -> Optional[Dict[str, Any]]:
+        """One raw course with its sections (shared between coalesced callers)"""
+        with self._scraper() as scraper:
+            if not scraper.run_phase("login", scraper.login):
+                raise ScrapeError("Login failed: Moodle rejected the credentials or the session expired")
 
-                return None
-        except Exception as e:
-            print(f"Error getting course detail: {e}")
-            return None
+            # Fetch only this course page, skipping course-list discovery
+            return scraper.run_phase("course_page", scraper.get_course, course_id)
 
-    def get_assignments(self, course_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_assignments(self, course_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
         """
         Get all assignments, optionally filtered by course
 
@@ -226,52 +497,189 @@ class MoodleService:
             course_id: Optional course ID to filter assignments
 
         Returns:
-            List of assignments
+            List of assignments (empty when there are none), or None when the
+            scrape failed
         """
         try:
-            with MoodleScraper(self.base_url, self.username, self.password, self.headless) as scraper:
-                raw_data = scraper.scrape_all()
-
-                if not raw_data or "courses" not in raw_data:
-                    return []
+            # Every course page is needed, so this is the same scrape as sync_all
+            scraped = self._coalesced(("scrape_all",), self._scrape_all)
+            if scraped is None:
+                return None
 
-                # Extract assignments from all courses
-                assignments = self.adapter.extract_assignments_from_courses(raw_data["courses"])
+            # Merged with the calendar export once per scrape, like the snapshot
+            assignments = scraped["assignments"]
 
-                # Filter by course_id if provided
-                if course_id:
-                    assignments = [a for a in assignments if a["course_id"] == course_id]
+            # Filter by course_id if provided
+            if course_id:
+                assignments = [a for a in assignments if a["course_id"] == course_id]
 
-                return assignments
+            return assignments
         except Exception as e:
             print(f"Error getting assignments: {e}")
+            return None
+
+    def get_ical_assignments(self, course_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get assignment deadlines from the calendar export alone (one request, no browser)
+
+        Course ids are only known for events that link to their assignment;
+        statuses are not part of the export.
+
+        Args:
+            course_id: Optional course ID to filter assignments
+
+        Returns:
+            List of assignments, or None when the export could not be fetched
+        """
+        if not self.ical_url:
             return []
 
-    def sync_all(self) -> Dict[str, Any]:
+        try:
+            assignments = [
+                self.adapter.convert_assignment(assignment)
+                for assignment in fetch_ical_assignments(self.ical_url, self.http_client)
+            ]
+        except httpx.HTTPError as e:
+            print(f"Error getting calendar export: {e}")
+            return None
+
+        if course_id:
+            assignments = [a for a in assignments if a["course_id"] == course_id]
+        return assignments
+
+    def _merge_ical(self, assignments: List[Dict[str, Any]], raw_courses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Assignments with the calendar export's deadlines merged in, when an export URL is set
+
+        The merge works on copies, so the sync data keeps the scraped values.
+        """
+        if not self.ical_url:
+            return assignments
+        try:
+            return merge_ical_assignments(
+                [dict(assignment) for assignment in assignments],
+                fetch_ical_assignments(self.ical_url, self.http_client),
+                raw_courses
+            )
+        except httpx.HTTPError as e:
+            print(f"Calendar export unavailable: {e}")
+            return assignments
+
+    def sync_all(self, progress: Optional[ProgressCallback] = None, since: Optional[str] = None) -> Dict[str, Any]:
         """
         Perform full sync of all Moodle data
 
+        Args:
+            progress: Optional callback receiving (phase, courses_done, courses_total)
+            since: Cursor of a previous sync; when it is still known, "data" holds
+                only the changes since then and "incremental" is True
+
         Returns:
-            Sync result with data
+            Sync result with data and a cursor for the next incremental sync
         """
         try:
-            with MoodleScraper(self.base_url, self.username, self.password, self.headless) as scraper:
-                raw_data = scraper.scrape_all()
+            # Concurrent syncs and assignment lists of this account share one scrape
+            scraped = self._coalesced(("scrape_all",), self._scrape_all, progress)
 
-                if not raw_data or "courses" not in raw_data:
-                    return {
-                        "success": False,
-                        "message": "No data received from Moodle",
-                        "courses_count": 0,
-                        "assignments_count": 0,
-                        "data": {}
+            if scraped is None:
+                return {
+                    "success": False,
+                    "message": "No data received from Moodle",
+                    "courses_count": 0,
+                    "assignments_count": 0,
+                    "data": {}
+                }
+
+            data = scraped["data"]
+            courses, assignments = data["courses"], data["assignments"]
+            result = {
+                "success": True,
+                "message": "Successfully synced Moodle data",
+                "courses_count": len(courses),
+                "assignments_count": len(assignments),
+                "cursor": None,
+                "incremental": False,
+                "timings": scraped["timings"],
+                "data": data
+            }
+
+            if self.cursor_store:
+                snapshot = build_snapshot(courses, assignments)
+                previous = self.cursor_store.get(since, *self.account) if since else None
+                if previous is not None:
+                    result["incremental"] = True
+                    result["data"] = {
+                        **diff_snapshots(previous, snapshot, courses, assignments),
+                        "synced_at": data["synced_at"]
                     }
+                result["cursor"] = self.cursor_store.save(*self.account, snapshot)
+
+            return result
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Sync failed: {str(e)}",
+                "courses_count": 0,
+                "assignments_count": 0,
+                "data": {}
+            }
+
+    def refresh_snapshot(self, progress: Optional[ProgressCallback] = None) -> bool:
+        """
+        Scrape everything into the snapshot store, without a sync cursor
 
+        Shares the scrape_all flight of sync_all, so a sync of this account
+        that is already running (scheduled, background refresh or another
+        read) is joined rather than repeated.
+
+        Returns:
+            Whether Moodle returned data; the snapshot is only replaced when
+            every course page loaded
+
+        Raises:
+            ScrapeError: The login failed
+        """
+        return self._coalesced(("scrape_all",), self._scrape_all, progress) is not None
+
+    def _scrape_all(self, progress: Optional[ProgressCallback] = None) -> Optional[Dict[str, Any]]:
+        """
+        Scrape and convert every course, then store the result
+
+        The result is shared by every coalesced sync_all and get_assignments
+        call, so the cache, snapshot store and invalidation are updated once
+        per scrape rather than once per caller.
+
+        Returns:
+            "data" (converted courses, assignments, synced_at), "assignments"
+            (merged with the calendar export), "raw_courses" and "timings",
+            or None when Moodle returned nothing
+
+        Raises:
+            ScrapeError: The login failed; nothing is cached or stored, so
+                cursors and snapshots keep describing the last good sync
+        """
+        with self._scraper() as scraper:
+            raw_data = scraper.scrape_all(progress)
+
+            if raw_data and raw_data.get("error"):
+                raise ScrapeError("Login failed: Moodle rejected the credentials or the session expired")
+            if not raw_data or "courses" not in raw_data:
+                return None
+
+            if self.enrich_assignments:
+                if progress:
+                    progress("assignment_info", len(raw_data["courses"]), len(raw_data["courses"]))
+                scraper.enrich_assignments(raw_data["courses"])
+
+            if progress:
+                progress("converting", len(raw_data["courses"]), len(raw_data["courses"]))
+
+            with scraper.timings.span("conversion"):
                 # Convert courses
                 courses = [
                     {
                         **self.adapter.convert_course(course),
-                        "contents": self.adapter.convert_course_content(course.get("contents", []))
+                        "contents": self.adapter.convert_course_content(course.get("sections", []))
                     }
                     for course in raw_data["courses"]
                 ]
@@ -279,22 +687,201 @@ class MoodleService:
                 # Extract assignments
                 assignments = self.adapter.extract_assignments_from_courses(raw_data["courses"])
 
-                return {
-                    "success": True,
-                    "message": "Successfully synced Moodle data",
-                    "courses_count": len(courses),
-                    "assignments_count": len(assignments),
-                    "data": {
-                        "courses": courses,
-                        "assignments": assignments,
-                        "synced_at": datetime.now().isoformat()
-                    }
-                }
-        except Exception as e:
+            data = {
+                "courses": courses,
+                "assignments": assignments,
+                "synced_at": datetime.now().isoformat()
+            }
+
+            # What /assignments answers, live or from the snapshot
+            merged_assignments = self._merge_ical(assignments, raw_data["courses"])
+
+            # Cached GET results predate this sync; keep this one for reconciliation
+            self.invalidate_cache()
+            self.remember("sync", data)
+            failed_pages = sum(1 for course in raw_data["courses"] if "error" in course)
+            if self.snapshot_store and failed_pages:
+                # Reads keep the last complete snapshot rather than one missing these courses' contents
+                print(f"Snapshot not replaced: {failed_pages} course pages failed")
+            elif self.snapshot_store:
+                try:
+                    self.snapshot_store.save(*self.account, {**data, "assignments": merged_assignments})
+                except sqlite3.Error as e:
+                    # Counted in the store's failed_writes; reads keep serving the previous snapshot
+                    print(f"Snapshot of {self.username} not stored, the previous one is kept: {e}")
+
             return {
-                "success": False,
-                "message": f"Sync failed: {str(e)}",
-                "courses_count": 0,
-                "assignments_count": 0,
-                "data": {}
+                "data": data,
+                "assignments": merged_assignments,
+                "raw_courses": raw_data["courses"],
+                "timings": scraper.timings.summary()
             }
+
+    def download_resources(
+        self,
+        downloader: ResourceDownloader,
+        course_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Download the files of resource activities into the downloader's store
+
+        The resource list comes from the snapshot store when this account has
+        a snapshot, otherwise from a scrape. The browser (if any) is given
+        back before the first file is fetched: downloads only need the
+        session cookies.
+
+        Args:
+            downloader: Shared downloader (concurrency, bandwidth cap, content store)
+            course_id: Only download this course's resources
+            progress: Optional callback receiving (phase, done, total)
+            force: Download again even files that are already stored for their URL
+
+        Returns:
+            Download result with per-file status and counts per status
+        """
+        started = time.time()
+        try:
+            with self._scraper() as scraper:
+                if progress:
+                    progress("login", 0, 0)
+                if not scraper.run_phase("login", scraper.login):
+                    return self._download_result(False, "Login failed", [], started)
+
+                cookie_header = scraper.cookie_header()
+                if not cookie_header:
+                    return self._download_result(
+                        False, "Resources need a Moodle session; use the selenium or http engine", [], started
+                    )
+                resources = self._resources(scraper, course_id, progress)
+
+            files = downloader.download_all(self.account, resources, cookie_header, progress, force)
+            failed = sum(1 for f in files if f["status"] == "failed")
+            message = f"Downloaded {len(files) - failed} of {len(files)} resources"
+            return self._download_result(failed < len(files) or not files, message, files, started)
+        except Exception as e:
+            return self._download_result(False, f"Download failed: {str(e)}", [], started)
+
+    def _resources(
+        self,
+        scraper: MoodleScraper,
+        course_id: Optional[str],
+        progress: Optional[ProgressCallback]
+    ) -> List[Dict[str, Any]]:
+        """Resource activities with their course, from the snapshot store or a scrape"""
+        if self.snapshot_store and self.snapshot_store.snapshot(*self.account):
+            return self.snapshot_store.activities(*self.account, "resource", course_id)
+
+        if course_id:
+            course = scraper.run_phase("course_page", scraper.get_course, course_id)
+            courses = [course] if course else []
+        else:
+            if progress:
+                progress("course_list", 0, 0)
+            courses = scraper.scrape_courses(scraper.run_phase("course_list", scraper.get_courses) or [], progress)
+
+        return [
+            {**activity, "course_id": course.get("id", ""), "course_name": course.get("name", "")}
+            for course in courses
+            for section in course.get("sections", [])
+            for activity in section.get("activities", [])
+            if activity.get("type") == "resource"
+        ]
+
+    @staticmethod
+    def _download_result(success: bool, message: str, files: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+        counts = {status: 0 for status in ("downloaded", "deduplicated", "cached", "failed")}
+        for f in files:
+            counts[f["status"]] += 1
+        return {
+            "success": success,
+            "message": message,
+            **counts,
+            "bytes": sum(f["size"] for f in files if f["status"] in ("downloaded", "deduplicated")),
+            "elapsed_seconds": round(time.time() - started, 2),
+            "files": files
+        }
+
+    def iter_sync(self) -> Iterator[Dict[str, Any]]:
+        """
+        Perform a full sync, yielding records as soon as they are scraped
+
+        Yields one {"type": "course"} record per course as its page finishes
+        (in completion order, with its position in the course list as
+        "index"), then one {"type": "assignment"} record per assignment, then
+        a {"type": "summary"} trailer carrying a cursor for a later incremental
+        sync. Nothing but the assignment list and per-course fingerprints is
+        held in memory across courses.
+
+        Yields:
+            Stream records
+        """
+        courses_count = 0
+        assignments = []
+        assignment_courses = []
+        fingerprints = {}
+
+        try:
+            with self._scraper() as scraper:
+                if not scraper.run_phase("login", scraper.login):
+                    yield self._summary_record(False, "Login failed", 0, 0)
+                    return
+
+                raw_courses = scraper.run_phase("course_list", scraper.get_courses)
+                for index, course in scraper.iter_scrape_courses(raw_courses):
+                    courses_count += 1
+                    assignment_courses.append(self._assignment_stub(course))
+                    converted = {
+                        **self.adapter.convert_course(course),
+                        "contents": self.adapter.convert_course_content(course.get("sections", []))
+                    }
+                    if self.cursor_store:
+                        fingerprints[converted["id"]] = fingerprint_course(converted)
+                    yield {"type": "course", "index": index, "data": converted}
+
+                if self.enrich_assignments:
+                    scraper.enrich_assignments(assignment_courses)
+                assignments = self.adapter.extract_assignments_from_courses(assignment_courses)
+
+            for assignment in assignments:
+                yield {"type": "assignment", "data": assignment}
+
+            self.invalidate_cache()
+
+            summary = self._summary_record(True, "Successfully synced Moodle data", courses_count, len(assignments))
+            if self.cursor_store:
+                summary["cursor"] = self.cursor_store.save(*self.account, {
+                    "courses": fingerprints,
+                    "assignments": {assignment["id"]: content_hash(assignment) for assignment in assignments}
+                })
+            yield summary
+        except Exception as e:
+            yield self._summary_record(False, f"Sync failed: {str(e)}", courses_count, len(assignments))
+
+    @staticmethod
+    def _assignment_stub(course: Dict[str, Any]) -> Dict[str, Any]:
+        """Course reduced to its assignment activities, kept until the stream's assignment records"""
+        return {
+            "id": course.get("id", ""),
+            "name": course.get("name", ""),
+            "sections": [{
+                "activities": [
+                    activity
+                    for section in course.get("sections", [])
+                    for activity in section.get("activities", [])
+                    if activity.get("type", "").lower() in ["assign", "assignment", "作業"]
+                ]
+            }]
+        }
+
+    @staticmethod
+    def _summary_record(success: bool, message: str, courses_count: int, assignments_count: int) -> Dict[str, Any]:
+        return {
+            "type": "summary",
+            "success": success,
+            "message": message,
+            "courses_count": courses_count,
+            "assignments_count": assignments_count,
+            "synced_at": datetime.now().isoformat()
+        }
@@ -0,0 +1,231 @@
+"""Moodle AJAX 服務（lib/ajax/service.php）：新版儀表板課程總覽與時間軸使用的 API"""
+import json
+import re
+import time
+from datetime import datetime
+from typing import Callable, List, Dict, Any, Optional, Tuple
+
+import lxml.html
+
+from .parsers import ParseError, assign_cmid
+
+ENROLLED_COURSES_METHOD = 'core_course_get_enrolled_courses_by_timeline_classification'
+
+# 每次向課程總覽 API 要求的課程數
+ENROLLED_COURSES_PAGE_SIZE = 100
+
+# 儀表板時間軸：所有課程中仍需處理（未繳交）的活動
+ACTION_EVENTS_METHOD = 'core_calendar_get_action_events_by_timesort'
+
+# Moodle 限制每次最多回傳 50 個事件
+ACTION_EVENTS_PAGE_SIZE = 50
+
+# 時間軸往回查詢的天數（逾期未繳交的作業）
+ACTION_EVENTS_LOOKBACK_DAYS = 180
+
+_SESSKEY_RE = re.compile(r'"sesskey"\s*:\s*"([A-Za-z0-9]+)"')
+
+
+class AjaxError(ParseError):
+    """AJAX 服務回傳錯誤（例如舊版 Moodle 沒有此函式或 sesskey 失效）"""
+
+
+def parse_sesskey(html: str) -> Optional[str]:
+    """
+    從頁面中的 M.cfg 取得 sesskey
+
+    Args:
+        html: 已登入頁面的 HTML
+
+    Returns:
+        sesskey，找不到時回傳 None
+    """
+    match = _SESSKEY_RE.search(html)
+    return match.group(1) if match else None
+
+
+def service_url(base_url: str, sesskey: str, methodname: str = ENROLLED_COURSES_METHOD) -> str:
+    return f"{base_url}/lib/ajax/service.php?sesskey={sesskey}&info={methodname}"
+
+
+def enrolled_courses_request(offset: int, limit: int = ENROLLED_COURSES_PAGE_SIZE) -> str:
+    """
+    建立課程總覽 API 的請求內容
+
+    Args:
+        offset: 從第幾門課程開始
+        limit: 最多回傳幾門課程
+
+    Returns:
+        JSON 請求內容
+    """
+    return json.dumps([{
+        'index': 0,
+        'methodname': ENROLLED_COURSES_METHOD,
+        'args': {
+            'offset': offset,
+            'limit': limit,
+            'classification': 'all',
+            'sort': 'fullname'
+        }
+    }])
+
+
+def _response_data(payload: Any) -> Dict[str, Any]:
+    """
+    取出單一 AJAX 呼叫的 data
+
+    Raises:
+        AjaxError: 回應為錯誤或格式不符
+    """
+    if isinstance(payload, dict):
+        # 未登入或 sesskey 失效時整個請求以單一錯誤物件回應
+        raise AjaxError(payload.get('errorcode') or payload.get('error') or 'AJAX 請求失敗')
+    if not isinstance(payload, list) or not payload:
+        raise AjaxError('AJAX 回應格式不符')
+
+    response = payload[0]
+    if response.get('error'):
+        exception = response.get('exception') or {}
+        raise AjaxError(exception.get('errorcode') or exception.get('message') or 'AJAX 請求失敗')
+
+    return response.get('data') or {}
+
+
+def parse_enrolled_courses(payload: Any, base_url: str) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    解析課程總覽 API 的回應
+
+    Args:
+        payload: 已解碼的 JSON 回應
+        base_url: Moodle 網站基礎 URL
+
+    Returns:
+        (課程列表, 下一頁的 offset；沒有下一頁時為 None)
+
+    Raises:
+        AjaxError: 回應為錯誤或格式不符
+    """
+    data = _response_data(payload)
+    courses = []
+    for course in data.get('courses', []):
+        name = course.get('fullname') or course.get('shortname') or ''
+        if '<' in name:
+            # fullname 可能包含多語系等 HTML 標記
+            name = lxml.html.fromstring(name).text_content()
+        courses.append({
+            'id': str(course['id']),
+            'name': name.strip(),
+            'url': course.get('viewurl') or f"{base_url}/course/view.php?id={course['id']}",
+            'sections': []
+        })
+
+    next_offset = data.get('nextoffset')
+    return courses, next_offset
+
+
+def collect_enrolled_courses(call: Callable[[str], Any], base_url: str) -> List[Dict[str, Any]]:
+    """
+    逐頁呼叫課程總覽 API 直到取得全部課程
+
+    Args:
+        call: 接收請求內容、回傳已解碼 JSON 回應的函式
+        base_url: Moodle 網站基礎 URL
+
+    Returns:
+        課程列表
+
+    Raises:
+        AjaxError: 任一頁回應為錯誤
+    """
+    courses: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        page, next_offset = parse_enrolled_courses(call(enrolled_courses_request(offset)), base_url)
+        courses.extend(page)
+        if len(page) < ENROLLED_COURSES_PAGE_SIZE or not next_offset or next_offset <= offset:
+            return courses
+        offset = next_offset
+
+
+def action_events_request(
+    timesortfrom: int,
+    aftereventid: int = 0,
+    limit: int = ACTION_EVENTS_PAGE_SIZE
+) -> str:
+    """
+    建立時間軸 API 的請求內容
+
+    Args:
+        timesortfrom: 從此時間（Unix timestamp）之後的事件
+        aftereventid: 上一頁最後一個事件的 ID（第一頁為 0）
+        limit: 最多回傳幾個事件
+
+    Returns:
+        JSON 請求內容
+    """
+    args = {'timesortfrom': timesortfrom, 'limitnum': limit}
+    if aftereventid:
+        args['aftereventid'] = aftereventid
+    return json.dumps([{'index': 0, 'methodname': ACTION_EVENTS_METHOD, 'args': args}])
+
+
+def parse_action_events(payload: Any) -> Tuple[Dict[str, Dict[str, Any]], int, Optional[int]]:
+    """
+    解析時間軸 API 的回應，只保留作業事件
+
+    時間軸只列出仍需處理的活動，出現在其中的作業即為尚未繳交。
+
+    Args:
+        payload: 已解碼的 JSON 回應
+
+    Returns:
+        (課程模組 ID 對應 {due_date, status}, 此頁事件數, 最後一個事件的 ID)
+
+    Raises:
+        AjaxError: 回應為錯誤或格式不符
+    """
+    data = _response_data(payload)
+    events = data.get('events', [])
+
+    info = {}
+    for event in events:
+        if event.get('modulename') != 'assign':
+            continue
+        cmid = assign_cmid(event.get('url', ''))
+        if not cmid:
+            continue
+        info[cmid] = {
+            'due_date': datetime.fromtimestamp(event['timesort']).isoformat() if event.get('timesort') else None,
+            'status': 'overdue' if event.get('overdue') else 'pending',
+        }
+
+    return info, len(events), data.get('lastid')
+
+
+def collect_action_events(
+    call: Callable[[str], Any],
+    lookback_days: int = ACTION_EVENTS_LOOKBACK_DAYS
+) -> Dict[str, Dict[str, Any]]:
+    """
+    逐頁呼叫時間軸 API 直到取得全部作業事件
+
+    Args:
+        call: 接收請求內容、回傳已解碼 JSON 回應的函式
+        lookback_days: 往回查詢的天數
+
+    Returns:
+        課程模組 ID 對應 {due_date, status}
+
+    Raises:
+        AjaxError: 任一頁回應為錯誤
+    """
+    timesortfrom = int(time.time()) - lookback_days * 86400
+    info: Dict[str, Dict[str, Any]] = {}
+    aftereventid = 0
+    while True:
+        page, count, lastid = parse_action_events(call(action_events_request(timesortfrom, aftereventid)))
+        info.update(page)
+        if count < ACTION_EVENTS_PAGE_SIZE or not lastid or lastid == aftereventid:
+            return info
+        aftereventid = lastid
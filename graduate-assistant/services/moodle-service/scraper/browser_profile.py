@@ -0,0 +1,104 @@
+"""瀏覽器設定檔：爬取用的精簡（lean）設定與登入用的完整（full）設定"""
+from typing import List
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from .metrics import PROFILE_SWITCHES
+
+PROFILES = ('lean', 'full')
+
+# 精簡設定關閉的 Chrome 背景功能（不影響頁面內容，登入時也可沿用）
+# 圖片等資源不在啟動時關閉，而是由 apply_page_profile 依頁面封鎖，完整設定的登入頁仍能載入
+LEAN_CHROME_ARGS = [
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-notifications',
+    '--mute-audio',
+    '--no-first-run',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+]
+
+# 精簡設定封鎖的請求（圖片、字型、樣式、影音與常見第三方服務）
+# 解析只依賴 DOM 與頁面內的 M.cfg，不需要這些資源
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*/theme/image.php/*', '*/pluginfile.php/*',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*/theme/font.php/*',
+    '*.css', '*/theme/styles.php/*',
+    '*.mp4', '*.webm', '*.mp3',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*youtube.com*', '*ytimg.com*', '*vimeo.com*',
+    '*fonts.googleapis.com*', '*fonts.gstatic.com*',
+    '*facebook.net*', '*hotjar.com*',
+]
+
+# 目前頁面（含所有子資源）實際傳輸的位元組數
+TRANSFER_SIZE_SCRIPT = (
+    "return performance.getEntriesByType('navigation')"
+    ".concat(performance.getEntriesByType('resource'))"
+    ".reduce(function (n, e) { return n + (e.transferSize || 0); }, 0);"
+)
+
+
+def validate_profile(profile: str) -> str:
+    if profile not in PROFILES:
+        raise ValueError(f"未知的瀏覽器設定檔: {profile}（可用: {', '.join(PROFILES)}）")
+    return profile
+
+
+def apply_launch_profile(options: Options, profile: str, login_profile: str = 'full'):
+    """
+    套用啟動時才能決定的設定（Chrome 參數與頁面載入策略）
+
+    同一個瀏覽器會在登入與爬取間切換設定檔，啟動設定只能包含兩者皆可接受的部分：
+    lean 關閉背景功能；eager 載入策略只在登入也使用 lean 時才啟用。
+
+    Args:
+        options: Chrome Options
+        profile: 爬取頁面的設定檔（lean 或 full）
+        login_profile: SSO 登入的設定檔
+    """
+    if validate_profile(profile) != 'lean':
+        return
+
+    for arg in LEAN_CHROME_ARGS:
+        options.add_argument(arg)
+    if validate_profile(login_profile) == 'lean':
+        # DOMContentLoaded 後就返回，不等待圖片與子框架
+        options.page_load_strategy = 'eager'
+
+
+def apply_page_profile(driver: webdriver.Chrome, profile: str) -> bool:
+    """
+    切換目前瀏覽器的請求封鎖規則（同一個瀏覽器可在登入與爬取間切換）
+
+    Args:
+        driver: WebDriver 實例
+        profile: lean 封鎖非必要資源，full 不封鎖
+
+    Returns:
+        是否成功套用（非 Chromium 瀏覽器不支援 CDP）
+    """
+    patterns: List[str] = BLOCKED_URL_PATTERNS if validate_profile(profile) == 'lean' else []
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except (AttributeError, WebDriverException) as e:
+        print(f"→ 無法套用瀏覽器設定檔 {profile}: {e}")
+        PROFILE_SWITCHES.inc(profile=profile, result='failed')
+        return False
+    PROFILE_SWITCHES.inc(profile=profile, result='applied')
+    return True
+
+
+def page_transfer_size(driver: webdriver.Chrome) -> int:
+    """目前頁面的傳輸量（位元組），無法取得時回傳 0"""
+    try:
+        return int(driver.execute_script(TRANSFER_SIZE_SCRIPT) or 0)
+    except WebDriverException:
+        return 0
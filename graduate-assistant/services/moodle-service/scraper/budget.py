@@ -0,0 +1,188 @@
+"""
+Global browser budget shared fairly between accounts
+
+The WebDriver pool caps how many browsers are alive, but it hands them out
+first come, first served: an account that checks out a browser keeps it for
+its whole sync, and a sync with extra workers grabs several. With many
+accounts syncing at once (see scheduler.SyncScheduler) one student with 30
+courses could hold every browser while the rest of the cohort waits.
+
+BrowserBudget hands out browser slots round-robin between accounts. Accounts
+wait in a ring; when a slot frees up it goes to the account at the head of
+the ring, which then moves to the back if it wants more. Extra workers only
+get a slot when nobody is waiting, and a scraper that has loaded a quantum of
+pages gives its browser back between courses whenever another account is
+waiting (MoodleScraper.yield_browser), then queues again at the back.
+
+AccountPool is the per-account view scrapers receive in place of the
+DriverPool: every acquire() takes a budget slot before checking out a driver.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from .driver_pool import DriverLease, DriverPool, PoolTimeoutError
+
+
+class BrowserBudget:
+    """Round-robin allocator of browser slots keyed by account"""
+
+    def __init__(self, slots: int, quantum: int = 10):
+        """
+        Initialize budget
+
+        Args:
+            slots: Browsers that may be checked out at the same time (normally the pool size)
+            quantum: Pages an account may load on one browser before it yields to waiting accounts
+        """
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+
+        self.slots = slots
+        self.quantum = quantum
+        self._in_use: Dict[Hashable, int] = {}
+        # account -> number of waiting acquires; iteration order is the round-robin ring
+        self._waiting: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._granted = 0
+        self._yields = 0
+
+    def _free(self) -> int:
+        return self.slots - sum(self._in_use.values())
+
+    def acquire(self, key: Hashable, timeout: Optional[float] = None):
+        """
+        Take a slot for an account, waiting for its turn in the ring
+
+        Args:
+            key: Account the browser is for
+            timeout: Seconds to wait (0 only succeeds when a slot is free and nobody waits)
+
+        Raises:
+            PoolTimeoutError: If the account did not get a slot in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            if timeout == 0:
+                if self._waiting or self._free() <= 0:
+                    raise PoolTimeoutError("No browser left in the budget")
+                self._grant(key)
+                return
+
+            self._waiting[key] = self._waiting.get(key, 0) + 1
+            try:
+                while self._free() <= 0 or next(iter(self._waiting)) != key:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No browser available within {timeout:g}s (budget {self.slots})"
+                        )
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._unwait(key)
+                self._cond.notify_all()
+                raise
+
+            self._unwait(key)
+            if key in self._waiting:
+                # More acquires of this account wait: they go to the back of the ring
+                self._waiting.move_to_end(key)
+            self._grant(key)
+            self._cond.notify_all()
+
+    def release(self, key: Hashable):
+        """Give back a slot taken by acquire()"""
+        with self._cond:
+            held = self._in_use.get(key, 0) - 1
+            if held > 0:
+                self._in_use[key] = held
+            else:
+                self._in_use.pop(key, None)
+            self._cond.notify_all()
+
+    def contended(self, key: Hashable) -> bool:
+        """Whether another account is waiting for a slot"""
+        with self._cond:
+            return any(waiting != key for waiting in self._waiting)
+
+    def should_yield(self, key: Hashable, pages: int) -> bool:
+        """Whether an account that loaded this many pages on its browser should give it back"""
+        if pages < self.quantum or not self.contended(key):
+            return False
+        with self._cond:
+            self._yields += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Current budget usage"""
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "in_use": sum(self._in_use.values()),
+                "accounts_holding": len(self._in_use),
+                "accounts_waiting": len(self._waiting),
+                "quantum": self.quantum,
+                "granted": self._granted,
+                "yields": self._yields,
+            }
+
+    def _grant(self, key: Hashable):
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        self._granted += 1
+
+    def _unwait(self, key: Hashable):
+        count = self._waiting.get(key, 0) - 1
+        if count > 0:
+            self._waiting[key] = count
+        else:
+            self._waiting.pop(key, None)
+
+
+class AccountPool:
+    """DriverPool view that takes a budget slot for every browser one account checks out"""
+
+    def __init__(self, pool: DriverPool, budget: BrowserBudget, key: Hashable):
+        """
+        Initialize view
+
+        Args:
+            pool: Shared WebDriver pool
+            budget: Shared browser budget
+            key: Account the browsers are for, e.g. (base_url, username)
+        """
+        self.pool = pool
+        self.budget = budget
+        self.key = key
+
+    def acquire(self, timeout: Optional[float] = None) -> DriverLease:
+        """
+        Wait for the account's turn in the budget, then check out a driver
+
+        Raises:
+            PoolTimeoutError: If no slot or driver became available in time
+        """
+        timeout = self.pool.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        self.budget.acquire(self.key, timeout)
+        try:
+            return self.pool.acquire(max(0.0, timeout - (time.monotonic() - started)))
+        except BaseException:
+            self.budget.release(self.key)
+            raise
+
+    def release(self, lease: DriverLease):
+        try:
+            self.pool.release(lease)
+        finally:
+            self.budget.release(self.key)
+
+    def should_yield(self, pages: int) -> bool:
+        """Whether the account's browser has used up its quantum while others wait"""
+        return self.budget.should_yield(self.key, pages)
+
+    def __getattr__(self, name: str) -> Any:
+        # max_size, stats() and the rest come from the shared pool
+        return getattr(self.pool, name)
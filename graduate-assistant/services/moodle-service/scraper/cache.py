@@ -0,0 +1,186 @@
+"""
+TTL + LRU cache of serialized API results
+
+Course structure changes rarely, so the GET endpoints keep their last result
+per (base_url, username, resource) and answer from memory until it expires.
+Entries hold the response body already encoded as JSON; its size counts
+against a byte budget and the least recently used entries are evicted first.
+Each entry carries an ETag and Last-Modified so clients can revalidate with
+conditional requests.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+from .encoding import dumps_json
+
+# (base_url, username, resource), e.g. resource "courses" or "course_detail:123"
+CacheKey = Tuple[str, str, str]
+
+# Seconds a result stays fresh, by resource kind (the part before ":")
+DEFAULT_TTLS = {
+    "courses": 3600,
+    "course_detail": 3600,
+    "assignments": 600,
+    "sync": 600,
+}
+
+
+class CacheEntry:
+    """One cached response body with its validators"""
+
+    def __init__(self, value: Any, last_modified: Optional[float] = None, ttl: float = 0):
+        self.value = value
+        self.body = dumps_json(value)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+        self.last_modified = last_modified or time.time()
+        self.stored_at = time.time()
+        self.expires_at = self.stored_at + ttl
+
+    def derive(self, value: Any) -> "CacheEntry":
+        """Entry for a view of this result (e.g. a filtered list) sharing its age and expiry"""
+        entry = CacheEntry(value, last_modified=self.last_modified)
+        entry.stored_at = self.stored_at
+        entry.expires_at = self.expires_at
+        return entry
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    def headers(self) -> Dict[str, str]:
+        """Validator and freshness headers for a response built from this entry"""
+        return {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": f"private, max-age={max(0, int(self.expires_at - time.time()))}",
+        }
+
+    def not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """
+        Whether a conditional request can be answered with 304
+
+        If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+        """
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or any((tag[2:] if tag.startswith("W/") else tag) == self.etag for tag in tags)
+
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+
+        return False
+
+
+class ResultCache:
+    """Thread-safe result cache with per-resource TTLs and a memory budget"""
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 600,
+        max_bytes: int = 64 * 1024 * 1024
+    ):
+        """
+        Initialize cache
+
+        Args:
+            ttls: Seconds each resource kind stays fresh (merged over DEFAULT_TTLS)
+            default_ttl: TTL of resource kinds not listed in ttls
+            max_bytes: Budget for all cached bodies; least recently used entries go first
+        """
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def ttl_for(self, resource: str) -> float:
+        return self.ttls.get(resource.split(":", 1)[0], self.default_ttl)
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        """Fresh entry for key, or None (expired entries are dropped)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expired:
+                if entry is not None:
+                    self._remove(key)
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key: CacheKey, value: Any) -> CacheEntry:
+        """
+        Store a result and return its entry
+
+        Last-Modified is carried over from the previous entry when the body
+        did not change, so revalidation keeps working across refreshes.
+        """
+        entry = CacheEntry(value, ttl=self.ttl_for(key[2]))
+
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                if previous.etag == entry.etag:
+                    entry.last_modified = previous.last_modified
+                self._remove(key)
+
+            if entry.size > self.max_bytes:
+                # Too large to cache at all; still usable for this response
+                return entry
+
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+        return entry
+
+    def invalidate(self, base_url: str, username: str):
+        """Drop every cached resource of one account"""
+        with self._lock:
+            for key in [key for key in self._entries if key[:2] == (base_url, username)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy and hit counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
@@ -0,0 +1,61 @@
+"""
+In-process store of sync cursors
+
+Every sync stores the fingerprint snapshot of its result under a new opaque
+cursor. A later sync with since=<cursor> compares against that snapshot and
+returns only the changes. Cursors are bound to the account that created them
+and expire after a TTL.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class SyncCursorStore:
+    """Thread-safe cursor -> snapshot registry with TTL and size bound"""
+
+    def __init__(self, ttl_seconds: int = 7 * 86400, max_cursors: int = 1000):
+        """
+        Initialize cursor store
+
+        Args:
+            ttl_seconds: How long a cursor can be used for an incremental sync
+            max_cursors: Upper bound on stored cursors; the oldest go first
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_cursors = max_cursors
+        self._cursors: "OrderedDict[str, Tuple[str, str, float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, base_url: str, username: str, snapshot: Dict[str, Any]) -> str:
+        """Store a snapshot and return its new cursor"""
+        cursor = secrets.token_urlsafe(16)
+        with self._lock:
+            self._evict()
+            self._cursors[cursor] = (base_url, username, time.time(), snapshot)
+        return cursor
+
+    def get(self, cursor: str, base_url: str, username: str) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot for a cursor
+
+        Returns:
+            The snapshot, or None if the cursor is unknown, expired or belongs to another account
+        """
+        with self._lock:
+            self._evict()
+            entry = self._cursors.get(cursor)
+        if entry is None or entry[:2] != (base_url, username):
+            return None
+        return entry[3]
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl_seconds
+        while self._cursors:
+            cursor, (_, _, created_at, _) = next(iter(self._cursors.items()))
+            if created_at > cutoff and len(self._cursors) < self.max_cursors:
+                break
+            del self._cursors[cursor]
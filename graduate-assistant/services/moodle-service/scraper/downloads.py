@@ -0,0 +1,537 @@
+"""
+Concurrent, resumable downloads of course resource files
+
+Resource activities (mod/resource/view.php) link to the files teachers
+upload: slides, readings, handouts. ResourceDownloader fetches them over the
+shared keep-alive HTTP client with the account's session cookies, without a
+browser:
+
+- Bodies are streamed to disk in chunks and never held in memory
+- An interrupted download keeps its partial file. The next attempt asks for
+  the rest with a Range request, and If-Range makes the server send the whole
+  file instead if it changed in the meantime
+- Finished files are stored once per sha256 under objects/. The same slide
+  deck linked from two courses, or downloaded by two accounts, takes disk
+  space once
+- At most `concurrency` files download at a time, and all downloads share
+  one bandwidth cap
+
+A small SQLite index next to the objects records which file every account's
+resource URL turned out to be. A URL that is already in the index is not
+downloaded again.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlencode, urljoin, urlparse, urlunparse
+
+import httpx
+
+from .http_scraper import same_origin
+from .parsers import is_logged_in, parse_resource_link
+
+# Takes (phase, files_done, files_total), like the sync progress callback
+ProgressCallback = Callable[[str, int, int], None]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    base_url TEXT NOT NULL,
+    username TEXT NOT NULL,
+    url TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    filename TEXT,
+    content_type TEXT,
+    course_id TEXT,
+    course_name TEXT,
+    name TEXT,
+    downloaded_at TEXT NOT NULL,
+    PRIMARY KEY (base_url, username, url)
+);
+CREATE INDEX IF NOT EXISTS files_sha256 ON files (base_url, username, sha256);
+"""
+
+_FILE_FIELDS = ("url", "sha256", "size", "filename", "content_type", "course_id", "course_name", "name", "downloaded_at")
+
+# Redirects and resource pages followed before giving up on finding the file
+_MAX_HOPS = 5
+
+# Bytes read per read() while rehashing a partial file
+_HASH_BLOCK = 1024 * 1024
+
+
+class DownloadError(Exception):
+    """A resource URL did not lead to a file"""
+
+
+class BandwidthLimiter:
+    """Token bucket shared by all downloads; consume() sleeps while over the cap"""
+
+    def __init__(self, bytes_per_second: int = 0, burst_bytes: Optional[int] = None):
+        """
+        Initialize limiter
+
+        Args:
+            bytes_per_second: Cap on the combined download rate (0 means no cap)
+            burst_bytes: Bytes that may be read at once after an idle period (defaults to one second's worth)
+        """
+        self.bytes_per_second = max(0, bytes_per_second)
+        self.burst_bytes = burst_bytes or self.bytes_per_second
+        self._tokens = float(self.burst_bytes)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, size: int):
+        """
+        Account for bytes just read, sleeping off any debt
+
+        Every caller adds its bytes to the shared debt and sleeps until the
+        bucket would be back at zero, so concurrent downloads split the
+        rate between them.
+        """
+        if not self.bytes_per_second:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst_bytes, self._tokens + (now - self._updated) * self.bytes_per_second)
+            self._updated = now
+            self._tokens -= size
+            delay = -self._tokens / self.bytes_per_second if self._tokens < 0 else 0.0
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _Fetched:
+    """A finished download, still in its partial file"""
+
+    def __init__(self, path: str, sha256: str, size: int, filename: str, content_type: str, resumed: bool):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.filename = filename
+        self.content_type = content_type
+        self.resumed = resumed
+
+
+def direct_url(url: str) -> str:
+    """
+    Resource view URL that redirects straight to the file
+
+    mod/resource/view.php shows a page for resources set to embed or open;
+    redirect=1 makes it redirect to pluginfile.php whatever the setting.
+    Other URLs are returned unchanged.
+    """
+    parsed = urlparse(url)
+    if not parsed.path.endswith("/mod/resource/view.php"):
+        return url
+    params = dict(parse_qsl(parsed.query))
+    params["redirect"] = "1"
+    return urlunparse(parsed._replace(query=urlencode(params)))
+
+
+def content_disposition_filename(header: Optional[str]) -> Optional[str]:
+    """File name from a Content-Disposition header (filename* wins over filename)"""
+    filename = None
+    for part in (header or "").split(";"):
+        key, _, value = part.strip().partition("=")
+        key = key.strip().lower()
+        value = value.strip()
+        if key == "filename*":
+            _, _, encoded = value.partition("''")
+            return unquote(encoded.strip('"')) or filename
+        if key == "filename":
+            filename = value.strip('"')
+    return filename
+
+
+def _total_size(response: httpx.Response) -> Optional[int]:
+    """Full size of the file from Content-Range (206) or Content-Length (200)"""
+    content_range = response.headers.get("content-range", "")
+    if content_range:
+        total = content_range.rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("content-length", "")
+    return int(length) if length.isdigit() else None
+
+
+def _if_range(etag: Optional[str], last_modified: Optional[str]) -> Optional[str]:
+    """If-Range validator; weak ETags may not be used there, so those fall back to Last-Modified"""
+    if etag and not etag.startswith("W/"):
+        return etag
+    if last_modified:
+        try:
+            parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return None
+        return last_modified
+    return None
+
+
+class ResourceDownloader:
+    """Content-addressed store of resource files, filled by a pool of download threads"""
+
+    def __init__(
+        self,
+        root: str,
+        client: httpx.Client,
+        concurrency: int = 4,
+        max_bytes_per_second: int = 0,
+        chunk_size: int = 256 * 1024
+    ):
+        """
+        Initialize downloader, creating its directories and index if needed
+
+        Args:
+            root: Directory holding objects/, partial/ and index.db
+            client: Shared keep-alive HTTP client (cookies are sent per request)
+            concurrency: Files downloaded at the same time, across all accounts
+            max_bytes_per_second: Combined download rate cap (0 means no cap)
+            chunk_size: Bytes read from the response and written to disk at a time
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        self.root = root
+        self.client = client
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.limiter = BandwidthLimiter(max_bytes_per_second)
+        self._objects = os.path.join(root, "objects")
+        self._partial = os.path.join(root, "partial")
+        os.makedirs(self._objects, exist_ok=True)
+        os.makedirs(self._partial, exist_ok=True)
+
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="resource-download")
+        # partial file key -> [lock, holders and waiters], so one URL of one account is never
+        # downloaded twice at once; entries are dropped when their last user is done
+        self._url_locks: Dict[str, List[Any]] = {}
+        self._counts = {status: 0 for status in ("downloaded", "deduplicated", "cached", "failed")}
+        self._resumed = 0
+        self._bytes = 0
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self._objects, sha256[:2], sha256)
+
+    def download_all(
+        self,
+        account: Tuple[str, str],
+        resources: List[Dict[str, Any]],
+        cookie_header: str,
+        progress: Optional[ProgressCallback] = None,
+        force: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Download resource files on the download threads and wait for all of them
+
+        Args:
+            account: (base_url, username) the files are indexed under
+            resources: Resource activities with url, name, course_id and course_name
+            cookie_header: Cookie header of a logged-in Moodle session
+            progress: Called with ("downloading", files_done, files_total) after every file
+            force: Download again even when the URL is already in the index
+
+        Returns:
+            One result per distinct URL, in input order, with status downloaded,
+            deduplicated (content already stored), cached (URL already indexed)
+            or failed (with error)
+        """
+        unique = list({resource["url"]: resource for resource in resources if resource.get("url")}.values())
+        futures = {
+            self._executor.submit(self.download, account, resource, cookie_header, force): index
+            for index, resource in enumerate(unique)
+        }
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(unique)
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if progress:
+                progress("downloading", done, len(unique))
+        return results
+
+    def download(
+        self,
+        account: Tuple[str, str],
+        resource: Dict[str, Any],
+        cookie_header: str,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Download one resource file into the store (blocking)
+
+        Returns:
+            Result record; failures are reported in it instead of raised
+        """
+        url = resource["url"]
+        result = {
+            "url": url,
+            "name": resource.get("name", ""),
+            "course_id": resource.get("course_id", ""),
+            "course_name": resource.get("course_name", ""),
+            "status": "failed",
+            "sha256": None,
+            "size": 0,
+            "filename": None,
+            "content_type": None,
+            "resumed": False,
+            "error": None,
+        }
+
+        key = hashlib.sha1("\n".join((*account, url)).encode("utf-8")).hexdigest()
+        with self._url_lock(key):
+            known = None if force else self.file(account, url=url)
+            if known and os.path.exists(self.object_path(known["sha256"])):
+                result.update({field: known[field] for field in ("sha256", "size", "filename", "content_type")})
+                return self._finish(result, "cached")
+
+            try:
+                fetched = self._fetch(key, url, cookie_header, account[0])
+                status = self._store(fetched)
+            except (DownloadError, httpx.HTTPError, OSError) as e:
+                result["error"] = str(e) or type(e).__name__
+                return self._finish(result, "failed")
+
+            result.update(
+                sha256=fetched.sha256,
+                size=fetched.size,
+                filename=fetched.filename,
+                content_type=fetched.content_type,
+                resumed=fetched.resumed
+            )
+            try:
+                self._index(account, result)
+            except sqlite3.Error as e:
+                print(f"Download not indexed: {e}")
+            return self._finish(result, status)
+
+    def file(
+        self,
+        account: Tuple[str, str],
+        url: Optional[str] = None,
+        sha256: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """An account's indexed file, by resource URL or by content hash"""
+        column, value = ("url", url) if url is not None else ("sha256", sha256)
+        rows = self._query(
+            f"SELECT {', '.join(_FILE_FIELDS)} FROM files WHERE base_url = ? AND username = ? AND {column} = ? LIMIT 1",
+            (*account, value)
+        )
+        return dict(rows[0]) if rows else None
+
+    def files(self, account: Tuple[str, str], course_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Files an account has downloaded, optionally of one course"""
+        sql = f"SELECT {', '.join(_FILE_FIELDS)} FROM files WHERE base_url = ? AND username = ?"
+        params: Tuple[Any, ...] = account
+        if course_id:
+            sql += " AND course_id = ?"
+            params += (course_id,)
+        return [dict(row) for row in self._query(sql + " ORDER BY course_id, url", params)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Download outcomes and bytes so far, and what the index holds"""
+        row = self._query("SELECT COUNT(*) AS refs, COUNT(DISTINCT sha256) AS objects FROM files")[0]
+        with self._lock:
+            return {
+                "root": self.root,
+                "concurrency": self.concurrency,
+                "max_bytes_per_second": self.limiter.bytes_per_second,
+                **self._counts,
+                "resumed": self._resumed,
+                "bytes_downloaded": self._bytes,
+                "indexed_urls": row["refs"],
+                "stored_files": row["objects"],
+            }
+
+    def shutdown(self):
+        """Stop the download threads (running downloads finish) and close the index"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._conn.close()
+
+    # Internal helpers
+
+    @contextmanager
+    def _url_lock(self, key: str) -> Iterator[None]:
+        with self._lock:
+            entry = self._url_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._url_locks[key]
+
+    def _finish(self, result: Dict[str, Any], status: str) -> Dict[str, Any]:
+        result["status"] = status
+        with self._lock:
+            self._counts[status] += 1
+            self._resumed += result["resumed"]
+        return result
+
+    def _fetch(self, key: str, url: str, cookie_header: str, base_url: str) -> _Fetched:
+        """
+        Stream a resource file into its partial file, resuming what an earlier attempt left
+
+        The session cookie is only sent to base_url's origin; redirects to
+        other hosts (file storage, external links) are followed without it.
+
+        Raises:
+            DownloadError: The URL led to a page without a file, or the session has expired
+            httpx.HTTPError: Connection or HTTP status error (the partial file is kept)
+        """
+        part = os.path.join(self._partial, key + ".part")
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        meta = self._read_meta(part) if offset else {}
+        # Resume against the file URL the redirect led to last time
+        target = meta.get("url") or direct_url(url)
+        if not meta:
+            offset = 0
+
+        for _ in range(_MAX_HOPS + 1):
+            moodle = same_origin(target, base_url)
+            headers = {"Cookie": cookie_header} if moodle else {}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                validator = _if_range(meta.get("etag"), meta.get("last_modified"))
+                if validator:
+                    headers["If-Range"] = validator
+
+            # Redirects are followed here: httpx drops a per-request Cookie header on redirect
+            with self.client.stream("GET", target, headers=headers, follow_redirects=False) as response:
+                if response.is_redirect:
+                    target = urljoin(str(response.url), response.headers["location"])
+                    continue
+                if response.status_code == 416:
+                    # The partial file is no prefix of the current file; start over
+                    offset, meta = 0, {}
+                    continue
+                response.raise_for_status()
+
+                disposition = response.headers.get("content-disposition")
+                content_type = response.headers.get("content-type", "").split(";")[0].strip()
+                if content_type == "text/html" and not disposition:
+                    if not moodle:
+                        raise DownloadError(f"Not a file: {response.url}")
+                    html = response.read().decode(response.encoding or "utf-8", errors="replace")
+                    if not is_logged_in(html):
+                        raise DownloadError(f"Moodle session expired (got {response.url})")
+                    link = parse_resource_link(html, str(response.url))
+                    if not link:
+                        raise DownloadError(f"No file found on {response.url}")
+                    target, offset, meta = link, 0, {}
+                    continue
+
+                resumed = offset > 0 and response.status_code == 206
+                if not resumed:
+                    # A 200 carries the whole file (no partial, or it changed since)
+                    offset = 0
+
+                filename = content_disposition_filename(disposition) \
+                    or unquote(urlparse(str(response.url)).path.rsplit("/", 1)[-1]) or "download"
+                self._write_meta(part, {
+                    "url": str(response.url),
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
+                })
+
+                hasher = hashlib.sha256()
+                if resumed:
+                    self._hash_prefix(part, offset, hasher)
+                size = offset
+                with open(part, "ab" if resumed else "wb") as f:
+                    for chunk in response.iter_bytes(self.chunk_size):
+                        self.limiter.consume(len(chunk))
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        size += len(chunk)
+                        with self._lock:
+                            self._bytes += len(chunk)
+
+                total = _total_size(response)
+                if total is not None and size != total:
+                    raise DownloadError(f"Incomplete download: {size} of {total} bytes")
+
+                return _Fetched(part, hasher.hexdigest(), size, filename, content_type, resumed)
+
+        raise DownloadError(f"No file found behind {url}")
+
+    def _store(self, fetched: _Fetched) -> str:
+        """
+        Move a finished download into objects/ under its hash
+
+        Returns:
+            "downloaded", or "deduplicated" when the content was already stored
+        """
+        path = self.object_path(fetched.sha256)
+        if os.path.exists(path):
+            os.remove(fetched.path)
+            status = "deduplicated"
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(fetched.path, path)
+            status = "downloaded"
+        try:
+            os.remove(fetched.path + ".json")
+        except FileNotFoundError:
+            pass
+        return status
+
+    def _index(self, account: Tuple[str, str], result: Dict[str, Any]):
+        record = {**result, "downloaded_at": datetime.now().isoformat()}
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO files (base_url, username, {', '.join(_FILE_FIELDS)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in _FILE_FIELDS)})",
+                (*account, *(record[field] for field in _FILE_FIELDS))
+            )
+
+    def _query(self, sql: str, params: Tuple[Any, ...] = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _hash_prefix(path: str, size: int, hasher):
+        """Feed the first size bytes of a partial file into the hash"""
+        with open(path, "rb") as f:
+            remaining = size
+            while remaining > 0:
+                block = f.read(min(_HASH_BLOCK, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+
+    @staticmethod
+    def _read_meta(part: str) -> Dict[str, Any]:
+        try:
+            with open(part + ".json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_meta(part: str, meta: Dict[str, Any]):
+        tmp = part + ".json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, part + ".json")
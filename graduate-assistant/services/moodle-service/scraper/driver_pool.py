@@ -0,0 +1,317 @@
+"""
+Bounded pool of pre-launched Chrome WebDriver instances
+
+Launching Chrome is the most expensive part of every scrape, so the service
+keeps a small set of warm drivers around and hands them out per request.
+Drivers are health-checked on checkout and recycled after serving a number
+of pages or when the browser process tree grows past an RSS limit.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+import psutil
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no driver becomes available within the acquire timeout"""
+
+
+class DriverLease:
+    """A driver checked out of the pool, with per-checkout page accounting"""
+
+    def __init__(self, driver: webdriver.Chrome, pooled: "_PooledDriver", pool: "DriverPool"):
+        self.driver = driver
+        self.pages = 0
+        self._pooled = pooled
+        self._pool = pool
+
+    def mark_page(self, profile: Optional[str] = None, transfer_bytes: int = 0, seconds: float = 0.0):
+        """
+        Record one page load on this lease
+
+        Args:
+            profile: Browser profile active during the load (for per-profile stats)
+            transfer_bytes: Bytes transferred by the page and its subresources
+            seconds: Time the load took
+        """
+        self.pages += 1
+        if profile:
+            self._pool._record_page(profile, transfer_bytes, seconds)
+
+
+class _PooledDriver:
+    """Bookkeeping for a live driver owned by the pool"""
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.pages_served = 0
+        self.created_at = time.monotonic()
+
+
+class DriverPool:
+    """Thread-safe, bounded pool of warm Chrome drivers"""
+
+    def __init__(
+        self,
+        driver_factory: Callable[[], webdriver.Chrome],
+        max_size: int = 4,
+        min_size: int = 1,
+        max_pages: int = 50,
+        max_rss_mb: Optional[int] = 1024,
+        acquire_timeout: float = 60.0,
+        profile: Optional[str] = None,
+    ):
+        """
+        Initialize driver pool
+
+        Args:
+            driver_factory: Callable that launches a new Chrome driver
+            max_size: Maximum number of live drivers (idle + checked out)
+            min_size: Number of drivers launched by start()
+            max_pages: Recycle a driver after it has loaded this many pages
+            max_rss_mb: Recycle a driver when its process tree exceeds this RSS (None disables)
+            acquire_timeout: Default seconds to wait for a free driver
+            profile: Launch profile of the drivers, reported in stats
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.driver_factory = driver_factory
+        self.max_size = max_size
+        self.min_size = min(min_size, max_size)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.acquire_timeout = acquire_timeout
+        self.profile = profile
+
+        self._idle: Deque[_PooledDriver] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._launched = 0
+        self._recycled = 0
+        self._unhealthy = 0
+        # profile -> [pages, bytes, seconds]
+        self._page_loads: Dict[str, list] = {}
+
+    def start(self):
+        """Pre-launch min_size drivers"""
+        for _ in range(self.min_size):
+            with self._cond:
+                if self._size >= self.max_size:
+                    break
+                self._size += 1
+
+            try:
+                pooled = self._launch()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def acquire(self, timeout: Optional[float] = None) -> DriverLease:
+        """
+        Check out a healthy driver, launching one if the pool has room
+
+        Args:
+            timeout: Seconds to wait for a free driver (defaults to acquire_timeout)
+
+        Returns:
+            Lease wrapping the checked-out driver
+
+        Raises:
+            PoolTimeoutError: If no driver became available in time
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            pooled = None
+            launch = False
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is shut down")
+                    if self._idle:
+                        pooled = self._idle.popleft()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        launch = True
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No WebDriver available within {timeout:g}s "
+                            f"(pool size {self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+                self._in_use += 1
+
+            if launch:
+                try:
+                    pooled = self._launch()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+                return DriverLease(pooled.driver, pooled, self)
+
+            if self._is_healthy(pooled):
+                return DriverLease(pooled.driver, pooled, self)
+
+            # Dead driver: drop it and try again with the freed slot
+            self._unhealthy += 1
+            self._discard(pooled)
+
+    def release(self, lease: DriverLease):
+        """
+        Return a leased driver to the pool, recycling it if it is worn out
+
+        Args:
+            lease: Lease previously returned by acquire()
+        """
+        pooled = lease._pooled
+        pooled.pages_served += lease.pages
+
+        if self._closed or self._should_recycle(pooled) or not self._reset(pooled):
+            self._recycled += 1
+            self._discard(pooled)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[DriverLease]:
+        """Context manager around acquire()/release()"""
+        lease = self.acquire(timeout)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current pool utilization counters"""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "launched": self._launched,
+                "recycled": self._recycled,
+                "unhealthy": self._unhealthy,
+                "profile": self.profile,
+                "page_loads": {
+                    profile: {
+                        "pages": pages,
+                        "bytes": transferred,
+                        "load_seconds": round(seconds, 3),
+                        "avg_bytes": int(transferred / pages),
+                        "avg_load_ms": int(seconds / pages * 1000),
+                    }
+                    for profile, (pages, transferred, seconds) in self._page_loads.items()
+                },
+            }
+
+    def _record_page(self, profile: str, transfer_bytes: int, seconds: float):
+        with self._cond:
+            totals = self._page_loads.setdefault(profile, [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += transfer_bytes
+            totals[2] += seconds
+
+    def shutdown(self):
+        """Quit all idle drivers; checked-out drivers are quit on release"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        for pooled in idle:
+            self._quit(pooled)
+
+    # Internal helpers
+
+    def _launch(self) -> _PooledDriver:
+        driver = self.driver_factory()
+        self._launched += 1
+        return _PooledDriver(driver)
+
+    def _discard(self, pooled: _PooledDriver):
+        self._quit(pooled)
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _quit(pooled: _PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(pooled: _PooledDriver) -> bool:
+        try:
+            return pooled.driver.execute_script("return 1") == 1
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def _reset(pooled: _PooledDriver) -> bool:
+        """Clear per-user state so the next lease starts from a clean browser"""
+        try:
+            pooled.driver.delete_all_cookies()
+            pooled.driver.get("about:blank")
+            return True
+        except WebDriverException:
+            return False
+
+    def _should_recycle(self, pooled: _PooledDriver) -> bool:
+        if self.max_pages and pooled.pages_served >= self.max_pages:
+            return True
+        if self.max_rss_mb is not None and self._rss_mb(pooled) > self.max_rss_mb:
+            return True
+        return False
+
+    @staticmethod
+    def _rss_mb(pooled: _PooledDriver) -> float:
+        """Resident memory of chromedriver plus every Chrome process it spawned"""
+        try:
+            root = psutil.Process(pooled.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+        except (AttributeError, psutil.Error):
+            return 0.0
+
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
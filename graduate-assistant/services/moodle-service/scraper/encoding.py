@@ -0,0 +1,215 @@
+"""
+Fast, compact encodings for API responses and saved results
+
+Sync payloads grow with the number of courses and activities. Encoding them
+costs time, and sending them costs bytes. This module provides:
+
+- dumps_json: compact JSON, through orjson when it is installed
+- FastJSONResponse: the app's default response class, built on dumps_json
+- MessagePack bodies for clients that ask for them with an Accept header
+- CompressionMiddleware: brotli or gzip for bodies above a size threshold
+
+orjson, msgpack and brotli are optional. Without them, JSON falls back to
+the standard library, MessagePack is not offered, and gzip is used for
+compression.
+"""
+
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Accept values that select MessagePack ("application/x-msgpack" is the older name)
+_MSGPACK_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+# Content types worth compressing
+_COMPRESSIBLE = ("application/json", "application/msgpack", "text/", "application/x-ndjson")
+
+
+def dumps_json(value: Any) -> bytes:
+    """Compact UTF-8 JSON (orjson when installed, else the json module)"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(value: Any) -> bytes:
+    """
+    MessagePack encoding
+
+    Raises:
+        RuntimeError: If msgpack is not installed
+    """
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(value, use_bin_type=True)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps_json"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def _accepted(header: Optional[str]) -> Dict[str, float]:
+    """Media types or codings of an Accept-style header with their q values"""
+    accepted = {}
+    for item in (header or "").split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name.lower()] = q
+    return accepted
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """
+    Pick MessagePack when the client prefers it and msgpack is installed, else JSON
+
+    MessagePack is opt-in: it is only chosen when the client names it with a
+    higher q than JSON (or names it and not JSON). */* and a missing Accept
+    header mean JSON.
+    """
+    if msgpack is None:
+        return JSON_MEDIA_TYPE
+
+    accepted = _accepted(accept)
+    msgpack_q = max((accepted.get(media_type, 0.0) for media_type in _MSGPACK_TYPES), default=0.0)
+    json_q = accepted.get(JSON_MEDIA_TYPE, 0.0)
+    return MSGPACK_MEDIA_TYPE if msgpack_q > 0 and msgpack_q > json_q else JSON_MEDIA_TYPE
+
+
+def negotiated_response(accept: Optional[str], content: Any, status_code: int = 200) -> Response:
+    """
+    Response encoded as JSON or MessagePack according to the Accept header
+
+    Args:
+        accept: Request Accept header
+        content: JSON-compatible value (e.g. model_dump(mode="json"))
+    """
+    media_type = negotiate_media_type(accept)
+    body = dumps_msgpack(content) if media_type == MSGPACK_MEDIA_TYPE else dumps_json(content)
+    return Response(content=body, status_code=status_code, media_type=media_type, headers={"Vary": "Accept"})
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Preferred coding the client accepts: br (when installed) before gzip"""
+    accepted = _accepted(accept_encoding)
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, coding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    """Compress a body with br or gzip"""
+    if coding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress complete response bodies of at least min_bytes with br or gzip
+
+    Streamed responses (NDJSON, SSE) are passed through untouched so every
+    record still reaches the client as soon as it is scraped. ETags of
+    compressed responses are made weak, since the bytes differ from the
+    identity encoding while the content is the same.
+    """
+
+    def __init__(self, app, min_bytes: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Dict[str, Any]] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if message.get("more_body") or not self._compressible(headers, body):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, coding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                headers["ETag"] = "W/" + headers["etag"]
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, headers: MutableHeaders, body: bytes) -> bool:
+        if len(body) < self.min_bytes or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(_COMPRESSIBLE)
+
+
+def available_encodings() -> Tuple[List[str], List[str]]:
+    """(Response formats, compression codings) usable with the installed packages"""
+    formats = ["json"] + (["msgpack"] if msgpack is not None else [])
+    codings = ["gzip"] + (["br"] if brotli is not None else [])
+    return formats, codings
@@ -0,0 +1,94 @@
+"""作業截止時間與繳交狀態的批次補齊：由彙整頁面一次取得多個作業的資訊，再以課程模組 ID 對應回作業"""
+from typing import Iterable, List, Dict, Any, Optional
+
+from .parsers import assign_cmid
+
+# 補齊的欄位
+ASSIGNMENT_INFO_FIELDS = ('due_date', 'status')
+
+
+def assignment_cmids(courses: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    列出每門課程中作業活動的課程模組 ID
+
+    Args:
+        courses: 包含章節內容的課程
+
+    Returns:
+        課程 ID 對應作業的課程模組 ID（沒有作業的課程不列出）
+    """
+    by_course: Dict[str, List[str]] = {}
+    for course in courses:
+        for section in course.get('sections', []):
+            for activity in section.get('activities', []):
+                if activity.get('type') != 'assignment':
+                    continue
+                cmid = assign_cmid(activity.get('url', ''))
+                if cmid:
+                    by_course.setdefault(str(course.get('id')), []).append(cmid)
+    return by_course
+
+
+def merge_assignment_info(*sources: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    合併多個來源的作業資訊，每個欄位採用第一個有值的來源
+
+    Args:
+        *sources: 依優先順序排列的 課程模組 ID 對應 {due_date, status}
+
+    Returns:
+        課程模組 ID 對應合併後的 {due_date, status}
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for source in sources:
+        for cmid, info in source.items():
+            target = merged.setdefault(cmid, {})
+            for field in ASSIGNMENT_INFO_FIELDS:
+                if target.get(field) is None and info.get(field) is not None:
+                    target[field] = info[field]
+    return merged
+
+
+def is_complete(info: Optional[Dict[str, Any]]) -> bool:
+    """作業資訊是否已有截止時間與繳交狀態"""
+    return bool(info) and all(info.get(field) is not None for field in ASSIGNMENT_INFO_FIELDS)
+
+
+def enrich_record(record: Dict[str, Any], info: Dict[str, Dict[str, Any]]) -> bool:
+    """
+    以作業連結對應的資訊補上 due_date 與 status（已有的值不覆寫）
+
+    Args:
+        record: 作業活動或作業，需有 url
+        info: 課程模組 ID 對應 {due_date, status}
+
+    Returns:
+        是否找到對應的資訊
+    """
+    found = info.get(assign_cmid(record.get('url', '')) or '')
+    if not found:
+        return False
+    for field in ASSIGNMENT_INFO_FIELDS:
+        if record.get(field) is None and found.get(field) is not None:
+            record[field] = found[field]
+    return True
+
+
+def apply_assignment_info(courses: Iterable[Dict[str, Any]], info: Dict[str, Dict[str, Any]]) -> int:
+    """
+    將作業資訊寫入課程中的作業活動
+
+    Args:
+        courses: 包含章節內容的課程
+        info: 課程模組 ID 對應 {due_date, status}
+
+    Returns:
+        補齊的作業數
+    """
+    enriched = 0
+    for course in courses:
+        for section in course.get('sections', []):
+            for activity in section.get('activities', []):
+                if activity.get('type') == 'assignment' and enrich_record(activity, info):
+                    enriched += 1
+    return enriched
@@ -0,0 +1,98 @@
+"""
+Dedicated executor for blocking scrape work
+
+Selenium and the HTTP scrapers are synchronous. Running them directly in an
+async endpoint blocks the event loop, so every scrape is handed to a bounded
+thread pool instead. Work beyond the running workers waits in a queue of
+limited depth; once that is full new work is rejected immediately so the API
+can answer 503 instead of piling up requests.
+
+Threads (not processes) are used on purpose: the work is I/O bound on
+chromedriver and Moodle, and the shared WebDriver pool, session store and
+HTTP client live in this process.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when the scrape queue is full"""
+
+
+class ScrapeExecutor:
+    """Bounded thread pool with queue-depth backpressure"""
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16):
+        """
+        Initialize executor
+
+        Args:
+            max_workers: Number of scrapes running at the same time
+            max_queue: Number of scrapes allowed to wait for a free worker
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+
+    def _reserve(self):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorBusyError(
+                    f"Scrape queue is full ({self.max_workers} running, {self.max_queue} queued)"
+                )
+            self._pending += 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the scrape pool without blocking the event loop
+
+        The slot is held until the thread finishes, even when the awaiting
+        request is cancelled first (the thread cannot be interrupted).
+
+        Raises:
+            ExecutorBusyError: If the queue is full
+        """
+        future = self.submit(fn, *args, **kwargs)
+        return await asyncio.wrap_future(future)
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Schedule a blocking callable in the background
+
+        Raises:
+            ExecutorBusyError: If the queue is full
+        """
+        self._reserve()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load counters"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": min(self._pending, self.max_workers),
+                "queued": max(0, self._pending - self.max_workers),
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self):
+        """Stop accepting work and wait for running scrapes to finish"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,193 @@
+"""
+Content fingerprints of synced data and the changes between two syncs
+
+A sync snapshot keeps one short hash per course (metadata and contents), per
+section and per activity, plus one per assignment. Comparing the snapshot of
+a previous sync with the current one yields only what was added, changed or
+removed. Unchanged courses are skipped by their contents hash, and inside a
+changed course only the activities of changed sections are compared.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+
+def content_hash(value: Any) -> str:
+    """Stable short hash of a JSON-serializable value (key order does not matter)"""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def activity_key(activity: Dict[str, Any]) -> str:
+    """Identity of an activity within a course (its URL carries the Moodle cmid)"""
+    return activity.get("url") or f"{activity.get('type', '')}:{activity.get('name', '')}"
+
+
+def activity_record(course_id: str, section_name: str, activity: Dict[str, Any]) -> Dict[str, Any]:
+    """Flattened activity as it appears in a change set"""
+    return {"course_id": course_id, "section_name": section_name, **activity}
+
+
+def course_metadata(course: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in course.items() if key != "contents"}
+
+
+def build_snapshot(courses: List[Dict[str, Any]], assignments: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fingerprint a converted sync result
+
+    Args:
+        courses: Courses as returned by sync (convert_course plus "contents")
+        assignments: Assignments as returned by sync (convert_assignment)
+
+    Returns:
+        Snapshot of hashes, small enough to keep per cursor
+    """
+    return {
+        "courses": {course["id"]: fingerprint_course(course) for course in courses},
+        "assignments": {assignment["id"]: content_hash(assignment) for assignment in assignments},
+    }
+
+
+def fingerprint_course(course: Dict[str, Any]) -> Dict[str, Any]:
+    """Hashes of one converted course: metadata, whole contents, each section and each activity"""
+    contents = course.get("contents", [])
+    activities = {}
+    for section in contents:
+        for activity in section["activities"]:
+            activities[activity_key(activity)] = content_hash(
+                activity_record(course["id"], section["section_name"], activity)
+            )
+
+    return {
+        "metadata": content_hash(course_metadata(course)),
+        "contents": content_hash(contents),
+        "sections": [content_hash(section) for section in contents],
+        "activities": activities,
+    }
+
+
+def _empty_changes() -> Dict[str, List[Any]]:
+    return {"added": [], "changed": [], "removed": []}
+
+
+def diff_snapshots(
+    previous: Dict[str, Any],
+    current: Dict[str, Any],
+    courses: List[Dict[str, Any]],
+    assignments: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Changes from a previous snapshot to the current sync result
+
+    Args:
+        previous: Snapshot stored for the client's cursor
+        current: build_snapshot() of courses and assignments
+        courses: Current converted courses
+        assignments: Current converted assignments
+
+    Returns:
+        {"courses", "activities", "assignments"}, each with "added" and
+        "changed" records and "removed" ids. Added and changed courses carry
+        metadata only; their activities are listed under "activities".
+        Removed activities are {"course_id", "url"} references; activities of
+        removed courses are not listed.
+    """
+    changes = {
+        "courses": _empty_changes(),
+        "activities": _empty_changes(),
+        "assignments": _empty_changes(),
+    }
+
+    for course in courses:
+        course_id = course["id"]
+        now = current["courses"][course_id]
+        before: Optional[Dict[str, Any]] = previous["courses"].get(course_id)
+
+        if before is None:
+            changes["courses"]["added"].append(course_metadata(course))
+            for section in course.get("contents", []):
+                for activity in section["activities"]:
+                    changes["activities"]["added"].append(
+                        activity_record(course_id, section["section_name"], activity)
+                    )
+            continue
+
+        if now["metadata"] != before["metadata"]:
+            changes["courses"]["changed"].append(course_metadata(course))
+        if now["contents"] == before["contents"]:
+            continue
+
+        # Activities of unchanged sections are unchanged; only look inside the others
+        for index, section in enumerate(course.get("contents", [])):
+            if index < len(before["sections"]) and before["sections"][index] == now["sections"][index]:
+                continue
+            for activity in section["activities"]:
+                key = activity_key(activity)
+                if key not in before["activities"]:
+                    bucket = "added"
+                elif before["activities"][key] != now["activities"][key]:
+                    bucket = "changed"
+                else:
+                    continue
+                changes["activities"][bucket].append(activity_record(course_id, section["section_name"], activity))
+
+        for key in before["activities"].keys() - now["activities"].keys():
+            changes["activities"]["removed"].append({"course_id": course_id, "url": key})
+
+    for course_id in previous["courses"]:
+        if course_id not in current["courses"]:
+            # Its activities go with it and are not listed separately
+            changes["courses"]["removed"].append(course_id)
+
+    for assignment in assignments:
+        before_hash = previous["assignments"].get(assignment["id"])
+        if before_hash is None:
+            changes["assignments"]["added"].append(assignment)
+        elif before_hash != current["assignments"][assignment["id"]]:
+            changes["assignments"]["changed"].append(assignment)
+    changes["assignments"]["removed"] = sorted(previous["assignments"].keys() - current["assignments"].keys())
+
+    return changes
+
+
+def reconcile(
+    known_courses: Dict[str, str],
+    known_assignments: Dict[str, str],
+    courses: List[Dict[str, Any]],
+    assignments: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Compare a client's stored hashes with the current sync result
+
+    Course hashes cover the converted course including its contents;
+    assignment hashes cover the converted assignment.
+
+    Args:
+        known_courses: Course id -> hash the client has stored
+        known_assignments: Assignment id -> hash the client has stored
+        courses: Current converted courses
+        assignments: Current converted assignments
+
+    Returns:
+        Entities whose hash differs (new or changed) as {"id", "hash", "data"},
+        ids the client has but Moodle no longer does, and unchanged counts
+    """
+    result: Dict[str, Any] = {}
+    for kind, known, entities in (
+        ("courses", known_courses, courses),
+        ("assignments", known_assignments, assignments),
+    ):
+        differing = []
+        current_ids = set()
+        for entity in entities:
+            current_ids.add(entity["id"])
+            digest = content_hash(entity)
+            if known.get(entity["id"]) != digest:
+                differing.append({"id": entity["id"], "hash": digest, "data": entity})
+
+        result[kind] = differing
+        result[f"deleted_{kind}"] = sorted(known.keys() - current_ids)
+        result[f"unchanged_{kind}"] = len(entities) - len(differing)
+    return result
@@ -0,0 +1,369 @@
+"""HTTP 爬蟲引擎：瀏覽器只負責 SSO 登入，課程頁面以 HTTP 抓取並解析"""
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Callable, List, Dict, Any, Optional, Tuple
+
+import httpx
+
+from .ajax import AjaxError, collect_enrolled_courses, parse_sesskey, service_url
+from .driver_pool import DriverPool
+from .moodle_scraper import MoodleScraper
+from .parsers import ParseError, is_logged_in, parse_course_list, parse_course_sections
+from .session_store import SessionStore
+
+
+class SessionExpiredError(ParseError):
+    """HTTP 回應不是已登入頁面（cookie 失效或被導回登入頁）"""
+
+
+# 以 session cookie 抓取頁面時最多跟隨的轉址次數
+MAX_REDIRECTS = 10
+
+
+def create_http_client() -> httpx.Client:
+    """
+    建立可共用的 keep-alive HTTP client
+
+    client 不保存任何 Set-Cookie（cookie jar 拒絕所有網域），cookie 一律由
+    呼叫端以每個請求的 Cookie header 傳遞，因此可供多個帳號共用。
+    httpx 自動跟隨轉址時會丟棄請求的 Cookie header，需要 session 的請求
+    必須關閉 follow_redirects 並自行轉址（見 HttpMoodleScraper._fetch）。
+
+    Returns:
+        httpx Client
+    """
+    return httpx.Client(
+        follow_redirects=True,
+        cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+        timeout=httpx.Timeout(20.0),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        headers={'User-Agent': 'Mozilla/5.0 (compatible; moodle-integration-service)'}
+    )
+
+
+def same_origin(url: str, base_url: str) -> bool:
+    """
+    URL 是否與 Moodle 網站同源（scheme、host、port 皆相同）
+
+    只有同源的請求才能帶上 session cookie，避免轉址到外部網站時洩漏 MoodleSession。
+    """
+    a, b = httpx.URL(url), httpx.URL(base_url)
+    return (a.scheme, a.host, a.port) == (b.scheme, b.host, b.port)
+
+
+class HttpMoodleScraper(MoodleScraper):
+    """以 HTTP 抓取頁面的 Moodle 爬蟲（HTML 解析失敗時改用 Selenium）"""
+
+    engine = 'http'
+
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        password: str,
+        headless: bool = True,
+        pool: Optional[DriverPool] = None,
+        session_store: Optional[SessionStore] = None,
+        client: Optional[httpx.Client] = None,
+        fallback: bool = True,
+        concurrency: int = 1,
+        profile: str = 'lean',
+        login_profile: str = 'full',
+        wait_timeouts: Optional[Dict[str, float]] = None
+    ):
+        """
+        初始化爬蟲
+
+        Args:
+            base_url: Moodle 網站基礎 URL
+            username: 登入帳號
+            password: 登入密碼
+            headless: 是否使用無頭模式（SSO 登入與 fallback 使用）
+            pool: 共用的 WebDriver 池
+            session_store: 已登入 session 的儲存區
+            client: 共用的 HTTP client（未提供時自行建立）
+            fallback: HTML 解析失敗時是否改用 Selenium
+            concurrency: 同時抓取的課程頁數量上限
+            profile: Selenium fallback 爬取頁面時的瀏覽器設定檔
+            login_profile: SSO 登入時的瀏覽器設定檔
+            wait_timeouts: 各等待步驟的上限秒數（SSO 登入與 fallback 使用）
+        """
+        super().__init__(
+            base_url, username, password, headless,
+            pool=pool, session_store=session_store, concurrency=concurrency,
+            profile=profile, login_profile=login_profile, wait_timeouts=wait_timeouts
+        )
+        self.client = client
+        self.fallback = fallback
+        self._owns_client = client is None
+        self._cookie_header = ""
+        self._sesskey: Optional[str] = None
+
+    def start(self, acquire_timeout: Optional[float] = None):
+        """準備 HTTP client（瀏覽器只在需要登入時才啟動）"""
+        if self.client is None:
+            self.client = create_http_client()
+        print("✓ HTTP 引擎已就緒")
+
+    def close(self):
+        """歸還瀏覽器並關閉自行建立的 HTTP client"""
+        super().close()
+        if self._owns_client and self.client:
+            self.client.close()
+            self.client = None
+
+    def login(self, fresh: bool = False) -> bool:
+        """
+        登入 Moodle：先以已儲存的 cookie 驗證，失效時才啟動瀏覽器走 SSO
+
+        Args:
+            fresh: 不沿用已儲存的 session，一律以帳號密碼完整登入
+
+        Returns:
+            是否登入成功
+        """
+        if not fresh and self._restore_http_session():
+            return True
+        if not self.password:
+            # 沒有密碼就無法走 SSO，不必為此借用瀏覽器
+            print("✗ 已儲存的 session 失效，且未提供密碼")
+            return False
+
+        self._start_browser()
+        if not self.full_login():
+            return False
+
+        self._use_cookies(self.driver.get_cookies())
+        # 登入完成後立即歸還瀏覽器，之後的頁面都走 HTTP
+        MoodleScraper.close(self)
+        return True
+
+    def get_courses(self) -> List[Dict[str, Any]]:
+        """
+        獲取所有課程列表
+
+        Returns:
+            課程列表，每個課程包含 id, name, url
+        """
+        try:
+            courses_url = f"{self.base_url}/my/"
+            print(f"→ 正在獲取課程列表（HTTP）: {courses_url}")
+            html, url = self._fetch(courses_url)
+            courses = self._get_enrolled_courses_ajax(html)
+            if courses is None:
+                courses = parse_course_list(html, url)
+            print(f"✓ 找到 {len(courses)} 門課程")
+            return courses
+
+        except (ParseError, httpx.HTTPError) as e:
+            if not self.fallback:
+                print(f"✗ 獲取課程列表失敗: {e}")
+                return []
+            print(f"→ HTML 解析失敗（{e}），改用 Selenium")
+            if not self._ensure_browser():
+                return []
+            return MoodleScraper.get_courses(self)
+
+    def get_course_content(self, course: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        獲取課程內容（章節、活動、資源）
+
+        Args:
+            course: 課程資訊字典
+
+        Returns:
+            包含完整章節內容的課程資訊
+        """
+        try:
+            return self._load_course_page(course)
+        except Exception as e:
+            print(f"✗ 解析課程內容失敗: {e}")
+            course['error'] = str(e)
+            return course
+
+    def _load_course_page(self, course: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        以 HTTP 載入並解析課程頁，失敗時改用 Selenium（錯誤直接拋出）
+
+        Raises:
+            ParseError: 頁面上沒有課程章節（SessionExpiredError：未登入）
+            httpx.HTTPError: 連線或 HTTP 狀態錯誤
+        """
+        try:
+            print(f"→ 正在解析課程（HTTP）: {course['name']}")
+            html, url = self._fetch(course['url'])
+            self._last_html = html
+            course['sections'].extend(parse_course_sections(html, url))
+            print(f"✓ 解析完成: 找到 {len(course['sections'])} 個章節")
+            return course
+
+        except (ParseError, httpx.HTTPError) as e:
+            if not self.fallback:
+                raise
+            print(f"→ HTML 解析失敗（{e}），改用 Selenium")
+            if not self._ensure_browser():
+                raise
+            return MoodleScraper._load_course_page(self, course)
+
+    @staticmethod
+    def _is_missing_course(error: Exception) -> bool:
+        """課程頁回應 403/404 或沒有章節時視為找不到課程；未登入與其他連線錯誤是載入失敗"""
+        if isinstance(error, SessionExpiredError):
+            return False
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in (403, 404)
+        return MoodleScraper._is_missing_course(error)
+
+    def cookie_header(self) -> Optional[str]:
+        """目前 HTTP session 的 Cookie header（登入後才有）"""
+        return self._cookie_header or None
+
+    # 內部輔助方法
+
+    def _get_enrolled_courses_ajax(self, html: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        以頁面中的 sesskey 呼叫課程總覽 AJAX API
+
+        Args:
+            html: 已登入頁面的 HTML
+
+        Returns:
+            課程列表，舊版 Moodle 或呼叫失敗時回傳 None
+        """
+        self._sesskey = parse_sesskey(html)
+        call = self._ajax_caller()
+        if call is None:
+            return None
+
+        try:
+            return collect_enrolled_courses(call, self.base_url)
+        except (AjaxError, httpx.HTTPError, ValueError) as e:
+            print(f"→ 課程總覽 API 無法使用（{e}），改為解析頁面")
+            return None
+
+    def _ajax_caller(self) -> Optional[Callable[[str], Any]]:
+        """
+        以 session cookie 建立呼叫 lib/ajax/service.php 的函式
+
+        尚未取得 sesskey 時先抓取儀表板頁面。
+
+        Returns:
+            接收請求內容、回傳已解碼 JSON 回應的函式；舊版 Moodle 沒有 sesskey 時回傳 None
+        """
+        if not self._sesskey:
+            try:
+                html, _ = self._fetch(f"{self.base_url}/my/")
+            except (ParseError, httpx.HTTPError):
+                return None
+            self._sesskey = parse_sesskey(html)
+            if not self._sesskey:
+                return None
+
+        url = service_url(self.base_url, self._sesskey)
+
+        def call(body: str) -> Any:
+            response = self.client.post(
+                url,
+                content=body,
+                headers={'Cookie': self._cookie_header, 'Content-Type': 'application/json'}
+            )
+            response.raise_for_status()
+            return response.json()
+
+        return call
+
+    def yield_browser(self) -> bool:
+        """Selenium fallback 的瀏覽器用完時間片且其他帳號在等待時直接歸還，需要時再重新借用"""
+        should_yield = getattr(self.pool, 'should_yield', None)
+        if self._lease and should_yield and should_yield(self._lease.pages):
+            MoodleScraper.close(self)
+        return True
+
+    def _load_page(self, url: str) -> Tuple[str, str]:
+        """以 HTTP 抓取頁面（作業總覽與行事曆頁不需瀏覽器）"""
+        return self._fetch(url)
+
+    def _spawn_worker(self) -> "HttpMoodleScraper":
+        """建立共用 HTTP client 與 session cookie 的 worker（不需瀏覽器）"""
+        worker = HttpMoodleScraper(
+            self.base_url,
+            self.username,
+            self.password,
+            self.headless,
+            pool=self.pool,
+            session_store=self.session_store,
+            client=self.client,
+            fallback=self.fallback,
+            profile=self.profile,
+            login_profile=self.login_profile,
+            wait_timeouts=self.waits.timeouts
+        )
+        worker._cookie_header = self._cookie_header
+        return worker
+
+    def _fetch(self, url: str) -> Tuple[str, str]:
+        """
+        以 session cookie 抓取頁面
+
+        Returns:
+            (HTML, 最終 URL)
+
+        Raises:
+            SessionExpiredError: 回應不是已登入頁面
+            httpx.HTTPError: 連線或 HTTP 狀態錯誤
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            # 自行轉址：每一步都重新附上本帳號的 cookie，但只送往 Moodle 本身
+            headers = {'Cookie': self._cookie_header} if same_origin(url, self.base_url) else {}
+            response = self.client.get(url, headers=headers, follow_redirects=False)
+            if not response.is_redirect:
+                break
+            url = str(response.url.join(response.headers['location']))
+        else:
+            raise httpx.TooManyRedirects(f"轉址超過 {MAX_REDIRECTS} 次: {url}", request=response.request)
+
+        response.raise_for_status()
+        if not is_logged_in(response.text):
+            raise SessionExpiredError(f"未登入狀態: {response.url}")
+        return response.text, str(response.url)
+
+    def _use_cookies(self, cookies: List[Dict[str, Any]]):
+        self._cookie_header = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+
+    def _restore_http_session(self) -> bool:
+        """以已儲存的 cookie 驗證 session（不啟動瀏覽器）"""
+        session = self._stored_session()
+        if not session:
+            return False
+
+        self._use_cookies(session.cookies)
+        try:
+            self._fetch(f"{self.base_url}/my/")
+        except SessionExpiredError:
+            print("→ 已儲存的 session 已失效，重新登入")
+            self.session_store.invalidate(self.base_url, self.username)
+            return False
+        except httpx.HTTPError:
+            print("→ 無法驗證已儲存的 session，重新登入")
+            return False
+
+        self.session_id = session.handle
+        print("✓ 已沿用既有 session（HTTP）")
+        return True
+
+    def _start_browser(self):
+        if not self.driver:
+            MoodleScraper.start(self)
+
+    def _ensure_browser(self) -> bool:
+        """啟動瀏覽器並登入，供 Selenium fallback 使用"""
+        if self.driver:
+            return True
+
+        self._start_browser()
+        if not MoodleScraper.login(self):
+            print("✗ Selenium fallback 登入失敗")
+            return False
+
+        # 瀏覽器可能重新登入過，同步更新 HTTP 使用的 cookie
+        self._use_cookies(self.driver.get_cookies())
+        return True
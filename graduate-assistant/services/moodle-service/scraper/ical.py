@@ -0,0 +1,300 @@
+"""
+Moodle 行事曆匯出（iCalendar）：以一次請求取得所有課程的截止時間
+
+行事曆匯出網址（calendar/export_execute.php?userid=...&authtoken=...）不需登入，
+可在 Moodle「行事曆 > 匯出行事曆」取得。回應以逐行串流解析，同一時間只保留一個 VEVENT。
+
+離線檢查：python -m scraper.ical tools/fixtures/calendar_export.ics
+"""
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
+
+import httpx
+
+from .parsers import assign_cmid
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8：TZID 時間視為本地時間
+    ZoneInfo = None
+
+# 作業截止事件的標題後綴（英文與中文介面）
+_DUE_SUFFIX_RE = re.compile(r'\s*(?:is due|的截止日期|截止日期|截止|到期)\s*$', re.IGNORECASE)
+
+_TEXT_ESCAPES = {'n': '\n', 'N': '\n', '\\': '\\', ';': ';', ',': ','}
+
+_ESCAPE_RE = re.compile(r'\\(.)')
+
+
+def _unescape(value: str) -> str:
+    """還原 TEXT 值的跳脫字元（\\n、\\,、\\;、\\\\）"""
+    return _ESCAPE_RE.sub(lambda m: _TEXT_ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def _parse_content_line(line: str) -> Tuple[str, Dict[str, str], str]:
+    """
+    拆解一行內容（NAME;PARAM=VALUE:值）
+
+    Returns:
+        (大寫屬性名稱, 參數, 值)
+    """
+    head, _, value = line.partition(':')
+    # 參數值可能以引號包住冒號，例如 TZID="GMT+08:00"
+    while head.count('"') % 2:
+        more, _, value = value.partition(':')
+        head = f"{head}:{more}"
+
+    name, *params = head.split(';')
+    parsed = {}
+    for param in params:
+        key, _, param_value = param.partition('=')
+        parsed[key.upper()] = param_value.strip('"')
+    return name.upper(), parsed, value
+
+
+def unfold_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    合併折行（以空白或 tab 開頭的行接續上一行）
+
+    Args:
+        lines: 逐行內容（可為串流）
+
+    Yields:
+        完整的內容行
+    """
+    current: Optional[str] = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def iter_events(lines: Iterable[str]) -> Iterator[Dict[str, Tuple[Dict[str, str], str]]]:
+    """
+    逐一產出 VEVENT
+
+    Args:
+        lines: iCalendar 內容的逐行串流
+
+    Yields:
+        屬性名稱對應 (參數, 值)；同名屬性只保留第一個
+    """
+    event: Optional[Dict[str, Tuple[Dict[str, str], str]]] = None
+    depth = 0
+    for line in unfold_lines(lines):
+        name, params, value = _parse_content_line(line)
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT':
+                event, depth = {}, 0
+            elif event is not None:
+                # VALARM 等子元件的屬性不屬於事件本身
+                depth += 1
+        elif name == 'END':
+            if event is not None and depth:
+                depth -= 1
+            elif event is not None and value.upper() == 'VEVENT':
+                yield event
+                event = None
+        elif event is not None and not depth:
+            event.setdefault(name, (params, value))
+
+
+def parse_ical_datetime(params: Dict[str, str], value: str) -> Optional[str]:
+    """
+    將 DTSTART 等日期時間轉為本地時間的 ISO 格式（與其他來源的 due_date 一致）
+
+    Args:
+        params: 屬性參數（VALUE、TZID）
+        value: 例如 20261017T155900Z、20261017T235900 或 20261017
+
+    Returns:
+        ISO 格式日期時間，無法解析時回傳 None
+    """
+    value = value.strip()
+    try:
+        if params.get('VALUE') == 'DATE' or len(value) == 8:
+            return datetime.strptime(value[:8], '%Y%m%d').isoformat()
+        if value.endswith('Z'):
+            moment = datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+            return moment.astimezone().replace(tzinfo=None).isoformat()
+        moment = datetime.strptime(value, '%Y%m%dT%H%M%S')
+    except ValueError:
+        return None
+
+    tzid = params.get('TZID')
+    if tzid and ZoneInfo is not None:
+        try:
+            return moment.replace(tzinfo=ZoneInfo(tzid)).astimezone().replace(tzinfo=None).isoformat()
+        except (KeyError, ValueError):
+            pass
+    return moment.isoformat()
+
+
+def _property(event: Dict[str, Tuple[Dict[str, str], str]], name: str) -> str:
+    return _unescape(event[name][1]).strip() if name in event else ''
+
+
+def event_to_assignment(
+    event: Dict[str, Tuple[Dict[str, str], str]],
+    course_ids: Optional[Dict[str, str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    將作業截止的 VEVENT 轉為作業資料
+
+    有作業連結（URL 屬性或描述中的 mod/assign/view.php）時以課程模組 ID 為 id；
+    否則依標題後綴（is due、截止）判斷，以 UID 為 id。
+
+    Args:
+        event: iter_events 產出的事件
+        course_ids: 課程簡稱（CATEGORIES）或名稱對應課程 ID
+
+    Returns:
+        與 MoodleAdapter.convert_assignment 相同欄位的作業，不是作業截止事件時回傳 None
+    """
+    summary = _property(event, 'SUMMARY')
+    description = _property(event, 'DESCRIPTION')
+    url = _property(event, 'URL')
+    cmid = assign_cmid(url) or assign_cmid(description)
+    is_due = _DUE_SUFFIX_RE.search(summary) is not None
+    if not cmid and not is_due:
+        return None
+
+    if cmid and not assign_cmid(url):
+        match = re.search(r'\S*/mod/assign/view\.php\?\S*', description)
+        url = match.group(0) if match else url
+
+    due_key = 'DUE' if 'DUE' in event else 'DTSTART'
+    due_date = parse_ical_datetime(*event[due_key]) if due_key in event else None
+
+    category = _property(event, 'CATEGORIES')
+    return {
+        'id': cmid or _property(event, 'UID'),
+        'course_id': (course_ids or {}).get(category, ''),
+        'course_name': category,
+        'name': _DUE_SUFFIX_RE.sub('', summary) if is_due else summary,
+        'due_date': due_date,
+        'status': None,
+        'url': url,
+        'description': description,
+    }
+
+
+def parse_ical_assignments(
+    lines: Iterable[str],
+    course_ids: Optional[Dict[str, str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    解析行事曆匯出中的作業截止事件
+
+    Args:
+        lines: iCalendar 內容的逐行串流
+        course_ids: 課程簡稱或名稱對應課程 ID
+
+    Returns:
+        作業列表
+    """
+    assignments = []
+    for event in iter_events(lines):
+        assignment = event_to_assignment(event, course_ids)
+        if assignment:
+            assignments.append(assignment)
+    return assignments
+
+
+def fetch_ical_assignments(
+    url: str,
+    client: Optional[httpx.Client] = None,
+    course_ids: Optional[Dict[str, str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    下載行事曆匯出並以串流解析作業截止事件
+
+    Args:
+        url: 行事曆匯出網址（含 authtoken）
+        client: 共用的 HTTP client（未提供時自行建立）
+        course_ids: 課程簡稱或名稱對應課程 ID
+
+    Returns:
+        作業列表
+
+    Raises:
+        httpx.HTTPError: 連線或 HTTP 狀態錯誤
+    """
+    owned = client is None
+    client = client or httpx.Client(follow_redirects=True, timeout=httpx.Timeout(20.0))
+    try:
+        with client.stream('GET', url) as response:
+            response.raise_for_status()
+            return parse_ical_assignments(response.iter_lines(), course_ids)
+    finally:
+        if owned:
+            client.close()
+
+
+def merge_ical_assignments(
+    assignments: List[Dict[str, Any]],
+    ical_assignments: List[Dict[str, Any]],
+    courses: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    將行事曆的作業合併進爬取結果
+
+    以 id（課程模組 ID）對應；沒有作業連結的事件改以作業名稱對應，
+    同名作業不只一個時取課程名稱包含課程簡稱者。已有的截止時間不覆寫，
+    對應不到的作業附加在最後，並以名稱包含課程簡稱的課程補上 course_id 與 course_name。
+
+    Args:
+        assignments: 爬取得到的作業（就地補上截止時間）
+        ical_assignments: parse_ical_assignments 的結果
+        courses: 爬取得到的課程（id, name）
+
+    Returns:
+        合併後的作業列表
+    """
+    by_id = {assignment['id']: assignment for assignment in assignments}
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for assignment in assignments:
+        by_name.setdefault(assignment.get('name', ''), []).append(assignment)
+
+    merged = list(assignments)
+    for record in ical_assignments:
+        target = by_id.get(record['id'])
+        if target is None and not assign_cmid(record['url']):
+            candidates = by_name.get(record['name'], [])
+            if len(candidates) > 1:
+                candidates = [c for c in candidates if record['course_name'] and record['course_name'] in c.get('course_name', '')]
+            if len(candidates) == 1:
+                target = candidates[0]
+            elif record['name'] in by_name:
+                # 無法判斷是哪一門課程的作業，不另外附加以免重複
+                continue
+
+        if target is None:
+            if not record['course_id'] and record['course_name']:
+                owners = [c for c in courses or [] if record['course_name'] in c.get('name', '')]
+                if len(owners) == 1:
+                    record['course_id'], record['course_name'] = owners[0]['id'], owners[0]['name']
+            by_id[record['id']] = record
+            merged.append(record)
+        elif not target.get('due_date'):
+            target['due_date'] = record['due_date']
+    return merged
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else 'tools/fixtures/calendar_export.ics'
+    if source.startswith(('http://', 'https://')):
+        records = fetch_ical_assignments(source)
+    else:
+        with open(source, encoding='utf-8') as f:
+            records = parse_ical_assignments(f)
+    print(json.dumps(records, ensure_ascii=False, indent=2))
@@ -0,0 +1,134 @@
+"""
+In-process store of background sync jobs
+
+A sync can run for minutes, so the API submits it as a job and returns a job
+id right away. The job records progress reported by the scraper (phase and
+courses done/total) and keeps the final SyncResponse payload until it is
+evicted after a TTL.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+
+class SyncJob:
+    """State of one background sync"""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = "queued"  # queued | running | succeeded | failed
+        self.phase = "queued"
+        self.courses_done = 0
+        self.courses_total = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def update_progress(self, phase: str, done: int, total: int):
+        """Progress callback passed to MoodleService.sync_all"""
+        with self._lock:
+            self.phase = phase
+            if total:
+                self.courses_done = done
+                self.courses_total = total
+
+    def run(self, fn: Callable[[Callable[[str, int, int], None]], Dict[str, Any]]):
+        """
+        Execute the sync and record its outcome
+
+        Args:
+            fn: Callable taking a progress callback and returning a SyncResponse payload
+        """
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+        try:
+            result = fn(self.update_progress)
+        except Exception as e:
+            result = None
+            error = str(e)
+        else:
+            error = None if result.get("success") else result.get("message")
+
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.status = "succeeded" if error is None else "failed"
+            self.phase = "done"
+            self.finished_at = time.time()
+
+    def to_status(self) -> Dict[str, Any]:
+        """Snapshot for the status endpoint"""
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "phase": self.phase,
+                "courses_done": self.courses_done,
+                "courses_total": self.courses_total,
+                "elapsed_seconds": round(end - self.started_at, 2) if self.started_at else 0.0,
+                "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+                "error": self.error,
+            }
+
+
+class JobStore:
+    """Thread-safe job registry with TTL eviction of finished jobs"""
+
+    def __init__(self, ttl_seconds: int = 3600, max_jobs: int = 1000):
+        """
+        Initialize job store
+
+        Args:
+            ttl_seconds: How long finished jobs (and their results) are kept
+            max_jobs: Upper bound on stored jobs; the oldest finished jobs go first
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, SyncJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self) -> SyncJob:
+        """Register a new queued job"""
+        job = SyncJob(secrets.token_urlsafe(16))
+        with self._lock:
+            self._evict()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[SyncJob]:
+        with self._lock:
+            self._evict()
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _evict(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        if len(self._jobs) >= self.max_jobs:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.finished]:
+                del self._jobs[job_id]
+                if len(self._jobs) < self.max_jobs:
+                    break
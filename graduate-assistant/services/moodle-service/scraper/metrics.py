@@ -0,0 +1,283 @@
+"""
+Per-phase timing spans and Prometheus-style metrics
+
+Every scrape times its phases (driver start, login, course list, each course
+page, assignment enrichment, adapter conversion) with a PhaseTimer. Each span
+is kept on the timer for that scrape's own summary and is also observed into
+process-wide histograms and failure counters, which /metrics renders in the
+Prometheus text exposition format together with gauges read from the driver
+pool, the result cache, the scrape executor, the browser budget and the sync
+scheduler at scrape time.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) of the phase duration histogram buckets
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(values: Dict[str, str]) -> Labels:
+    return tuple(sorted(values.items()))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label set -> (per-bucket counts, sum)
+        self._values: Dict[Labels, Tuple[List[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = _labels(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(
+                        f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}"
+                    )
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(round(total, 6))}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+def render_samples(
+    name: str,
+    help_text: str,
+    samples: List[Tuple[Dict[str, str], float]],
+    kind: str = "gauge"
+) -> List[str]:
+    """Lines for values read from other components at scrape time"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(_labels(labels))} {_format_value(value)}")
+    return lines
+
+
+# Process-wide metrics fed by every PhaseTimer
+PHASE_DURATION = Histogram("moodle_phase_duration_seconds", "Duration of scrape phases")
+PHASE_FAILURES = Counter("moodle_phase_failures_total", "Scrape phases that failed")
+
+# Fed by browser_profile.apply_page_profile, labelled by profile and applied/failed
+PROFILE_SWITCHES = Counter("moodle_browser_profile_switches_total", "Browser profile request-blocking rules applied per page")
+
+
+class Span:
+    """One timed phase; call fail() when the phase did not succeed without raising"""
+
+    def __init__(self, phase: str):
+        self.phase = phase
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+
+class PhaseTimer:
+    """Times the phases of one scrape and feeds the process-wide metrics"""
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        # (phase, seconds, failed)
+        self.records: List[Tuple[str, float, bool]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[Span]:
+        """
+        Time a phase; exceptions mark it failed and propagate
+
+        Args:
+            phase: driver_start, login, course_list, course_page, assignment_info, conversion
+        """
+        span = Span(phase)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.failed = True
+            raise
+        finally:
+            self.record(phase, time.perf_counter() - started, span.failed)
+
+    def record(self, phase: str, seconds: float, failed: bool = False):
+        with self._lock:
+            self.records.append((phase, seconds, failed))
+        PHASE_DURATION.observe(seconds, phase=phase, engine=self.engine)
+        if failed:
+            PHASE_FAILURES.inc(phase=phase, engine=self.engine)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Count, total and longest seconds, and failures per phase"""
+        summary: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            records = list(self.records)
+        for phase, seconds, failed in records:
+            item = summary.setdefault(phase, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "failures": 0})
+            item["count"] += 1
+            item["total_seconds"] = round(item["total_seconds"] + seconds, 3)
+            item["max_seconds"] = round(max(item["max_seconds"], seconds), 3)
+            if failed:
+                item["failures"] += 1
+        return summary
+
+
+def render_metrics(
+    pool_stats: Optional[Dict[str, Any]] = None,
+    cache_stats: Optional[Dict[str, Any]] = None,
+    executor_stats: Optional[Dict[str, Any]] = None,
+    budget_stats: Optional[Dict[str, Any]] = None,
+    scheduler_stats: Optional[Dict[str, Any]] = None,
+    flight_stats: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Prometheus text exposition of phase metrics and current resource usage
+
+    Args:
+        pool_stats: DriverPool.stats()
+        cache_stats: ResultCache.stats()
+        executor_stats: ScrapeExecutor.stats()
+        budget_stats: BrowserBudget.stats()
+        scheduler_stats: SyncScheduler.stats()
+        flight_stats: SingleFlight.stats()
+
+    Returns:
+        Metrics text (content type text/plain; version=0.0.4)
+    """
+    lines = PHASE_DURATION.render() + PHASE_FAILURES.render() + PROFILE_SWITCHES.render()
+
+    if pool_stats:
+        max_size = pool_stats["max_size"]
+        lines += render_samples("moodle_driver_pool_browsers", "Browsers in the WebDriver pool", [
+            ({"state": "in_use"}, pool_stats["in_use"]),
+            ({"state": "idle"}, pool_stats["idle"]),
+            ({"state": "max"}, max_size),
+        ])
+        lines += render_samples("moodle_driver_pool_utilization", "Share of the pool's browsers checked out", [
+            ({}, round(pool_stats["in_use"] / max_size, 3) if max_size else 0),
+        ])
+        lines += render_samples("moodle_driver_pool_events_total", "Browsers launched, recycled and found unhealthy", [
+            ({"event": event}, pool_stats[event]) for event in ("launched", "recycled", "unhealthy")
+        ], "counter")
+        page_loads = pool_stats.get("page_loads", {})
+        lines += render_samples("moodle_browser_page_loads_total", "Pages loaded by pooled browsers per profile", [
+            ({"profile": profile}, loads["pages"]) for profile, loads in page_loads.items()
+        ], "counter")
+        lines += render_samples("moodle_browser_page_transfer_bytes_total", "Bytes transferred by page loads per profile", [
+            ({"profile": profile}, loads["bytes"]) for profile, loads in page_loads.items()
+        ], "counter")
+        lines += render_samples("moodle_browser_page_load_seconds_total", "Time spent loading pages per profile", [
+            ({"profile": profile}, loads["load_seconds"]) for profile, loads in page_loads.items()
+        ], "counter")
+
+    if cache_stats:
+        lines += render_samples("moodle_cache_lookups_total", "Result cache lookups", [
+            ({"result": "hit"}, cache_stats["hits"]),
+            ({"result": "miss"}, cache_stats["misses"]),
+        ], "counter")
+        lines += render_samples("moodle_cache_hit_ratio", "Result cache hits per lookup", [({}, cache_stats["hit_rate"])])
+        lines += render_samples("moodle_cache_bytes", "Bytes held by the result cache", [({}, cache_stats["bytes"])])
+
+    if executor_stats:
+        lines += render_samples("moodle_scrape_executor_tasks", "Scrapes running and waiting", [
+            ({"state": "running"}, executor_stats["running"]),
+            ({"state": "queued"}, executor_stats["queued"]),
+        ])
+        lines += render_samples("moodle_scrape_executor_rejected_total", "Scrapes rejected with 503", [
+            ({}, executor_stats["rejected"]),
+        ], "counter")
+
+    if budget_stats:
+        lines += render_samples("moodle_browser_budget_slots", "Browser budget slots", [
+            ({"state": "in_use"}, budget_stats["in_use"]),
+            ({"state": "max"}, budget_stats["slots"]),
+        ])
+        lines += render_samples("moodle_browser_budget_waiting_accounts", "Accounts waiting for a browser", [
+            ({}, budget_stats["accounts_waiting"]),
+        ])
+        lines += render_samples("moodle_browser_budget_yields_total", "Browsers given back to waiting accounts", [
+            ({}, budget_stats["yields"]),
+        ], "counter")
+
+    if scheduler_stats:
+        lines += render_samples("moodle_scheduler_accounts", "Scheduled account syncs running and waiting", [
+            ({"state": "running"}, scheduler_stats["running"]),
+            ({"state": "queued"}, scheduler_stats["queued"]),
+        ])
+        lines += render_samples("moodle_scheduler_syncs_total", "Scheduled account syncs by outcome", [
+            ({"result": result}, scheduler_stats[result]) for result in ("succeeded", "failed", "skipped")
+        ], "counter")
+        lines += render_samples("moodle_scheduler_accounts_per_minute", "Accounts synced per minute over the recent window", [
+            ({}, scheduler_stats["accounts_per_minute"]),
+        ])
+
+    if flight_stats:
+        lines += render_samples("moodle_single_flight_calls_total", "Scrape calls that ran, or waited for an identical running scrape", [
+            ({"role": "leader"}, flight_stats["started"]),
+            ({"role": "follower"}, flight_stats["joined"]),
+        ], "counter")
+        lines += render_samples("moodle_single_flight_in_flight", "Scrapes running that later calls can join", [
+            ({}, flight_stats["in_flight"]),
+        ])
+
+    return "\n".join(lines) + "\n"
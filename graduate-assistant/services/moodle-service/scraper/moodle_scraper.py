@@ -1,21 +1,104 @@
 """Moodle 爬蟲核心模組"""
+import gzip
 import time
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from queue import Empty, Queue
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 
+from .ajax import AjaxError, collect_action_events, collect_enrolled_courses, service_url
+from .browser_profile import apply_launch_profile, apply_page_profile, page_transfer_size, validate_profile
+from .driver_pool import DriverLease, DriverPool
+from .enrichment import apply_assignment_info, assignment_cmids, is_complete, merge_assignment_info
+from .metrics import PhaseTimer
+from .parsers import (
+    ParseError, parse_assign_index, parse_calendar_upcoming, parse_course_list, parse_course_sections, parse_course_title
+)
+from .session_store import SessionStore, StoredSession
+from .waits import WaitEngine
+
+# 進度回呼：(階段, 已完成課程數, 課程總數)
+ProgressCallback = Callable[[str, int, int], None]
+
+# 平行解析時，等待下一門課程完成期間檢查 worker 是否仍在執行的間隔秒數
+WORKER_CHECK_SECONDS = 5.0
+
+
+def build_chrome_options(headless: bool = True, profile: str = 'lean', login_profile: str = 'full') -> Options:
+    """
+    建立 Chrome 啟動參數
+
+    Args:
+        headless: 是否使用無頭模式
+        profile: 爬取頁面的瀏覽器設定檔（lean 關閉非必要功能）
+        login_profile: SSO 登入的瀏覽器設定檔（同為 lean 時才使用 eager 載入策略）
+
+    Returns:
+        Chrome Options
+    """
+    options = Options()
+    if headless:
+        options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1920,1080')
+
+    # 設定下載偏好
+    prefs = {
+        'download.prompt_for_download': False,
+        'download.directory_upgrade': True,
+        'safebrowsing.enabled': False
+    }
+    options.add_experimental_option('prefs', prefs)
+    apply_launch_profile(options, profile, login_profile)
+    return options
+
+
+def launch_driver(headless: bool = True, profile: str = 'lean', login_profile: str = 'full') -> webdriver.Chrome:
+    """
+    啟動一個新的 Chrome WebDriver
+
+    Args:
+        headless: 是否使用無頭模式
+        profile: 爬取頁面的瀏覽器設定檔（lean 或 full）
+        login_profile: SSO 登入的瀏覽器設定檔
+
+    Returns:
+        WebDriver 實例
+    """
+    driver = webdriver.Chrome(options=build_chrome_options(headless, profile, login_profile))
+    # 不使用全域隱式等待：找不到元素時應立即返回，需要等待的步驟由 WaitEngine 處理
+    driver.implicitly_wait(0)
+    return driver
+
 
 class MoodleScraper:
     """Moodle 爬蟲類"""
 
-    def __init__(self, base_url: str, username: str, password: str, headless: bool = True):
+    # 計時指標的 engine 標籤
+    engine = 'selenium'
+
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        password: str,
+        headless: bool = True,
+        pool: Optional[DriverPool] = None,
+        session_store: Optional[SessionStore] = None,
+        concurrency: int = 1,
+        profile: str = 'lean',
+        login_profile: str = 'full',
+        wait_timeouts: Optional[Dict[str, float]] = None
+    ):
         """
         初始化爬蟲
 
@@ -24,54 +107,116 @@ class MoodleScraper:
             username: 登入帳號
             password: 登入密碼
             headless: 是否使用無頭模式
+            pool: 共用的 WebDriver 池（未提供時自行啟動瀏覽器）
+            session_store: 已登入 session 的儲存區（未提供時每次都走 SSO）
+            concurrency: 同時解析的課程頁數量上限
+            profile: 爬取頁面時的瀏覽器設定檔（lean 封鎖圖片、字型、樣式與第三方資源）
+            login_profile: SSO 登入時的瀏覽器設定檔
+            wait_timeouts: 各等待步驟的上限秒數（覆寫 DEFAULT_WAIT_TIMEOUTS）
         """
         self.base_url = base_url.rstrip('/')
         self.username = username
         self.password = password
         self.headless = headless
+        self.pool = pool
+        self.session_store = session_store
+        self.concurrency = max(1, concurrency)
+        self.session_id: Optional[str] = None
         self.driver: Optional[webdriver.Chrome] = None
+        self._lease: Optional[DriverLease] = None
+        self._last_html: Optional[str] = None
+        self.profile = validate_profile(profile)
+        self.login_profile = validate_profile(login_profile)
+        self._active_profile: Optional[str] = None
+        self.waits = WaitEngine(timeouts=wait_timeouts)
+        self.timings = PhaseTimer(self.engine)
+        # 平行解析時額外啟動的 worker（讓出瀏覽器後即結束）
+        self._is_worker = False
 
     def __enter__(self):
         """Context manager 入口"""
-        self.start()
+        with self.timings.span('driver_start'):
+            self.start()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager 出口"""
         self.close()
 
-    def start(self):
-        """啟動瀏覽器"""
-        options = Options()
-        if self.headless:
-            options.add_argument('--headless')
-            options.add_argument('--disable-gpu')
-
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--window-size=1920,1080')
-
-        # 設定下載偏好
-        prefs = {
-            'download.prompt_for_download': False,
-            'download.directory_upgrade': True,
-            'safebrowsing.enabled': False
-        }
-        options.add_experimental_option('prefs', prefs)
+    def start(self, acquire_timeout: Optional[float] = None):
+        """
+        啟動瀏覽器（有 WebDriver 池時改為借用）
 
-        self.driver = webdriver.Chrome(options=options)
-        self.driver.implicitly_wait(10)
-        print("✓ 瀏覽器已啟動")
+        Args:
+            acquire_timeout: 等待 WebDriver 池空出瀏覽器的秒數（預設使用池的設定）
+        """
+        if self.pool:
+            self._lease = self.pool.acquire(acquire_timeout)
+            self.driver = self._lease.driver
+            print("✓ 已從 WebDriver 池取得瀏覽器")
+        else:
+            self.driver = launch_driver(self.headless, self.profile, self.login_profile)
+            print("✓ 瀏覽器已啟動")
+
+        self.waits.driver = self.driver
+        self._active_profile = None
+        self._use_profile(self.profile)
 
     def close(self):
-        """關閉瀏覽器"""
+        """關閉瀏覽器（有 WebDriver 池時歸還）"""
+        if self._lease:
+            self.pool.release(self._lease)
+            self._lease = None
+            self.driver = None
+            print("✓ 瀏覽器已歸還 WebDriver 池")
+            return
+
         if self.driver:
             self.driver.quit()
+            self.driver = None
             print("✓ 瀏覽器已關閉")
 
-    def login(self) -> bool:
+    def run_phase(self, phase: str, fn: Callable[..., Any], *args) -> Any:
+        """
+        執行並計時一個階段，回傳空結果（登入失敗、沒有課程、找不到課程）時記為失敗
+
+        Args:
+            phase: 階段名稱（login、course_list、course_page 等）
+            fn: 要執行的函式
+            *args: 函式參數
+
+        Returns:
+            函式的回傳值
+        """
+        with self.timings.span(phase) as span:
+            result = fn(*args)
+            if not result:
+                span.fail()
+            return result
+
+    def _open(self, url: str):
+        """載入頁面並記錄頁數、傳輸量與載入時間（供 WebDriver 池回收與統計）"""
+        started = time.monotonic()
+        self.driver.get(url)
+        if self._lease:
+            self._lease.mark_page(
+                self._active_profile,
+                page_transfer_size(self.driver),
+                time.monotonic() - started
+            )
+
+    def _use_profile(self, profile: str):
+        """切換瀏覽器設定檔（已是該設定檔時不做事）"""
+        if self._active_profile != profile:
+            apply_page_profile(self.driver, profile)
+            self._active_profile = profile
+
+    def login(self, fresh: bool = False) -> bool:
         """
-        登入 Moodle 系統（支援 SSO 單一登入）
+        登入 Moodle 系統（優先沿用已儲存的 session，失效時才走 SSO）
+
+        Args:
+            fresh: 不沿用已儲存的 session，一律以帳號密碼完整登入
 
         Returns:
             是否登入成功
@@ -79,31 +224,118 @@ class MoodleScraper:
         if not self.driver:
             raise RuntimeError("瀏覽器未啟動，請先呼叫 start()")
 
+        if not fresh and self.restore_session():
+            return True
+
+        return self.full_login()
+
+    def full_login(self) -> bool:
+        """
+        走完整 SSO 流程並將 cookie 存入 session 儲存區
+
+        Returns:
+            是否登入成功
+        """
+        if not self.password:
+            print("✗ 已儲存的 session 失效，且未提供密碼")
+            return False
+
+        # SSO 頁面可能需要完整資源才能正常運作
+        self._use_profile(self.login_profile)
         try:
-            print(f"→ 正在訪問 {self.base_url}")
-            self.driver.get(self.base_url)
+            logged_in = self.sso_login()
+        finally:
+            self._use_profile(self.profile)
+
+        if not logged_in:
+            # 已儲存的 session 不受影響：帳號密碼錯誤不應登出其他呼叫端
+            return False
+
+        if self.session_store:
+            # driver.get_cookies() 只回傳目前網域（Moodle）的 cookie
+            session = self.session_store.save(
+                self.base_url, self.username, self.driver.get_cookies(), self.password
+            )
+            self.session_id = session.handle
+
+        return True
+
+    def restore_session(self) -> bool:
+        """
+        注入已儲存的 cookie 並確認 session 仍有效
+
+        Returns:
+            是否成功沿用既有 session
+        """
+        session = self._stored_session()
+        if not session:
+            return False
+
+        print("→ 嘗試沿用已儲存的 session")
+        self.adopt_session(session.cookies)
+
+        self._open(f"{self.base_url}/my/")
+        if not self.waits.selector('session_check', '.usermenu'):
+            print("→ 已儲存的 session 已失效，重新登入")
+            self.session_store.invalidate(self.base_url, self.username)
+            return False
+
+        self.session_id = session.handle
+        print("✓ 已沿用既有 session")
+        return True
+
+    def _stored_session(self) -> Optional[StoredSession]:
+        """
+        可沿用的已儲存 session
+
+        提供密碼時必須與該 session 登入時的密碼相同；沒有密碼的呼叫端
+        （以 session handle 取得帳號者）才可直接沿用。
+
+        Returns:
+            已儲存的 session，沒有或密碼不符時回傳 None
+        """
+        if not self.session_store:
+            return None
+
+        session = self.session_store.get(self.base_url, self.username)
+        if session and self.password and not session.verify(self.password):
+            print("→ 密碼與已儲存的 session 不符，不沿用")
+            return None
+        return session
 
-            # 等待登入頁面載入
-            wait = WebDriverWait(self.driver, 15)
+    def sso_login(self) -> bool:
+        """
+        執行完整 SSO 單一登入流程
+
+        Returns:
+            是否登入成功
+        """
+        try:
+            print(f"→ 正在訪問 {self.base_url}")
+            self._open(self.base_url)
 
             # 尋找登入按鈕或表單
-            # 政大 Moodle 可能使用 SSO，需要點擊特定的登入連結
-            try:
-                # 嘗試尋找 SSO 登入連結
-                sso_button = wait.until(
-                    EC.presence_of_element_located((By.LINK_TEXT, "SSO 單一登入"))
-                )
+            # 政大 Moodle 可能使用 SSO，需要點擊特定的登入連結；兩者同時等待，哪個先出現就走哪條路
+            found = self.waits.first_of('login_form', {
+                'sso': (By.LINK_TEXT, "SSO 單一登入"),
+                'form': (By.ID, "userNameInput"),
+            })
+            if found is None:
+                print("✗ 登入失敗: 找不到登入頁面")
+                return False
+
+            if found == 'sso':
                 print("→ 找到 SSO 登入按鈕")
-                sso_button.click()
-                time.sleep(2)
-            except TimeoutException:
+                self.driver.find_element(By.LINK_TEXT, "SSO 單一登入").click()
+            else:
                 print("→ 未找到 SSO 按鈕，嘗試直接登入")
 
             # 輸入帳號密碼
             print("→ 輸入帳號密碼")
-            username_field = wait.until(
-                EC.presence_of_element_located((By.ID, "userNameInput"))
-            )
+            username_field = self.waits.selector('login_form', '#userNameInput')
+            if not username_field:
+                print("✗ 登入失敗: 找不到帳號欄位")
+                return False
             username_field.clear()
             username_field.send_keys(self.username)
 
@@ -117,10 +349,9 @@ class MoodleScraper:
             print("→ 已點擊登入按鈕")
 
             # 等待登入完成（檢查是否出現使用者資訊）
-            time.sleep(3)
-            wait.until(
-                EC.presence_of_element_located((By.CLASS_NAME, "usermenu"))
-            )
+            if not self.waits.selector('login_done', '.usermenu'):
+                print("✗ 登入失敗: 送出帳號密碼後未出現使用者選單")
+                return False
 
             print("✓ 登入成功")
             return True
@@ -143,29 +374,19 @@ class MoodleScraper:
             # 訪問課程列表頁面
             courses_url = f"{self.base_url}/my/"
             print(f"→ 正在獲取課程列表: {courses_url}")
-            self.driver.get(courses_url)
-
-            wait = WebDriverWait(self.driver, 10)
-            time.sleep(2)
-
-            # 尋找所有課程連結
-            course_elements = self.driver.find_elements(By.CSS_SELECTOR, ".coursename a")
-
-            courses = []
-            for elem in course_elements:
-                course_name = elem.text.strip()
-                course_url = elem.get_attribute('href')
+            self._open(courses_url)
 
-                if course_name and course_url:
-                    # 從 URL 中提取課程 ID
-                    course_id = course_url.split('id=')[-1] if 'id=' in course_url else None
+            # 新版儀表板以 AJAX 分頁載入課程總覽，直接呼叫同一個 API 取得完整列表
+            courses = self._get_enrolled_courses_ajax()
+            if courses is not None:
+                print(f"✓ 找到 {len(courses)} 門課程")
+                return courses
 
-                    courses.append({
-                        'id': course_id,
-                        'name': course_name,
-                        'url': course_url,
-                        'sections': []
-                    })
+            # 舊版課程總覽在頁面載入後才產生連結；AJAX 結束仍沒有連結就是沒有課程，不必等到逾時
+            if not self.waits.selector_or_idle('course_list', '.coursename a'):
+                print("→ 課程總覽沒有任何課程")
+                return []
+            courses = parse_course_list(self.driver.page_source, self.driver.current_url)
 
             print(f"✓ 找到 {len(courses)} 門課程")
             return courses
@@ -174,6 +395,102 @@ class MoodleScraper:
             print(f"✗ 獲取課程列表失敗: {e}")
             return []
 
+    def _get_enrolled_courses_ajax(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        以目前頁面的 sesskey 呼叫課程總覽 AJAX API
+
+        Returns:
+            課程列表，舊版 Moodle 或呼叫失敗時回傳 None
+        """
+        call = self._ajax_caller()
+        if call is None:
+            return None
+
+        try:
+            return collect_enrolled_courses(call, self.base_url)
+        except (AjaxError, WebDriverException) as e:
+            print(f"→ 課程總覽 API 無法使用（{e}），改為解析頁面")
+            return None
+
+    def _ajax_caller(self) -> Optional[Callable[[str], Any]]:
+        """
+        以目前頁面的 sesskey 建立呼叫 lib/ajax/service.php 的函式（在瀏覽器中以 fetch 送出）
+
+        Returns:
+            接收請求內容、回傳已解碼 JSON 回應的函式；頁面沒有 sesskey 時回傳 None
+        """
+        try:
+            sesskey = self.driver.execute_script(
+                "return (window.M && M.cfg) ? M.cfg.sesskey : null;"
+            )
+        except WebDriverException:
+            return None
+        if not sesskey:
+            return None
+
+        url = service_url(self.base_url, sesskey)
+
+        def call(body: str) -> Any:
+            return self.driver.execute_async_script(
+                "var done = arguments[arguments.length - 1];"
+                "fetch(arguments[0], {method: 'POST', credentials: 'same-origin',"
+                " headers: {'Content-Type': 'application/json'}, body: arguments[1]})"
+                ".then(function (r) { return r.json(); }).then(done)"
+                ".catch(function (e) { done({error: String(e)}); });",
+                url, body
+            )
+
+        return call
+
+    def get_course(self, course_id: str) -> Optional[Dict[str, Any]]:
+        """
+        直接以課程 ID 抓取單一課程（不經過課程列表）
+
+        Args:
+            course_id: Moodle 課程 ID
+
+        Returns:
+            包含完整章節內容的課程資訊，找不到（或無權限）時回傳 None
+
+        Raises:
+            WebDriverException: 頁面載入失敗（與找不到課程區分，呼叫端應視為錯誤）
+        """
+        if not course_id.isdigit():
+            return None
+
+        course = {
+            'id': course_id,
+            'name': course_id,
+            'url': f"{self.base_url}/course/view.php?id={course_id}",
+            'sections': []
+        }
+        try:
+            self._load_course_page(course)
+        except Exception as e:
+            if not self._is_missing_course(e):
+                raise
+            print(f"✗ 找不到課程 {course_id}: {e}")
+            return None
+
+        course['name'] = self._current_course_name() or course['name']
+        return course
+
+    @staticmethod
+    def _is_missing_course(error: Exception) -> bool:
+        """
+        課程頁的錯誤是否代表課程不存在或無權限
+
+        不存在或未選修的課程會被導向其他頁面，頁面上沒有任何章節；
+        其他錯誤（瀏覽器或連線失敗）是載入失敗。
+        """
+        return isinstance(error, ParseError)
+
+    def _current_course_name(self) -> Optional[str]:
+        """從最近解析的課程頁標題取得課程名稱"""
+        if self._last_html is None:
+            return None
+        return parse_course_title(self._last_html)
+
     def get_course_content(self, course: Dict[str, Any]) -> Dict[str, Any]:
         """
         獲取課程內容（章節、活動、資源）
@@ -184,80 +501,48 @@ class MoodleScraper:
         Returns:
             包含完整章節內容的課程資訊
         """
-        if not self.driver:
-            raise RuntimeError("瀏覽器未啟動")
-
         try:
-            print(f"→ 正在解析課程: {course['name']}")
-            self.driver.get(course['url'])
-            time.sleep(2)
+            return self._load_course_page(course)
+        except Exception as e:
+            print(f"✗ 解析課程內容失敗: {e}")
+            course['error'] = str(e)
+            return course
 
-            # 尋找所有章節
-            sections = self.driver.find_elements(By.CSS_SELECTOR, "li.section.main")
+    def _load_course_page(self, course: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        載入並解析課程頁（錯誤直接拋出）
 
-            for idx, section_elem in enumerate(sections):
-                try:
-                    # 獲取章節標題
-                    title_elem = section_elem.find_element(By.CSS_SELECTOR, ".sectionname")
-                    section_title = title_elem.text.strip() if title_elem else f"Section {idx}"
-
-                    # 獲取該章節的所有活動/資源
-                    activities = []
-                    activity_elements = section_elem.find_elements(By.CSS_SELECTOR, ".activity")
-
-                    for activity_elem in activity_elements:
-                        try:
-                            # 獲取活動名稱和連結
-                            link_elem = activity_elem.find_element(By.CSS_SELECTOR, "a")
-                            activity_name = link_elem.text.strip()
-                            activity_url = link_elem.get_attribute('href')
-
-                            # 判斷活動類型
-                            activity_type = 'unknown'
-                            if 'resource' in activity_elem.get_attribute('class'):
-                                activity_type = 'resource'
-                            elif 'assign' in activity_elem.get_attribute('class'):
-                                activity_type = 'assignment'
-                            elif 'forum' in activity_elem.get_attribute('class'):
-                                activity_type = 'forum'
-                            elif 'quiz' in activity_elem.get_attribute('class'):
-                                activity_type = 'quiz'
-                            elif 'url' in activity_elem.get_attribute('class'):
-                                activity_type = 'url'
-
-                            if activity_name and activity_url:
-                                activities.append({
-                                    'name': activity_name,
-                                    'url': activity_url,
-                                    'type': activity_type
-                                })
-
-                        except NoSuchElementException:
-                            continue
-
-                    course['sections'].append({
-                        'index': idx,
-                        'title': section_title,
-                        'activities': activities
-                    })
-
-                except NoSuchElementException:
-                    continue
+        Raises:
+            ParseError: 頁面上沒有課程章節
+            WebDriverException: 頁面載入失敗
+        """
+        if not self.driver:
+            raise RuntimeError("瀏覽器未啟動")
 
-            print(f"✓ 解析完成: 找到 {len(course['sections'])} 個章節")
-            return course
+        print(f"→ 正在解析課程: {course['name']}")
+        self._open(course['url'])
+        self.waits.selector('course_page', 'li.section.main')
 
-        except Exception as e:
-            print(f"✗ 解析課程內容失敗: {e}")
-            return course
+        # 一次取回整頁 HTML 在本地解析，避免每個元素都要往返 chromedriver
+        self._last_html = self.driver.page_source
+        course['sections'].extend(parse_course_sections(self._last_html, self.driver.current_url))
 
-    def scrape_all(self) -> Dict[str, Any]:
+        print(f"✓ 解析完成: 找到 {len(course['sections'])} 個章節")
+        return course
+
+    def scrape_all(self, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """
         完整爬取流程：登入 -> 獲取課程 -> 解析內容
 
+        Args:
+            progress: 進度回呼，依序回報 login、course_list、course_content 階段
+
         Returns:
-            包含所有課程資料的字典
+            包含所有課程資料的字典；登入失敗時 courses 為空並帶有 error 欄位
+            （與「沒有選修任何課程」區分，呼叫端不應將其視為有效資料）
         """
+        report = progress or (lambda phase, done, total: None)
+
         result = {
             'timestamp': datetime.now().isoformat(),
             'base_url': self.base_url,
@@ -270,20 +555,23 @@ class MoodleScraper:
         print("=" * 60)
 
         # 登入
-        if not self.login():
+        report('login', 0, 0)
+        if not self.run_phase('login', self.login):
             print("✗ 無法繼續，登入失敗")
+            result['error'] = '登入失敗'
             return result
 
         # 獲取課程列表
-        courses = self.get_courses()
+        report('course_list', 0, 0)
+        courses = self.run_phase('course_list', self.get_courses)
         if not courses:
             print("✗ 未找到任何課程")
             return result
 
         # 解析每門課程的內容
-        for course in courses:
-            detailed_course = self.get_course_content(course)
-            result['courses'].append(detailed_course)
+        result['courses'] = self.scrape_courses(courses, progress)
+        result['waits'] = self.waits.summary()
+        result['timings'] = self.timings.summary()
 
         print("=" * 60)
         print(f"✓ 完成！共爬取 {len(result['courses'])} 門課程")
@@ -291,17 +579,347 @@ class MoodleScraper:
 
         return result
 
-    def save_to_json(self, data: Dict[str, Any], output_path: str = "moodle_courses.json"):
+    def scrape_courses(
+        self,
+        courses: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        以最多 concurrency 個 worker 平行解析課程內容
+
+        結果依輸入順序回傳；單一課程失敗只會標記在該課程的 error 欄位。
+
+        Args:
+            courses: 課程列表
+            progress: 進度回呼，每完成一門課程回報一次 course_content
+
+        Returns:
+            包含章節內容的課程列表（順序與輸入相同）
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(courses)
+        for idx, course in self.iter_scrape_courses(courses, progress):
+            results[idx] = course
+        return results
+
+    def iter_scrape_courses(
+        self,
+        courses: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        平行解析課程內容，每完成一門課程就立即產出
+
+        每個 worker 擁有自己的瀏覽器（或 HTTP 連線）並共用已登入的 session。
+        產出順序為完成順序；單一課程失敗只會標記在該課程的 error 欄位。
+
+        Args:
+            courses: 課程列表
+            progress: 進度回呼，每完成一門課程回報一次 course_content
+
+        Yields:
+            (課程在輸入中的索引, 包含章節內容的課程)
+        """
+        total = len(courses)
+        if progress:
+            progress('course_content', 0, total)
+
+        worker_count = min(self.concurrency, total)
+        if worker_count <= 1:
+            for idx, course in enumerate(courses):
+                detailed = self._scrape_course_isolated(self, course)
+                self.yield_browser()
+                if progress:
+                    progress('course_content', idx + 1, total)
+                yield idx, detailed
+            return
+
+        workers = [self]
+        for _ in range(worker_count - 1):
+            try:
+                with self.timings.span('driver_start'):
+                    workers.append(self._spawn_worker())
+            except Exception as e:
+                print(f"→ 無法啟動更多 worker（{e}），以 {len(workers)} 個 worker 繼續")
+                break
+
+        print(f"→ 以 {len(workers)} 個 worker 平行解析 {total} 門課程")
+        pending: Queue = Queue()
+        for item in enumerate(courses):
+            pending.put(item)
+        finished: Queue = Queue()
+
+        def run(worker: MoodleScraper):
+            try:
+                while True:
+                    try:
+                        idx, course = pending.get_nowait()
+                    except Empty:
+                        return
+                    finished.put((idx, self._scrape_course_isolated(worker, course)))
+                    if not worker.yield_browser():
+                        return
+            except Exception as e:
+                # 目前的課程已放入 finished，剩下的課程留給其他 worker
+                print(f"✗ worker 中止: {e}")
+
+        executor = ThreadPoolExecutor(max_workers=len(workers))
+        try:
+            runs = [executor.submit(run, worker) for worker in workers]
+
+            for done in range(1, total + 1):
+                item = self._next_finished(finished, pending, runs)
+                if item is None:
+                    break
+                idx, course = item
+                if progress:
+                    progress('course_content', done, total)
+                yield idx, course
+        finally:
+            # 呼叫端提前結束時清空待處理課程，讓 worker 盡快停止
+            while True:
+                try:
+                    pending.get_nowait()
+                except Empty:
+                    break
+            executor.shutdown(wait=True)
+            for worker in workers[1:]:
+                self.waits.records.extend(worker.waits.records)
+                worker.close()
+
+    @staticmethod
+    def _next_finished(finished: Queue, pending: Queue, runs: List[Future]) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        等待下一門完成的課程
+
+        所有 worker 都已結束（例如讓出瀏覽器後無法重新取得）但仍有課程待處理時，
+        不再等待，直接將該課程標記錯誤後回傳。
+
+        Returns:
+            (課程索引, 課程)，沒有任何課程可回傳時為 None
+        """
+        while True:
+            try:
+                return finished.get(timeout=WORKER_CHECK_SECONDS)
+            except Empty:
+                if not all(run.done() for run in runs):
+                    continue
+
+            # worker 都已結束，不會再有新的結果
+            try:
+                return finished.get_nowait()
+            except Empty:
+                pass
+            try:
+                idx, course = pending.get_nowait()
+            except Empty:
+                return None
+            course['error'] = '所有 worker 都已停止，未解析此課程'
+            return idx, course
+
+    def enrich_assignments(self, courses: List[Dict[str, Any]]) -> int:
+        """
+        批次補齊課程中作業活動的截止時間（due_date）與繳交狀態（status）
+
+        不開啟個別作業頁面，頁面載入數只與課程數有關，見 load_assignment_info。
+
+        Args:
+            courses: 包含章節內容的課程（就地更新）
+
+        Returns:
+            補齊的作業數
+        """
+        cmids = assignment_cmids(courses)
+        if not cmids:
+            return 0
+
+        with self.timings.span('assignment_info'):
+            enriched = apply_assignment_info(courses, self.load_assignment_info(cmids))
+        print(f"✓ 已補齊 {enriched} 個作業的截止時間與繳交狀態")
+        return enriched
+
+    def load_assignment_info(self, cmids: Dict[str, List[str]]) -> Dict[str, Dict[str, Any]]:
+        """
+        從彙整頁面取得作業的截止時間與繳交狀態
+
+        依序使用儀表板時間軸（一次 AJAX 呼叫，所有課程未繳交的作業）、
+        行事曆「即將到來」頁（一頁，所有課程即將到期的作業），
+        最後只對仍有作業缺少資訊的課程開啟作業總覽頁（mod/assign/index.php，每門課程一頁）。
+        各來源失敗時略過，不影響其他來源。
+
+        Args:
+            cmids: 課程 ID 對應作業的課程模組 ID
+
+        Returns:
+            課程模組 ID 對應 {due_date, status}
+        """
+        timeline = self._load_action_events()
+        calendar = self._load_calendar_upcoming()
+        known = merge_assignment_info(timeline, calendar)
+
+        index: Dict[str, Dict[str, Any]] = {}
+        for course_id, course_cmids in cmids.items():
+            if all(is_complete(known.get(cmid)) for cmid in course_cmids):
+                continue
+            try:
+                html, _ = self._load_page(f"{self.base_url}/mod/assign/index.php?id={course_id}")
+                index.update(parse_assign_index(html))
+            except Exception as e:
+                print(f"→ 無法解析課程 {course_id} 的作業總覽（{e}）")
+
+        # 作業總覽含已繳交的狀態，優先於只列出未繳交作業的時間軸
+        return merge_assignment_info(index, timeline, calendar)
+
+    def _load_action_events(self) -> Dict[str, Dict[str, Any]]:
+        """以時間軸 AJAX API 取得未繳交作業，無法使用時回傳空結果"""
+        call = self._ajax_caller()
+        if call is None:
+            return {}
+        try:
+            return collect_action_events(call)
+        except Exception as e:
+            print(f"→ 時間軸 API 無法使用（{e}）")
+            return {}
+
+    def _load_calendar_upcoming(self) -> Dict[str, Dict[str, Any]]:
+        """解析行事曆「即將到來」頁，無法使用時回傳空結果"""
+        try:
+            html, _ = self._load_page(f"{self.base_url}/calendar/view.php?view=upcoming")
+            return parse_calendar_upcoming(html)
+        except Exception as e:
+            print(f"→ 無法解析行事曆（{e}）")
+            return {}
+
+    def _load_page(self, url: str) -> Tuple[str, str]:
+        """
+        載入頁面並等待前端請求完成
+
+        Returns:
+            (HTML, 最終 URL)
+        """
+        self._open(url)
+        self.waits.network_idle('assignment_info')
+        return self.driver.page_source, self.driver.current_url
+
+    def _scrape_course_isolated(self, worker: "MoodleScraper", course: Dict[str, Any]) -> Dict[str, Any]:
+        """解析單一課程並計時，例外只影響該課程"""
+        with self.timings.span('course_page') as span:
+            try:
+                course = worker.get_course_content(course)
+            except Exception as e:
+                print(f"✗ 解析課程失敗（{course.get('name')}）: {e}")
+                course['error'] = str(e)
+            if 'error' in course:
+                span.fail()
+            return course
+
+    def _spawn_worker(self) -> "MoodleScraper":
+        """
+        建立共用目前 session 的 worker（另一個瀏覽器）
+
+        WebDriver 池已滿時不等待，直接拋出例外。
+
+        Returns:
+            已登入的 worker
+        """
+        worker = MoodleScraper(
+            self.base_url,
+            self.username,
+            self.password,
+            self.headless,
+            pool=self.pool,
+            session_store=self.session_store,
+            profile=self.profile,
+            login_profile=self.login_profile,
+            wait_timeouts=self.waits.timeouts
+        )
+        worker._is_worker = True
+        worker.start(acquire_timeout=0)
+        try:
+            worker.adopt_session(self.driver.get_cookies())
+        except Exception:
+            worker.close()
+            raise
+        return worker
+
+    def yield_browser(self) -> bool:
+        """
+        在課程之間讓出瀏覽器：已載入一個時間片的頁面且其他帳號正在等待時（見 budget.AccountPool），
+        歸還瀏覽器並重新排隊，取回後沿用原本的 session cookie
+
+        Returns:
+            是否繼續解析（worker 讓出後即結束，剩下的課程由其他 worker 處理）
+        """
+        should_yield = getattr(self.pool, 'should_yield', None)
+        if not self._lease or not should_yield or not should_yield(self._lease.pages):
+            return True
+
+        cookies = self.driver.get_cookies()
+        self.close()
+        if self._is_worker:
+            return False
+
+        print("→ 讓出瀏覽器給其他帳號，重新排隊")
+        try:
+            with self.timings.span('driver_start'):
+                self.start()
+            self.adopt_session(cookies)
+        except Exception as e:
+            # 之後的課程會各自標記錯誤
+            print(f"✗ 無法重新取得瀏覽器: {e}")
+        return True
+
+    def adopt_session(self, cookies: List[Dict[str, Any]]):
+        """
+        直接寫入另一個瀏覽器的 session cookie（不驗證）
+
+        Args:
+            cookies: WebDriver get_cookies() 的結果
+        """
+        # 必須先位於 Moodle 網域才能寫入 cookie
+        self._open(self.base_url)
+        self.driver.delete_all_cookies()
+        for cookie in cookies:
+            try:
+                self.driver.add_cookie(cookie)
+            except WebDriverException:
+                continue
+
+    def cookie_header(self) -> Optional[str]:
+        """
+        目前 session 的 Cookie header，供瀏覽器以外的 HTTP 請求使用（例如下載資源檔案）
+
+        Returns:
+            Cookie header，瀏覽器未啟動時回傳 None
+        """
+        if not self.driver:
+            return None
+        return "; ".join(f"{c['name']}={c['value']}" for c in self.driver.get_cookies())
+
+    def save_to_json(
+        self,
+        data: Dict[str, Any],
+        output_path: str = "moodle_courses.json",
+        indent: Optional[int] = None
+    ):
         """
         將資料儲存為 JSON 檔案
 
+        預設寫出不縮排的精簡格式，並以串流分段寫入（不先在記憶體中組出整份字串）；
+        檔名以 .gz 結尾時以 gzip 壓縮寫入。
+
         Args:
             data: 要儲存的資料
             output_path: 輸出檔案路徑
+            indent: 縮排空格數（None 為精簡格式，方便閱讀時可設為 2）
         """
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        separators = (',', ':') if indent is None else (',', ': ')
+        if output_path.endswith('.gz'):
+            f = gzip.open(output_path, 'wt', encoding='utf-8', compresslevel=6)
+        else:
+            f = open(output_path, 'w', encoding='utf-8', buffering=1 << 20)
+        with f:
+            json.dump(data, f, ensure_ascii=False, indent=indent, separators=separators)
 
         print(f"✓ 已儲存至: {output_path}")
@@ -0,0 +1,379 @@
+"""Moodle 頁面 HTML 解析（不需瀏覽器）"""
+import copy
+import re
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from urllib.parse import parse_qs, urljoin, urlparse
+
+import lxml.html
+
+
+_USERMENU_RE = re.compile(r'class="[^"]*\busermenu\b')
+
+_MODTYPE_RE = re.compile(r'\bmodtype_(\w+)')
+
+_ASSIGN_CMID_RE = re.compile(r'/mod/assign/view\.php\?(?:[^#]*&)?id=(\d+)')
+
+# 中文介面的日期，例如「2026年 10月 17日(週五) 下午 11:59」或「2026年 10月 17日(星期五) 23:59」
+_ZH_DATE_RE = re.compile(
+    r'(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日.*?(上午|下午)?\s*(\d{1,2}):(\d{2})'
+)
+
+# 英文介面的日期格式（strftimedatetime 與其常見變體）
+_EN_DATE_FORMATS = (
+    '%A, %d %B %Y, %I:%M %p',
+    '%A, %d %B %Y, %H:%M',
+    '%d %B %Y, %I:%M %p',
+    '%d %B %Y, %H:%M',
+)
+
+# Moodle 模組名稱（modname）對應到爬蟲使用的活動類型，其餘沿用模組名稱
+MODNAME_TYPES = {
+    'assign': 'assignment',
+}
+
+
+class ParseError(Exception):
+    """頁面結構不符預期，無法解析"""
+
+
+def is_logged_in(html: str) -> bool:
+    """
+    判斷頁面是否為已登入狀態（出現使用者選單）
+
+    Args:
+        html: 頁面 HTML
+
+    Returns:
+        是否已登入
+    """
+    return _USERMENU_RE.search(html) is not None
+
+
+def classify_activity(class_attr: str) -> str:
+    """
+    依 activity 元素的 class 判斷活動類型
+
+    優先使用 Moodle 標示模組的 modtype_* class；沒有時才以關鍵字比對。
+
+    Args:
+        class_attr: activity 元素的 class 屬性
+
+    Returns:
+        活動類型
+    """
+    match = _MODTYPE_RE.search(class_attr)
+    if match:
+        return MODNAME_TYPES.get(match.group(1), match.group(1))
+
+    if 'resource' in class_attr:
+        return 'resource'
+    elif 'assign' in class_attr:
+        return 'assignment'
+    elif 'forum' in class_attr:
+        return 'forum'
+    elif 'quiz' in class_attr:
+        return 'quiz'
+    elif 'url' in class_attr:
+        return 'url'
+    return 'unknown'
+
+
+def _visible_text(elem) -> str:
+    """取得元素文字，略過螢幕閱讀器專用的 .accesshide 內容"""
+    elem = copy.deepcopy(elem)
+    for hidden in elem.cssselect(".accesshide"):
+        hidden.drop_tree()
+    return ' '.join(elem.text_content().split())
+
+
+def parse_course_list(html: str, page_url: str) -> List[Dict[str, Any]]:
+    """
+    解析課程列表頁（/my/）的 .coursename 連結
+
+    Args:
+        html: 頁面 HTML
+        page_url: 頁面 URL（用於轉換相對連結）
+
+    Returns:
+        課程列表，每個課程包含 id, name, url
+
+    Raises:
+        ParseError: 頁面沒有任何靜態課程連結（例如由 AJAX 產生）
+    """
+    doc = lxml.html.fromstring(html)
+
+    courses = []
+    for elem in doc.cssselect(".coursename a"):
+        course_name = _visible_text(elem)
+        href = elem.get('href')
+        if not course_name or not href:
+            continue
+
+        course_url = urljoin(page_url, href)
+        # 從 URL 中提取課程 ID
+        course_id = course_url.split('id=')[-1] if 'id=' in course_url else None
+
+        courses.append({
+            'id': course_id,
+            'name': course_name,
+            'url': course_url,
+            'sections': []
+        })
+
+    if not courses:
+        raise ParseError("課程列表頁沒有 .coursename 連結")
+
+    return courses
+
+
+def parse_course_title(html: str) -> Optional[str]:
+    """
+    解析課程頁標題中的課程名稱
+
+    Args:
+        html: 頁面 HTML
+
+    Returns:
+        課程名稱，找不到時回傳 None
+    """
+    doc = lxml.html.fromstring(html)
+    headings = doc.cssselect(".page-header-headings h1, #page-header h1")
+    if not headings:
+        return None
+    return _visible_text(headings[0]) or None
+
+
+def parse_course_sections(html: str, page_url: str) -> List[Dict[str, Any]]:
+    """
+    解析課程頁的章節與活動
+
+    Args:
+        html: 頁面 HTML
+        page_url: 頁面 URL（用於轉換相對連結）
+
+    Returns:
+        章節列表，每個章節包含 index, title, activities
+
+    Raises:
+        ParseError: 頁面沒有 li.section.main 章節
+    """
+    doc = lxml.html.fromstring(html)
+    section_elems = doc.cssselect("li.section.main")
+    if not section_elems:
+        raise ParseError("課程頁沒有 li.section.main 章節")
+
+    sections = []
+    for idx, section_elem in enumerate(section_elems):
+        title_elems = section_elem.cssselect(".sectionname")
+        if not title_elems:
+            continue
+        section_title = _visible_text(title_elems[0]) or f"Section {idx}"
+
+        activities = []
+        for activity_elem in section_elem.cssselect(".activity"):
+            links = activity_elem.cssselect("a")
+            if not links:
+                continue
+
+            activity_name = _visible_text(links[0])
+            href = links[0].get('href')
+            if activity_name and href:
+                activities.append({
+                    'name': activity_name,
+                    'url': urljoin(page_url, href),
+                    'type': classify_activity(activity_elem.get('class') or '')
+                })
+
+        sections.append({
+            'index': idx,
+            'title': section_title,
+            'activities': activities
+        })
+
+    return sections
+
+
+def assign_cmid(url: str) -> Optional[str]:
+    """從作業連結（mod/assign/view.php?id=）取得課程模組 ID"""
+    match = _ASSIGN_CMID_RE.search(url or '')
+    return match.group(1) if match else None
+
+
+def parse_resource_link(html: str, page_url: str) -> Optional[str]:
+    """
+    解析資源頁（mod/resource/view.php）中的檔案連結
+
+    資源設定為嵌入或開啟顯示時，Moodle 回傳頁面而非直接導向檔案；
+    檔案位於 .resourceworkaround 連結、嵌入的 object/iframe 或任一 pluginfile.php 連結。
+
+    Args:
+        html: 頁面 HTML
+        page_url: 頁面 URL（用於轉換相對連結）
+
+    Returns:
+        檔案 URL，找不到時回傳 None
+    """
+    doc = lxml.html.fromstring(html)
+    for selector, attribute in (
+        (".resourceworkaround a", 'href'),
+        ("object#resourceobject, object.resourceobject", 'data'),
+        ("iframe#resourceobject", 'src'),
+        ("a[href*='pluginfile.php']", 'href'),
+    ):
+        for elem in doc.cssselect(selector):
+            if elem.get(attribute):
+                return urljoin(page_url, elem.get(attribute))
+    return None
+
+
+def parse_moodle_date(text: str) -> Optional[str]:
+    """
+    解析 Moodle 頁面上顯示的日期時間
+
+    Args:
+        text: 日期文字（英文或中文介面）
+
+    Returns:
+        ISO 格式日期時間，無法解析時回傳 None
+    """
+    text = ' '.join((text or '').split())
+    if not text:
+        return None
+
+    match = _ZH_DATE_RE.search(text)
+    if match:
+        year, month, day, period, hour, minute = match.groups()
+        hour = int(hour)
+        if period == '下午' and hour < 12:
+            hour += 12
+        elif period == '上午' and hour == 12:
+            hour = 0
+        return datetime(int(year), int(month), int(day), hour, int(minute)).isoformat()
+
+    for fmt in _EN_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def submission_status(text: str, due_date: Optional[str], now: Optional[datetime] = None) -> Optional[str]:
+    """
+    依作業總覽中的繳交狀態文字判斷作業狀態
+
+    Args:
+        text: 繳交欄位文字（例如 Submitted for grading、No submission）
+        due_date: ISO 格式截止時間
+        now: 判斷是否逾期的基準時間
+
+    Returns:
+        submitted、draft、pending 或 overdue；無法判斷（例如教師檢視的繳交人數）時回傳 None
+    """
+    lowered = ' '.join((text or '').split()).lower()
+    if not lowered or lowered.isdigit():
+        return None
+
+    if 'draft' in lowered or '草稿' in lowered:
+        return 'draft'
+    if not any(word in lowered for word in ('no submission', 'not submitted', '沒有繳交', '未繳交', '尚未')):
+        if any(word in lowered for word in ('submitted', '已繳交', '已提交', '已送出')):
+            return 'submitted'
+
+    if due_date and datetime.fromisoformat(due_date) < (now or datetime.now()):
+        return 'overdue'
+    return 'pending'
+
+
+def parse_assign_index(html: str, now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    解析課程作業總覽頁（mod/assign/index.php?id=）
+
+    一頁即包含該課程所有作業的截止時間與學生自己的繳交狀態。
+
+    Args:
+        html: 頁面 HTML
+        now: 判斷是否逾期的基準時間
+
+    Returns:
+        課程模組 ID 對應 {due_date, status}
+
+    Raises:
+        ParseError: 頁面沒有作業總覽表格
+    """
+    doc = lxml.html.fromstring(html)
+    tables = doc.cssselect("table.generaltable")
+    if not tables:
+        raise ParseError("作業總覽頁沒有 table.generaltable")
+
+    table = tables[0]
+    headers = [_visible_text(th).lower() for th in table.cssselect("thead th")]
+
+    def column(*words: str) -> Optional[int]:
+        for idx, header in enumerate(headers):
+            if any(word in header for word in words):
+                return idx
+        return None
+
+    due_col = column('due', '截止', '到期')
+    submission_col = column('submission', '繳交', '提交')
+
+    info = {}
+    for row in table.cssselect("tbody tr"):
+        cells = row.cssselect("td")
+        for idx, cell in enumerate(cells):
+            cmid = next((assign_cmid(a.get('href')) for a in cell.cssselect("a") if assign_cmid(a.get('href'))), None)
+            if cmid:
+                break
+        else:
+            continue
+
+        # 沒有表頭時依 Moodle 預設欄位順序：作業、截止時間、繳交狀態
+        due_idx = due_col if due_col is not None else idx + 1
+        submission_idx = submission_col if submission_col is not None else idx + 2
+        due_date = parse_moodle_date(_visible_text(cells[due_idx])) if due_idx < len(cells) else None
+        status = None
+        if submission_idx < len(cells):
+            status = submission_status(_visible_text(cells[submission_idx]), due_date, now)
+
+        info[cmid] = {'due_date': due_date, 'status': status}
+
+    return info
+
+
+def parse_calendar_upcoming(html: str) -> Dict[str, Dict[str, Any]]:
+    """
+    解析行事曆「即將到來」頁（calendar/view.php?view=upcoming）中的作業截止事件
+
+    一頁即包含所有課程即將到期的作業。
+
+    Args:
+        html: 頁面 HTML
+
+    Returns:
+        課程模組 ID 對應 {due_date}
+    """
+    doc = lxml.html.fromstring(html)
+
+    info = {}
+    for event in doc.cssselect('[data-type="event"]'):
+        if event.get('data-event-component') not in (None, 'mod_assign'):
+            continue
+
+        cmid = next((assign_cmid(a.get('href')) for a in event.cssselect("a") if assign_cmid(a.get('href'))), None)
+        if not cmid:
+            continue
+
+        # 事件日期連結到當天的行事曆，time 參數即為事件時間
+        due_date = None
+        for link in event.cssselect('a[href*="view=day"]'):
+            timestamp = parse_qs(urlparse(link.get('href')).query).get('time')
+            if timestamp and timestamp[0].isdigit():
+                due_date = datetime.fromtimestamp(int(timestamp[0])).isoformat()
+                break
+
+        if due_date:
+            info[cmid] = {'due_date': due_date}
+
+    return info
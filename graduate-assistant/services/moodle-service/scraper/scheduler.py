@@ -0,0 +1,373 @@
+"""
+Multi-account sync scheduler
+
+Runs full syncs for a cohort of accounts on a fixed set of runner threads.
+A batch of accounts is queued at once, and each account becomes a SyncJob
+in the shared JobStore, so progress and results use the same endpoints as
+single syncs. Periodic schedules put their accounts back in the queue once
+per interval. Each account runs at a random offset (jitter) within the
+period, so a cohort does not hit Moodle at the same moment.
+
+The scheduler limits how many syncs run at once. It does not limit
+browsers: those come from the shared BrowserBudget (see budget.py), which
+serves accounts round-robin. An account that is already queued or running
+is not queued a second time. A batch attaches to the existing job, and a
+schedule skips that run. Background refreshes of a single account (stale
+snapshots) are queued with refresh(), without a batch, and at most once per
+interval.
+"""
+
+import heapq
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from .jobs import JobStore, SyncJob
+
+# Takes a progress callback and returns a SyncResponse payload, like MoodleService.sync_all
+SyncFn = Callable[[Callable[[str, int, int], None]], Dict[str, Any]]
+
+
+class AccountSync:
+    """One account's sync as the scheduler runs it"""
+
+    def __init__(self, key: Hashable, username: str, run: SyncFn):
+        """
+        Initialize account sync
+
+        Args:
+            key: Identity used to avoid overlapping runs, e.g. (base_url, username)
+            username: Shown in batch and schedule status
+            run: Blocking sync callable
+        """
+        self.key = key
+        self.username = username
+        self.run = run
+
+
+def _accounts_per_minute(finished: int, seconds: float) -> float:
+    return round(finished / (seconds / 60), 2) if finished and seconds > 0 else 0.0
+
+
+def _job_summary(username: str, job: SyncJob) -> Dict[str, Any]:
+    return {"username": username, **job.to_status()}
+
+
+class SyncBatch:
+    """Accounts submitted together, and the jobs syncing them"""
+
+    def __init__(self, batch_id: str, entries: List[Tuple[str, SyncJob]]):
+        self.id = batch_id
+        self.entries = entries
+        self.created_at = time.time()
+
+    def to_status(self) -> Dict[str, Any]:
+        """Per-account job status, totals and throughput of the batch"""
+        jobs = [job for _, job in self.entries]
+        counts = {status: 0 for status in ("queued", "running", "succeeded", "failed")}
+        for job in jobs:
+            counts[job.status] += 1
+
+        started = [job.started_at for job in jobs if job.started_at]
+        finished = [job.finished_at for job in jobs if job.finished_at]
+        done = counts["succeeded"] + counts["failed"]
+        end = max(finished) if done == len(jobs) and finished else time.time()
+        elapsed = end - min(started) if started else 0.0
+
+        return {
+            "batch_id": self.id,
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+            "accounts": len(jobs),
+            **counts,
+            "finished": done == len(jobs),
+            "elapsed_seconds": round(elapsed, 2),
+            "accounts_per_minute": _accounts_per_minute(done, elapsed),
+            "jobs": [_job_summary(username, job) for username, job in self.entries],
+        }
+
+
+class SyncSchedule:
+    """Accounts synced again every interval, each at a jittered offset"""
+
+    def __init__(self, schedule_id: str, accounts: List[AccountSync], interval_seconds: float, jitter_seconds: float):
+        self.id = schedule_id
+        self.accounts = accounts
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = min(jitter_seconds, interval_seconds)
+        self.started_at = time.time()
+        self.cancelled = False
+        self.runs = 0
+        self.skipped = 0
+        self.next_runs: Dict[str, float] = {}
+        self.last_jobs: Dict[str, SyncJob] = {}
+
+    def due_at(self, period: int) -> float:
+        """Start of the period plus a fresh random offset within the jitter"""
+        return self.started_at + period * self.interval_seconds + random.uniform(0, self.jitter_seconds)
+
+    def to_status(self) -> Dict[str, Any]:
+        """Settings, counters and the latest job of every account"""
+        return {
+            "schedule_id": self.id,
+            "interval_seconds": self.interval_seconds,
+            "jitter_seconds": self.jitter_seconds,
+            "accounts": len(self.accounts),
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "cancelled": self.cancelled,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "next_runs": {
+                username: datetime.fromtimestamp(due).isoformat()
+                for username, due in self.next_runs.items()
+            },
+            "jobs": [_job_summary(username, job) for username, job in self.last_jobs.items()],
+        }
+
+
+class SyncScheduler:
+    """Queue of account syncs served by a fixed number of runner threads"""
+
+    def __init__(self, job_store: JobStore, max_accounts: int = 4, window_seconds: int = 600):
+        """
+        Initialize scheduler
+
+        Args:
+            job_store: Store the per-account jobs are registered in
+            max_accounts: Syncs running at the same time
+            window_seconds: Window over which accounts per minute is measured
+        """
+        if max_accounts < 1:
+            raise ValueError("max_accounts must be at least 1")
+
+        self.job_store = job_store
+        self.max_accounts = max_accounts
+        self.window_seconds = window_seconds
+
+        self._cond = threading.Condition()
+        self._queue: Deque[Tuple[AccountSync, SyncJob]] = deque()
+        # key -> queued or running job
+        self._active: Dict[Hashable, SyncJob] = {}
+        self._running = 0
+        self._batches: Dict[str, SyncBatch] = {}
+        self._schedules: Dict[str, SyncSchedule] = {}
+        # key -> when its last background refresh was queued
+        self._refreshed: Dict[Hashable, float] = {}
+        # (due, sequence, schedule, account index, period)
+        self._timers: List[Tuple[float, int, SyncSchedule, int, int]] = []
+        self._sequence = 0
+        self._finished: Deque[float] = deque()
+        self._first_started: Optional[float] = None
+        self._succeeded = 0
+        self._failed = 0
+        self._skipped = 0
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    def submit(self, accounts: List[AccountSync]) -> SyncBatch:
+        """
+        Queue a sync for every account
+
+        Returns:
+            Batch whose status lists one job per account
+        """
+        entries = []
+        seen = set()
+        with self._cond:
+            self._start_threads()
+            for account in accounts:
+                if account.key in seen:
+                    continue
+                seen.add(account.key)
+                job = self._active.get(account.key) or self._enqueue(account)
+                entries.append((account.username, job))
+
+            batch = SyncBatch(secrets.token_urlsafe(12), entries)
+            self._batches[batch.id] = batch
+            self._evict_batches()
+            self._cond.notify_all()
+        return batch
+
+    def refresh(self, account: AccountSync, min_interval: float = 0) -> bool:
+        """
+        Queue a background sync of one account, without a batch
+
+        Nothing is queued while the account is already queued or running, or
+        when its previous refresh was queued less than min_interval seconds
+        ago. A refresh that keeps failing is therefore retried once per
+        interval, not once per call.
+
+        Returns:
+            Whether a sync was queued
+        """
+        now = time.time()
+        with self._cond:
+            if self._closed or account.key in self._active:
+                return False
+            if now - self._refreshed.get(account.key, float("-inf")) < min_interval:
+                return False
+
+            for key in [key for key, queued_at in self._refreshed.items() if now - queued_at >= min_interval]:
+                del self._refreshed[key]
+            self._refreshed[account.key] = now
+            self._start_threads()
+            self._enqueue(account)
+            self._cond.notify_all()
+        return True
+
+    def schedule(self, accounts: List[AccountSync], interval_seconds: float, jitter_seconds: float = 0) -> SyncSchedule:
+        """
+        Sync every account once per interval, at a random offset within the jitter
+
+        Args:
+            accounts: Accounts to sync
+            interval_seconds: Period between two syncs of the same account
+            jitter_seconds: Runs are spread over this much of each period (at most the interval)
+
+        Returns:
+            Schedule; the first period starts now
+        """
+        if interval_seconds <= 0:
+            raise ValueError("interval_seconds must be positive")
+
+        schedule = SyncSchedule(secrets.token_urlsafe(12), accounts, interval_seconds, max(0.0, jitter_seconds))
+        with self._cond:
+            self._start_threads()
+            self._schedules[schedule.id] = schedule
+            for index in range(len(accounts)):
+                self._add_timer(schedule, index, 0)
+            self._cond.notify_all()
+        return schedule
+
+    def get_batch(self, batch_id: str) -> Optional[SyncBatch]:
+        with self._cond:
+            return self._batches.get(batch_id)
+
+    def get_schedule(self, schedule_id: str) -> Optional[SyncSchedule]:
+        with self._cond:
+            return self._schedules.get(schedule_id)
+
+    def cancel(self, schedule_id: str) -> Optional[SyncSchedule]:
+        """Stop a schedule; runs already queued still happen"""
+        with self._cond:
+            schedule = self._schedules.pop(schedule_id, None)
+            if schedule:
+                schedule.cancelled = True
+                schedule.next_runs.clear()
+                self._timers = [timer for timer in self._timers if timer[2] is not schedule]
+                heapq.heapify(self._timers)
+            return schedule
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, outcomes and accounts per minute over the recent window"""
+        with self._cond:
+            now = time.time()
+            self._trim_finished(now)
+            since = max(now - self.window_seconds, self._first_started or now)
+            return {
+                "max_accounts": self.max_accounts,
+                "queued": len(self._queue),
+                "running": self._running,
+                "schedules": len(self._schedules),
+                "succeeded": self._succeeded,
+                "failed": self._failed,
+                "skipped": self._skipped,
+                "window_seconds": self.window_seconds,
+                "accounts_per_minute": _accounts_per_minute(len(self._finished), now - since),
+            }
+
+    def shutdown(self):
+        """Stop timers and runners; running syncs finish, queued ones are dropped"""
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._timers.clear()
+            self._cond.notify_all()
+
+    # Internal helpers (called with the lock held unless noted)
+
+    def _start_threads(self):
+        if self._threads or self._closed:
+            return
+        for index in range(self.max_accounts):
+            thread = threading.Thread(target=self._run_accounts, name=f"sync-scheduler-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._run_timers, name="sync-scheduler-timer", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _enqueue(self, account: AccountSync) -> SyncJob:
+        job = self.job_store.create()
+        self._active[account.key] = job
+        self._queue.append((account, job))
+        return job
+
+    def _add_timer(self, schedule: SyncSchedule, index: int, period: int):
+        due = schedule.due_at(period)
+        schedule.next_runs[schedule.accounts[index].username] = due
+        self._sequence += 1
+        heapq.heappush(self._timers, (due, self._sequence, schedule, index, period))
+
+    def _run_timers(self):
+        """Timer thread: queue scheduled accounts when their run is due"""
+        with self._cond:
+            while not self._closed:
+                now = time.time()
+                if not self._timers or self._timers[0][0] > now:
+                    self._cond.wait(self._timers[0][0] - now if self._timers else None)
+                    continue
+
+                _, _, schedule, index, period = heapq.heappop(self._timers)
+                account = schedule.accounts[index]
+                if account.key in self._active:
+                    # The previous run has not finished yet
+                    schedule.skipped += 1
+                    self._skipped += 1
+                else:
+                    schedule.last_jobs[account.username] = self._enqueue(account)
+                    schedule.runs += 1
+                    self._cond.notify_all()
+                self._add_timer(schedule, index, period + 1)
+
+    def _run_accounts(self):
+        """Runner thread: sync queued accounts one at a time"""
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                account, job = self._queue.popleft()
+                self._running += 1
+                if self._first_started is None:
+                    self._first_started = time.time()
+
+            # Outside the lock: the sync runs for minutes
+            job.run(account.run)
+
+            with self._cond:
+                self._running -= 1
+                self._active.pop(account.key, None)
+                if job.status == "succeeded":
+                    self._succeeded += 1
+                else:
+                    self._failed += 1
+                self._finished.append(time.time())
+                self._trim_finished(time.time())
+                self._cond.notify_all()
+
+    def _trim_finished(self, now: float):
+        while self._finished and now - self._finished[0] > self.window_seconds:
+            self._finished.popleft()
+
+    def _evict_batches(self):
+        """Forget batches whose jobs have all been evicted from the job store"""
+        for batch_id in [
+            batch_id for batch_id, batch in self._batches.items()
+            if all(self.job_store.get(job.id) is None for _, job in batch.entries)
+        ]:
+            del self._batches[batch_id]
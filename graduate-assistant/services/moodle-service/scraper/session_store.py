@@ -0,0 +1,148 @@
+"""
+In-memory store of authenticated Moodle sessions
+
+After a successful SSO login the scraper captures the Moodle cookies and
+saves them here keyed by (base_url, username). Later scrapes inject those
+cookies into the browser and only fall back to the full SSO flow when the
+session has expired. Each login issues a new opaque handle that API clients
+can pass back instead of re-sending credentials.
+
+Stored cookies are only reused for a caller presenting a password when it
+matches the one the session was logged in with (a salted PBKDF2 hash is kept,
+never the password). Knowing a username is not enough to take over its session.
+"""
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# PBKDF2-HMAC-SHA256 rounds for the stored password verifier
+_HASH_ITERATIONS = 100_000
+
+
+def _password_hash(password: str, salt: bytes) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, _HASH_ITERATIONS)
+
+
+class StoredSession:
+    """Authenticated cookies for one Moodle account"""
+
+    def __init__(
+        self,
+        handle: str,
+        base_url: str,
+        username: str,
+        cookies: List[Dict[str, Any]],
+        expires_at: float,
+        password: Optional[str] = None
+    ):
+        self.handle = handle
+        self.base_url = base_url
+        self.username = username
+        self.cookies = cookies
+        self.expires_at = expires_at
+        self._salt = secrets.token_bytes(16)
+        self._password_hash = _password_hash(password, self._salt) if password else None
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    def verify(self, password: str) -> bool:
+        """Whether password is the one this session was logged in with"""
+        if self._password_hash is None:
+            return False
+        return hmac.compare_digest(self._password_hash, _password_hash(password, self._salt))
+
+
+class SessionStore:
+    """Thread-safe store of Moodle session cookies with expiry"""
+
+    def __init__(self, ttl_seconds: int = 4 * 3600):
+        """
+        Initialize session store
+
+        Args:
+            ttl_seconds: Maximum lifetime of a stored session
+        """
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[Tuple[str, str], StoredSession] = {}
+        self._handles: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(base_url: str, username: str) -> Tuple[str, str]:
+        return (base_url.rstrip('/'), username)
+
+    def save(
+        self,
+        base_url: str,
+        username: str,
+        cookies: List[Dict[str, Any]],
+        password: Optional[str] = None
+    ) -> StoredSession:
+        """
+        Store cookies captured after a successful login
+
+        Every login issues a new handle; the handle of the account's previous
+        session stops working.
+
+        Args:
+            base_url: Moodle base URL
+            username: Account the cookies belong to
+            cookies: Cookies as returned by WebDriver get_cookies()
+            password: Password the login succeeded with; later callers must
+                present it to reuse the cookies
+
+        Returns:
+            The stored session
+        """
+        key = self._key(base_url, username)
+        expires_at = time.time() + self.ttl_seconds
+
+        # Respect cookies that expire before our own TTL
+        cookie_expiries = [c["expiry"] for c in cookies if c.get("expiry")]
+        if cookie_expiries:
+            expires_at = min(expires_at, min(cookie_expiries))
+
+        session = StoredSession(secrets.token_urlsafe(24), key[0], username, cookies, expires_at, password)
+        with self._lock:
+            self._drop(key)
+            self._sessions[key] = session
+            self._handles[session.handle] = key
+            return session
+
+    def get(self, base_url: str, username: str) -> Optional[StoredSession]:
+        """Get the live session for an account, if any"""
+        key = self._key(base_url, username)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session and session.expired:
+                self._drop(key)
+                return None
+            return session
+
+    def get_by_handle(self, handle: str) -> Optional[StoredSession]:
+        """Resolve a session handle returned by the login endpoint"""
+        with self._lock:
+            key = self._handles.get(handle)
+            if not key:
+                return None
+            session = self._sessions.get(key)
+            if session and session.expired:
+                self._drop(key)
+                return None
+            return session
+
+    def invalidate(self, base_url: str, username: str):
+        """Forget the cookies of an account (e.g. after Moodle rejected them)"""
+        with self._lock:
+            self._drop(self._key(base_url, username))
+
+    def _drop(self, key: Tuple[str, str]):
+        session = self._sessions.pop(key, None)
+        if session:
+            self._handles.pop(session.handle, None)
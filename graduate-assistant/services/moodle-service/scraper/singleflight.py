@@ -0,0 +1,147 @@
+"""
+Single-flight coalescing of identical concurrent scrapes
+
+When the dashboard loads it asks for /courses, /assignments and sometimes
+/sync for the same user at almost the same moment. Each of those used to
+launch its own browser, log in and walk the course pages. SingleFlight runs
+the first call for a key and makes calls that arrive while it is running wait
+for its result. The result is one login, one browser and one pass over the
+course pages.
+
+Waiting callers receive the very same result object. They must treat it as
+read-only and build their own projection from it. An exception raised by the
+call reaches every waiter. Progress reported by the running call is passed
+to the callbacks of all callers attached to it.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# Progress callback: (phase, done, total)
+ProgressCallback = Callable[[str, int, int], None]
+
+
+class Flight:
+    """One running call and the callers attached to it"""
+
+    def __init__(self):
+        self.followers = 0
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+        self._listeners: List[ProgressCallback] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, progress: Optional[ProgressCallback]):
+        if progress:
+            with self._lock:
+                self._listeners.append(progress)
+
+    def report(self, phase: str, done: int, total: int):
+        """Progress callback handed to the running call; fans out to every attached caller"""
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(phase, done, total)
+
+    def finish(self, result: Any = None, error: Optional[BaseException] = None):
+        """Publish the outcome and wake every waiting caller"""
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def wait(self) -> Any:
+        """
+        Block until the call has finished
+
+        Returns:
+            The call's result
+
+        Raises:
+            The exception the call raised
+        """
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Registry of running calls by key; a second call for a running key waits for the first"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, Flight] = {}
+        self._lock = threading.Lock()
+        self._started = 0
+        self._joined = 0
+
+    def do(self, key: Hashable, fn: Callable[[ProgressCallback], Any], progress: Optional[ProgressCallback] = None) -> Any:
+        """
+        Run fn, or wait for the call already running under the same key
+
+        Args:
+            key: Identity of the work, e.g. (base_url, username, "scrape_all")
+            fn: Blocking call taking a progress callback
+            progress: Receives the progress of whichever call does the work
+
+        Returns:
+            fn's result, shared with every caller that waited for it
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                self._started += 1
+            else:
+                flight.followers += 1
+                self._joined += 1
+            flight.subscribe(progress)
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            result = fn(flight.report)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result=result)
+        return result
+
+    def join(self, key: Hashable, progress: Optional[ProgressCallback] = None) -> Optional[Flight]:
+        """
+        Attach to the call running under key, if there is one
+
+        Lets a caller that needs only part of a larger piece of work (the
+        course list out of a full scrape) wait for that work instead of
+        starting its own.
+
+        Returns:
+            The running flight (call wait() for its result), or None
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                return None
+            flight.followers += 1
+            self._joined += 1
+            flight.subscribe(progress)
+            return flight
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls running now, calls that did the work, and calls that waited for another"""
+        with self._lock:
+            calls = self._started + self._joined
+            return {
+                "in_flight": len(self._flights),
+                "started": self._started,
+                "joined": self._joined,
+                "coalesced_ratio": round(self._joined / calls, 3) if calls else 0.0,
+            }
+
+    def _land(self, key: Hashable, flight: Flight, result: Any = None, error: Optional[BaseException] = None):
+        # Unregister first: calls arriving from now on start fresh work
+        with self._lock:
+            del self._flights[key]
+        flight.finish(result, error)
@@ -0,0 +1,342 @@
+"""
+On-disk store of the latest sync per account
+
+Every successful sync_all() writes its full result to SQLite, normalized
+into courses, sections, activities and assignments, replacing that
+account's previous snapshot in one transaction. The GET endpoints answer
+from here with indexed lookups: courses by account, activities by course or
+type, assignments by course or due date. Scraping then happens only in
+syncs (background jobs or the scheduler), and read traffic no longer turns
+into scrapes.
+
+Rows are keyed by the account (base_url, username). Due dates are stored as
+the ISO strings the scrapers produce (local time), so comparing them as text
+orders them in time.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    base_url TEXT NOT NULL,
+    username TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (base_url, username)
+);
+CREATE TABLE IF NOT EXISTS courses (
+    base_url TEXT NOT NULL,
+    username TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    url TEXT,
+    description TEXT,
+    teacher TEXT,
+    semester TEXT,
+    PRIMARY KEY (base_url, username, course_id)
+);
+CREATE TABLE IF NOT EXISTS sections (
+    base_url TEXT NOT NULL,
+    username TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    PRIMARY KEY (base_url, username, course_id, position)
+);
+CREATE TABLE IF NOT EXISTS activities (
+    base_url TEXT NOT NULL,
+    username TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    section_position INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    type TEXT,
+    name TEXT,
+    url TEXT,
+    description TEXT,
+    PRIMARY KEY (base_url, username, course_id, section_position, position)
+);
+CREATE INDEX IF NOT EXISTS activities_type ON activities (base_url, username, type);
+CREATE TABLE IF NOT EXISTS assignments (
+    base_url TEXT NOT NULL,
+    username TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    assignment_id TEXT,
+    course_id TEXT,
+    course_name TEXT,
+    name TEXT,
+    due_date TEXT,
+    status TEXT,
+    url TEXT,
+    description TEXT,
+    PRIMARY KEY (base_url, username, position)
+);
+CREATE INDEX IF NOT EXISTS assignments_course ON assignments (base_url, username, course_id);
+CREATE INDEX IF NOT EXISTS assignments_due ON assignments (base_url, username, due_date);
+"""
+
+# Tables holding one account's snapshot, cleared before it is replaced
+_ACCOUNT_TABLES = ("courses", "sections", "activities", "assignments", "snapshots")
+
+_COURSE_FIELDS = ("id", "name", "url", "description", "teacher", "semester")
+_ACTIVITY_FIELDS = ("type", "name", "url", "description")
+_ASSIGNMENT_FIELDS = ("id", "course_id", "course_name", "name", "due_date", "status", "url", "description")
+
+
+class Snapshot:
+    """When an account's stored data was scraped"""
+
+    def __init__(self, synced_at: str, stored_at: float):
+        self.synced_at = synced_at
+        self.stored_at = stored_at
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.stored_at
+
+    @property
+    def last_modified(self) -> float:
+        """Scrape time as a timestamp, for Last-Modified"""
+        try:
+            return datetime.fromisoformat(self.synced_at).timestamp()
+        except ValueError:
+            return self.stored_at
+
+
+class SnapshotStore:
+    """Thread-safe SQLite store of the latest sync per account"""
+
+    def __init__(self, path: str, stats_ttl_seconds: float = 60):
+        """
+        Initialize store, creating the database and its tables if needed
+
+        Args:
+            path: Database file (":memory:" keeps it in memory)
+            stats_ttl_seconds: How long stats() reuses its row counts (they scan whole tables)
+        """
+        self.path = path
+        self.stats_ttl_seconds = stats_ttl_seconds
+        self._counts: Optional[Dict[str, int]] = None
+        self._counted_at = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        self._writes = 0
+        self._failed_writes = 0
+        self._reads = 0
+
+    def save(self, base_url: str, username: str, data: Dict[str, Any]):
+        """
+        Replace an account's snapshot with a full sync result
+
+        Courses without an id are left out, and so is every course after the
+        first with the same id.
+
+        Args:
+            data: SyncResponse data (not an incremental diff): converted courses
+                with contents, assignments and synced_at
+
+        Raises:
+            sqlite3.Error: Nothing was written; the previous snapshot is kept
+        """
+        account = (base_url.rstrip("/"), username)
+        courses, sections, activities = [], [], []
+        stored_ids = set()
+        for course in data.get("courses", []):
+            course_id = "" if course.get("id") is None else str(course["id"])
+            if not course_id or course_id in stored_ids:
+                # The id keys the course's rows: keep the first course listed under it
+                print(f"Snapshot of {username}: skipped course {course.get('name', '')!r} (id {course_id or 'missing'})")
+                continue
+            stored_ids.add(course_id)
+            position = len(courses)
+            courses.append((*account, course_id, position, *(course.get(field, "") for field in _COURSE_FIELDS[1:])))
+            for section_position, section in enumerate(course.get("contents", [])):
+                sections.append((*account, course_id, section_position, section.get("section_name", "")))
+                for activity_position, activity in enumerate(section.get("activities", [])):
+                    activities.append((
+                        *account, course_id, section_position, activity_position,
+                        *(activity.get(field, "") for field in _ACTIVITY_FIELDS)
+                    ))
+
+        assignments = [
+            (*account, position, *(assignment.get(field) for field in _ASSIGNMENT_FIELDS))
+            for position, assignment in enumerate(data.get("assignments", []))
+        ]
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for table in _ACCOUNT_TABLES:
+                    self._conn.execute(f"DELETE FROM {table} WHERE base_url = ? AND username = ?", account)
+                self._conn.execute(
+                    "INSERT INTO snapshots VALUES (?, ?, ?, ?)",
+                    (*account, data.get("synced_at") or datetime.now().isoformat(), time.time())
+                )
+                self._conn.executemany("INSERT INTO courses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", courses)
+                self._conn.executemany("INSERT INTO sections VALUES (?, ?, ?, ?, ?)", sections)
+                self._conn.executemany("INSERT INTO activities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", activities)
+                self._conn.executemany("INSERT INTO assignments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", assignments)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._failed_writes += 1
+                raise
+            self._writes += 1
+
+    def snapshot(self, base_url: str, username: str) -> Optional[Snapshot]:
+        """When the account was last synced, or None if it never was"""
+        rows = self._query(
+            "SELECT synced_at, stored_at FROM snapshots WHERE base_url = ? AND username = ?",
+            (base_url.rstrip("/"), username)
+        )
+        return Snapshot(rows[0]["synced_at"], rows[0]["stored_at"]) if rows else None
+
+    def courses(self, base_url: str, username: str) -> List[Dict[str, Any]]:
+        """Courses in the order they were scraped"""
+        rows = self._query(
+            "SELECT course_id AS id, name, url, description, teacher, semester FROM courses "
+            "WHERE base_url = ? AND username = ? ORDER BY position",
+            (base_url.rstrip("/"), username)
+        )
+        return [dict(row) for row in rows]
+
+    def course_detail(
+        self,
+        base_url: str,
+        username: str,
+        course_id: str,
+        activity_type: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        One course with its sections and activities
+
+        Args:
+            activity_type: Only include activities of this type (sections are kept)
+
+        Returns:
+            Course with contents, or None if the snapshot has no such course
+        """
+        account = (base_url.rstrip("/"), username)
+        rows = self._query(
+            "SELECT course_id AS id, name, url, description, teacher, semester FROM courses "
+            "WHERE base_url = ? AND username = ? AND course_id = ?",
+            (*account, course_id)
+        )
+        if not rows:
+            return None
+
+        course = dict(rows[0])
+        sections = self._query(
+            "SELECT position, name FROM sections WHERE base_url = ? AND username = ? AND course_id = ? ORDER BY position",
+            (*account, course_id)
+        )
+        contents = {row["position"]: {"section_name": row["name"], "activities": []} for row in sections}
+
+        sql = (
+            "SELECT section_position, type, name, url, description FROM activities "
+            "WHERE base_url = ? AND username = ? AND course_id = ?"
+        )
+        params: Tuple[Any, ...] = (*account, course_id)
+        if activity_type:
+            sql += " AND type = ?"
+            params += (activity_type,)
+        for row in self._query(sql + " ORDER BY section_position, position", params):
+            activity = dict(row)
+            section = contents.get(activity.pop("section_position"))
+            if section is not None:
+                section["activities"].append(activity)
+
+        course["contents"] = list(contents.values())
+        return course
+
+    def activities(
+        self,
+        base_url: str,
+        username: str,
+        activity_type: Optional[str] = None,
+        course_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Activities across courses, with the course and section they belong to"""
+        sql = (
+            "SELECT a.course_id, c.name AS course_name, s.name AS section_name, a.type, a.name, a.url, a.description "
+            "FROM activities a "
+            "JOIN courses c USING (base_url, username, course_id) "
+            "JOIN sections s ON s.base_url = a.base_url AND s.username = a.username "
+            "AND s.course_id = a.course_id AND s.position = a.section_position "
+            "WHERE a.base_url = ? AND a.username = ?"
+        )
+        params: Tuple[Any, ...] = (base_url.rstrip("/"), username)
+        if activity_type:
+            sql += " AND a.type = ?"
+            params += (activity_type,)
+        if course_id:
+            sql += " AND a.course_id = ?"
+            params += (course_id,)
+        return [dict(row) for row in self._query(sql + " ORDER BY c.position, a.section_position, a.position", params)]
+
+    def assignments(
+        self,
+        base_url: str,
+        username: str,
+        course_id: Optional[str] = None,
+        due_before: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Assignments, optionally of one course or due before a time
+
+        Args:
+            due_before: ISO date or datetime; assignments without a due date are left out
+
+        Returns:
+            Assignments in scrape order, or by due date when due_before is given
+        """
+        sql = (
+            "SELECT assignment_id AS id, course_id, course_name, name, due_date, status, url, description "
+            "FROM assignments WHERE base_url = ? AND username = ?"
+        )
+        params: Tuple[Any, ...] = (base_url.rstrip("/"), username)
+        if course_id:
+            sql += " AND course_id = ?"
+            params += (course_id,)
+        if due_before:
+            sql += " AND due_date IS NOT NULL AND due_date < ? ORDER BY due_date"
+            params += (due_before,)
+        else:
+            sql += " ORDER BY position"
+        return [dict(row) for row in self._query(sql, params)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Accounts and rows stored (counted at most once per stats_ttl_seconds), and writes and reads so far"""
+        if self._counts is None or time.time() - self._counted_at >= self.stats_ttl_seconds:
+            self._counts = {
+                table: self._query(f"SELECT COUNT(*) AS n FROM {table}")[0]["n"]
+                for table in ("snapshots", "courses", "activities", "assignments")
+            }
+            self._counted_at = time.time()
+        counts = dict(self._counts)
+        return {
+            "path": self.path,
+            "accounts": counts.pop("snapshots"),
+            **counts,
+            "writes": self._writes,
+            "failed_writes": self._failed_writes,
+            "reads": self._reads,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql: str, params: Tuple[Any, ...] = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            self._reads += 1
+            return self._conn.execute(sql, params).fetchall()
@@ -0,0 +1,98 @@
+"""
+Bridge blocking record generators to async streaming responses
+
+The generator runs on the scrape executor (so streaming syncs count against
+the same worker and queue limits as everything else) and hands records to the
+event loop through a small bounded queue. A slow client therefore slows the
+scraper down instead of letting records pile up in memory.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Generator
+
+from .encoding import dumps_json
+from .executor import ScrapeExecutor
+
+_DONE = object()
+
+# How often a producer blocked on a full buffer checks whether the client is still there
+PUT_CHECK_SECONDS = 1.0
+
+
+def encode_ndjson(record: Dict[str, Any]) -> str:
+    """One JSON document per line"""
+    return dumps_json(record).decode("utf-8") + "\n"
+
+
+def encode_sse(record: Dict[str, Any]) -> str:
+    """Server-Sent Events frame named after the record type"""
+    return f"event: {record.get('type', 'message')}\ndata: {dumps_json(record).decode('utf-8')}\n\n"
+
+
+def stream_in_executor(
+    executor: ScrapeExecutor,
+    records: Callable[[], Generator[Dict[str, Any], None, None]],
+    encode: Callable[[Dict[str, Any]], str] = encode_ndjson,
+    buffer_size: int = 16
+) -> AsyncIterator[str]:
+    """
+    Run a record generator on the executor and expose it as an async text stream
+
+    The work is submitted immediately, so ExecutorBusyError is raised here
+    (before any response has started) when the queue is full.
+
+    Args:
+        executor: Executor to run the generator on
+        records: Factory returning the blocking record generator
+        encode: Record-to-text encoder
+        buffer_size: Records buffered between the scraper and the client
+
+    Returns:
+        Async iterator of encoded records
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+    cancelled = threading.Event()
+
+    def put(item: Any) -> bool:
+        """Hand an item to the consumer; False (item dropped) once the consumer is gone"""
+        if cancelled.is_set():
+            return False
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=PUT_CHECK_SECONDS)
+                return True
+            except concurrent.futures.TimeoutError:
+                if cancelled.is_set() or loop.is_closed():
+                    future.cancel()
+                    return False
+
+    def produce():
+        iterator = records()
+        try:
+            for record in iterator:
+                if not put(record):
+                    break
+        except Exception as e:
+            put({"type": "summary", "success": False, "message": f"Sync failed: {str(e)}"})
+        finally:
+            iterator.close()
+            put(_DONE)
+
+    executor.submit(produce)
+
+    async def consume() -> AsyncIterator[str]:
+        try:
+            while True:
+                record = await queue.get()
+                if record is _DONE:
+                    return
+                yield encode(record)
+        finally:
+            # Client went away: the producer gives up its pending put and stops
+            cancelled.set()
+
+    return consume()
@@ -0,0 +1,150 @@
+"""等待引擎：以明確的就緒條件取代固定 sleep，並記錄每次等待實際花費的時間"""
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+# 各步驟的等待上限（秒）
+DEFAULT_WAIT_TIMEOUTS = {
+    'login_form': 15,      # SSO 按鈕或帳號欄位出現
+    'login_done': 20,      # 送出帳密後出現使用者選單
+    'session_check': 5,    # 以已儲存的 cookie 開啟 /my/ 後確認登入狀態
+    'course_list': 5,      # 課程總覽的 .coursename 連結
+    'course_page': 5,      # 課程頁的章節
+    'network_idle': 5,     # Moodle 前端的 AJAX 請求完成
+    'assignment_info': 5,  # 作業總覽與行事曆頁載入完成
+}
+
+# 找不到步驟設定時使用的等待上限
+DEFAULT_TIMEOUT = 5.0
+
+Locator = Tuple[str, str]
+
+# Moodle 前端以 M.util.pending_js 追蹤尚未完成的 AJAX / 動態載入（Behat 測試也用此判斷）
+_NETWORK_IDLE_SCRIPT = (
+    "if (document.readyState === 'loading') { return false; }"
+    "if (window.jQuery && jQuery.active) { return false; }"
+    "return !(window.M && M.util && M.util.pending_js && M.util.pending_js.length);"
+)
+
+
+def parse_wait_timeouts(spec: str) -> Dict[str, float]:
+    """
+    解析 "course_page=5,login_done=20" 格式的等待上限設定
+
+    Args:
+        spec: 逗號分隔的 步驟=秒數
+
+    Returns:
+        步驟對應秒數
+    """
+    timeouts = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        step, _, seconds = item.partition('=')
+        timeouts[step.strip()] = float(seconds)
+    return timeouts
+
+
+class WaitEngine:
+    """在單一 WebDriver 上執行有上限的條件等待"""
+
+    def __init__(
+        self,
+        driver: Optional[webdriver.Chrome] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        poll_interval: float = 0.1
+    ):
+        """
+        初始化等待引擎
+
+        Args:
+            driver: WebDriver 實例（可於借到瀏覽器後再設定）
+            timeouts: 各步驟的等待上限（覆寫 DEFAULT_WAIT_TIMEOUTS）
+            poll_interval: 檢查條件的間隔秒數
+        """
+        self.driver = driver
+        self.timeouts = {**DEFAULT_WAIT_TIMEOUTS, **(timeouts or {})}
+        self.poll_interval = poll_interval
+        # (步驟, 實際等待秒數, 是否在上限內達成)
+        self.records: List[Tuple[str, float, bool]] = []
+
+    def until(self, step: str, condition, timeout: Optional[float] = None) -> Any:
+        """
+        等待條件成立
+
+        Args:
+            step: 步驟名稱（決定等待上限並用於記錄）
+            condition: 接收 driver、回傳 truthy 值的函式
+            timeout: 覆寫此次的等待上限
+
+        Returns:
+            條件的回傳值，逾時則回傳 None
+        """
+        limit = timeout if timeout is not None else self.timeouts.get(step, DEFAULT_TIMEOUT)
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(
+                self.driver, limit, poll_frequency=self.poll_interval,
+                ignored_exceptions=(WebDriverException,)
+            ).until(condition)
+        except TimeoutException:
+            result = None
+        self.records.append((step, time.monotonic() - started, result is not None))
+        return result
+
+    def selector(self, step: str, css: str, timeout: Optional[float] = None):
+        """等待符合 CSS 選擇器的元素出現，回傳該元素（逾時回傳 None）"""
+        return self.until(step, lambda d: (d.find_elements(By.CSS_SELECTOR, css) or [False])[0], timeout)
+
+    def first_of(self, step: str, locators: Dict[str, Locator], timeout: Optional[float] = None) -> Optional[str]:
+        """
+        同時等待多個元素，回傳最先出現者的名稱
+
+        Args:
+            step: 步驟名稱
+            locators: 名稱對應 (By, 值)
+
+        Returns:
+            最先出現的元素名稱，逾時回傳 None
+        """
+        def condition(driver):
+            for name, (by, value) in locators.items():
+                if driver.find_elements(by, value):
+                    return name
+            return False
+
+        return self.until(step, condition, timeout)
+
+    def network_idle(self, step: str = 'network_idle', timeout: Optional[float] = None) -> bool:
+        """等待 DOM 就緒且 Moodle 前端沒有進行中的 AJAX 請求"""
+        return self.until(step, lambda d: d.execute_script(_NETWORK_IDLE_SCRIPT), timeout) is not None
+
+    def selector_or_idle(self, step: str, css: str, timeout: Optional[float] = None) -> bool:
+        """
+        等待元素出現，或頁面已無進行中的 AJAX 請求（代表元素不會再出現，例如沒有任何課程）
+
+        Returns:
+            元素是否存在
+        """
+        def condition(driver):
+            return bool(driver.find_elements(By.CSS_SELECTOR, css)) or driver.execute_script(_NETWORK_IDLE_SCRIPT)
+
+        self.until(step, condition, timeout)
+        return bool(self.driver.find_elements(By.CSS_SELECTOR, css))
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """各步驟的等待次數、總秒數、最長秒數與逾時次數"""
+        summary: Dict[str, Dict[str, Any]] = {}
+        for step, seconds, ok in self.records:
+            item = summary.setdefault(step, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'timeouts': 0})
+            item['count'] += 1
+            item['total_seconds'] = round(item['total_seconds'] + seconds, 3)
+            item['max_seconds'] = round(max(item['max_seconds'], seconds), 3)
+            if not ok:
+                item['timeouts'] += 1
+        return summary
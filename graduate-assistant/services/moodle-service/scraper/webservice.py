@@ -0,0 +1,348 @@
+"""Moodle Web Services（REST token）資料來源，不需瀏覽器"""
+import json
+from datetime import datetime
+from typing import Iterator, List, Dict, Any, Optional, Tuple
+
+import httpx
+
+from .ajax import ACTION_EVENTS_METHOD, AjaxError, collect_action_events
+from .moodle_scraper import MoodleScraper, ProgressCallback
+from .parsers import MODNAME_TYPES
+
+
+class WebServiceError(Exception):
+    """Moodle Web Services 回傳錯誤"""
+
+    def __init__(self, message: str, errorcode: Optional[str] = None):
+        super().__init__(message)
+        self.errorcode = errorcode
+
+
+def _flatten_params(params: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """
+    將巢狀參數轉為 Moodle REST 格式（courseids[0]=1&options[0][name]=...）
+
+    Args:
+        params: 巢狀參數
+        prefix: 目前的參數名稱前綴
+
+    Returns:
+        扁平化後的參數
+    """
+    flat = {}
+    items = params.items() if isinstance(params, dict) else enumerate(params)
+    for key, value in items:
+        name = f"{prefix}[{key}]" if prefix else str(key)
+        if isinstance(value, (dict, list, tuple)):
+            flat.update(_flatten_params(value, name))
+        elif isinstance(value, bool):
+            flat[name] = int(value)
+        else:
+            flat[name] = value
+    return flat
+
+
+class MoodleWebServiceClient:
+    """呼叫 webservice/rest/server.php 的輕量 client"""
+
+    def __init__(self, base_url: str, token: str, client: Optional[httpx.Client] = None):
+        """
+        初始化 client
+
+        Args:
+            base_url: Moodle 網站基礎 URL
+            token: Web Services token
+            client: 共用的 HTTP client（未提供時自行建立）
+        """
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.client = client or httpx.Client(timeout=httpx.Timeout(20.0))
+        self._owns_client = client is None
+
+    def close(self):
+        """關閉自行建立的 HTTP client"""
+        if self._owns_client:
+            self.client.close()
+
+    def call(self, function: str, **params) -> Any:
+        """
+        呼叫 Web Services 函式
+
+        Args:
+            function: 函式名稱，例如 core_course_get_contents
+            **params: 函式參數
+
+        Returns:
+            解析後的 JSON 回應
+
+        Raises:
+            WebServiceError: Moodle 回傳 exception
+        """
+        data = {
+            'wstoken': self.token,
+            'wsfunction': function,
+            'moodlewsrestformat': 'json',
+            **_flatten_params(params),
+        }
+        response = self.client.post(f"{self.base_url}/webservice/rest/server.php", data=data)
+        response.raise_for_status()
+        result = response.json()
+
+        if isinstance(result, dict) and 'exception' in result:
+            raise WebServiceError(result.get('message', result['exception']), result.get('errorcode'))
+        return result
+
+    def get_site_info(self) -> Dict[str, Any]:
+        return self.call('core_webservice_get_site_info')
+
+    def get_user_courses(self, userid: int) -> List[Dict[str, Any]]:
+        return self.call('core_enrol_get_users_courses', userid=userid)
+
+    def get_courses_by_id(self, courseids: List[int]) -> Dict[str, Any]:
+        return self.call('core_course_get_courses_by_field', field='ids', value=",".join(str(c) for c in courseids))
+
+    def get_course_contents(self, courseid: int) -> List[Dict[str, Any]]:
+        return self.call('core_course_get_contents', courseid=courseid)
+
+    def get_assignments(self, courseids: List[int]) -> Dict[str, Any]:
+        return self.call('mod_assign_get_assignments', courseids=list(courseids))
+
+
+class WebServiceScraper(MoodleScraper):
+    """以 Moodle Web Services 取代 DOM 爬取，輸出與 MoodleScraper 相同的資料格式"""
+
+    engine = 'webservice'
+
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        token: str,
+        client: Optional[httpx.Client] = None,
+        concurrency: int = 1
+    ):
+        """
+        初始化
+
+        Args:
+            base_url: Moodle 網站基礎 URL
+            username: 帳號（必須是 token 的擁有者）
+            token: Web Services token
+            client: 共用的 HTTP client
+            concurrency: 同時呼叫 core_course_get_contents 的數量上限
+        """
+        super().__init__(base_url, username, "", concurrency=concurrency)
+        self.ws = MoodleWebServiceClient(base_url, token, client)
+        self.userid: Optional[int] = None
+        # 課程 ID -> {活動 cmid -> 截止時間}
+        self._due_dates: Dict[str, Dict[str, str]] = {}
+
+    def start(self, acquire_timeout: Optional[float] = None):
+        """Web Services 不需要瀏覽器"""
+        print("✓ Web Services 引擎已就緒")
+
+    def close(self):
+        self.ws.close()
+
+    def login(self, fresh: bool = False) -> bool:
+        """
+        以 token 取得使用者資訊（驗證 token 是否有效，且屬於宣稱的帳號）
+
+        快取、快照與同步游標都以帳號為鍵，token 的擁有者必須與 username 相同，
+        否則一個 token 就能寫入或讀取其他帳號的資料。
+
+        Args:
+            fresh: 沒有作用（token 每次都會驗證）
+
+        Returns:
+            token 是否有效且屬於此帳號
+        """
+        try:
+            site_info = self.ws.get_site_info()
+        except (WebServiceError, httpx.HTTPError) as e:
+            print(f"✗ Web Services 驗證失敗: {e}")
+            return False
+
+        owner = str(site_info.get('username', ''))
+        if owner.lower() != self.username.lower():
+            print(f"✗ Web Services token 屬於 {owner or '未知帳號'}，不是 {self.username}")
+            return False
+
+        self.userid = site_info['userid']
+        print(f"✓ Web Services 驗證成功: {site_info.get('fullname', self.username)}")
+        return True
+
+    def cookie_header(self) -> Optional[str]:
+        """Web Services 以 token 驗證，沒有可存取資源頁的 session cookie"""
+        return None
+
+    def get_courses(self) -> List[Dict[str, Any]]:
+        """
+        獲取所有課程列表
+
+        Returns:
+            課程列表，每個課程包含 id, name, url
+        """
+        try:
+            raw_courses = self.ws.get_user_courses(self.userid)
+        except (WebServiceError, httpx.HTTPError) as e:
+            print(f"✗ 獲取課程列表失敗: {e}")
+            return []
+
+        courses = [
+            {
+                'id': str(course['id']),
+                'name': course.get('fullname') or course.get('shortname', ''),
+                'url': f"{self.base_url}/course/view.php?id={course['id']}",
+                'description': course.get('summary', ''),
+                'sections': []
+            }
+            for course in raw_courses
+        ]
+
+        print(f"✓ 找到 {len(courses)} 門課程")
+        return courses
+
+    def get_course(self, course_id: str) -> Optional[Dict[str, Any]]:
+        """
+        直接以課程 ID 取得單一課程（不列出所有選修課程）
+
+        Args:
+            course_id: Moodle 課程 ID
+
+        Returns:
+            包含完整章節內容的課程資訊，找不到（或無權限）時回傳 None
+
+        Raises:
+            httpx.HTTPError: 連線或 HTTP 狀態錯誤（與找不到課程區分，呼叫端應視為錯誤）
+        """
+        if not course_id.isdigit():
+            return None
+
+        try:
+            found = self.ws.get_courses_by_id([int(course_id)]).get('courses', [])
+            if not found:
+                return None
+
+            self._load_due_dates([int(course_id)])
+            course = {
+                'id': course_id,
+                'name': found[0].get('fullname') or found[0].get('shortname', ''),
+                'url': f"{self.base_url}/course/view.php?id={course_id}",
+                'description': found[0].get('summary', ''),
+                'sections': []
+            }
+            return self._load_course_page(course)
+        except WebServiceError as e:
+            # 不存在或無權限的課程由 Moodle 回傳錯誤
+            print(f"✗ 找不到課程 {course_id}: {e}")
+            return None
+
+    def get_course_content(self, course: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        獲取課程內容（章節、活動、資源）
+
+        Args:
+            course: 課程資訊字典
+
+        Returns:
+            包含完整章節內容的課程資訊
+        """
+        try:
+            return self._load_course_page(course)
+        except (WebServiceError, httpx.HTTPError) as e:
+            print(f"✗ 解析課程內容失敗: {e}")
+            course['error'] = str(e)
+            return course
+
+    def _load_course_page(self, course: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        以 core_course_get_contents 取得課程章節（錯誤直接拋出）
+
+        Raises:
+            WebServiceError: Moodle 回傳錯誤
+            httpx.HTTPError: 連線或 HTTP 狀態錯誤
+        """
+        contents = self.ws.get_course_contents(int(course['id']))
+
+        due_dates = self._due_dates.get(course['id'], {})
+        for section in contents:
+            activities = []
+            for module in section.get('modules', []):
+                if not module.get('url'):
+                    # 標籤等沒有獨立頁面的模組
+                    continue
+
+                activity = {
+                    'name': module.get('name', ''),
+                    'url': module['url'],
+                    'type': MODNAME_TYPES.get(module.get('modname'), module.get('modname', 'unknown'))
+                }
+                if str(module.get('id')) in due_dates:
+                    activity['due_date'] = due_dates[str(module['id'])]
+                activities.append(activity)
+
+            course['sections'].append({
+                'index': section.get('section', len(course['sections'])),
+                'title': section.get('name', ''),
+                'activities': activities
+            })
+
+        print(f"✓ 解析完成: 找到 {len(course['sections'])} 個章節")
+        return course
+
+    def iter_scrape_courses(
+        self,
+        courses: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """解析課程內容前，先以一次呼叫取得所有課程的作業截止時間"""
+        self._load_due_dates([int(course['id']) for course in courses])
+        yield from super().iter_scrape_courses(courses, progress)
+
+    def load_assignment_info(self, cmids: Dict[str, List[str]]) -> Dict[str, Dict[str, Any]]:
+        """
+        截止時間已隨課程內容取得，只以時間軸（core_calendar_get_action_events_by_timesort）補上未繳交作業的狀態
+
+        Args:
+            cmids: 課程 ID 對應作業的課程模組 ID
+
+        Returns:
+            課程模組 ID 對應 {due_date, status}
+        """
+        def call(body: str) -> Any:
+            # 與 AJAX 服務相同的函式，包成 AJAX 回應格式以共用解析
+            args = json.loads(body)[0]['args']
+            return [{'error': False, 'data': self.ws.call(ACTION_EVENTS_METHOD, **args)}]
+
+        try:
+            return collect_action_events(call)
+        except (AjaxError, WebServiceError, httpx.HTTPError) as e:
+            print(f"→ 無法取得作業繳交狀態: {e}")
+            return {}
+
+    def _spawn_worker(self) -> "WebServiceScraper":
+        """建立共用 HTTP client 與作業截止時間的 worker"""
+        worker = WebServiceScraper(self.base_url, self.username, self.ws.token, client=self.ws.client)
+        worker.userid = self.userid
+        worker._due_dates = self._due_dates
+        return worker
+
+    def _load_due_dates(self, course_ids: List[int]):
+        """以一次 mod_assign_get_assignments 呼叫取得多門課程的作業截止時間"""
+        if not course_ids:
+            return
+
+        try:
+            result = self.ws.get_assignments(course_ids)
+        except (WebServiceError, httpx.HTTPError) as e:
+            print(f"→ 無法取得作業截止時間: {e}")
+            return
+
+        for course in result.get('courses', []):
+            due_dates = self._due_dates.setdefault(str(course['id']), {})
+            for assignment in course.get('assignments', []):
+                if assignment.get('duedate'):
+                    due_dates[str(assignment['cmid'])] = datetime.fromtimestamp(
+                        assignment['duedate']
+                    ).isoformat()
@@ -0,0 +1,45 @@
+"""
+Shared fixtures
+
+Tests run offline: pages come from saved HTML under tests/fixtures/ and
+tools/fixtures/, and live scrapes go to the fake Moodle site of
+tools.fake_moodle (web pages and web services on one local port).
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVICE_DIR))
+
+from tools.fake_moodle import serve  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+TOOLS_FIXTURES = SERVICE_DIR / "tools" / "fixtures"
+
+
+def read_fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+@pytest.fixture
+def utc(monkeypatch):
+    """Run in UTC, so UTC timestamps convert to the same local times everywhere"""
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture(scope="session")
+def fake_moodle() -> str:
+    """Base URL of a fake Moodle site with two courses (token test-token, user student)"""
+    server = serve(courses=2, sections=2, activities=3)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
@@ -0,0 +1,39 @@
+from scraper.adapter import MoodleAdapter
+
+# A course as MoodleScraper.get_course_content returns it
+SCRAPED_COURSE = {
+    "id": "1201",
+    "name": "Econometrics",
+    "url": "https://moodle.example.edu/course/view.php?id=1201",
+    "sections": [
+        {"index": 0, "title": "General", "activities": [
+            {"name": "News", "url": "https://moodle.example.edu/mod/forum/view.php?id=52300", "type": "forum"},
+        ]},
+        {"index": 1, "title": "Week 1", "activities": [
+            {"name": "Slides", "url": "https://moodle.example.edu/mod/resource/view.php?id=52310", "type": "resource"},
+            {"name": "Essay", "url": "https://moodle.example.edu/mod/assign/view.php?id=52311", "type": "assignment"},
+        ]},
+    ],
+}
+
+
+def test_section_names_come_from_scraped_titles():
+    contents = MoodleAdapter.convert_course_content(SCRAPED_COURSE["sections"])
+
+    assert [section["section_name"] for section in contents] == ["General", "Week 1"]
+    assert [activity["name"] for activity in contents[1]["activities"]] == ["Slides", "Essay"]
+
+
+def test_assignments_are_found_in_scraped_sections():
+    assignments = MoodleAdapter.extract_assignments_from_courses([SCRAPED_COURSE])
+
+    assert assignments == [{
+        "id": "52311",
+        "course_id": "1201",
+        "course_name": "Econometrics",
+        "name": "Essay",
+        "due_date": None,
+        "status": "pending",
+        "url": "https://moodle.example.edu/mod/assign/view.php?id=52311",
+        "description": "",
+    }]
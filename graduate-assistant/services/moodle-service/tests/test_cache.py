@@ -0,0 +1,129 @@
+"""Result cache revalidation and per-account keys"""
+
+import time
+from email.utils import formatdate
+
+import pytest
+from fastapi.testclient import TestClient
+
+from scraper.cache import CacheEntry, ResultCache
+from tools.benchmark import PASSWORD, TOKEN, USERNAME
+
+
+def test_etag_revalidation():
+    entry = CacheEntry([{"id": "1"}], ttl=60)
+
+    assert entry.not_modified(entry.etag, None)
+    assert entry.not_modified(f'"other", W/{entry.etag}', None)
+    assert entry.not_modified("*", None)
+    assert not entry.not_modified('"other"', None)
+    # If-None-Match wins over If-Modified-Since
+    assert not entry.not_modified('"other"', formatdate(time.time() + 60, usegmt=True))
+
+
+def test_last_modified_revalidation():
+    entry = CacheEntry([{"id": "1"}], last_modified=1_790_000_000, ttl=60)
+
+    assert entry.not_modified(None, formatdate(1_790_000_000, usegmt=True))
+    assert not entry.not_modified(None, formatdate(1_789_999_000, usegmt=True))
+    assert not entry.not_modified(None, "not a date")
+    assert not entry.not_modified(None, None)
+
+
+def test_unchanged_result_keeps_last_modified():
+    cache = ResultCache()
+    key = ("https://moodle.example.edu", "student", "courses")
+
+    first = cache.put(key, [{"id": "1"}])
+    first.last_modified -= 100
+    again = cache.put(key, [{"id": "1"}])
+    changed = cache.put(key, [{"id": "2"}])
+
+    assert again.last_modified == first.last_modified
+    assert again.etag == first.etag
+    assert changed.last_modified > first.last_modified
+
+
+def test_entries_are_per_account():
+    cache = ResultCache()
+    cache.put(("https://moodle.example.edu", "student", "courses"), [{"id": "1"}])
+
+    assert cache.get(("https://moodle.example.edu", "other", "courses")) is None
+    assert cache.get(("https://other.example.edu", "student", "courses")) is None
+
+    cache.invalidate("https://moodle.example.edu", "other")
+    assert cache.get(("https://moodle.example.edu", "student", "courses")) is not None
+
+
+def test_expired_entries_and_byte_budget():
+    cache = ResultCache(ttls={"courses": 0}, max_bytes=40)
+
+    cache.put(("b", "u", "courses"), [1])
+    assert cache.get(("b", "u", "courses")) is None
+
+    cache.put(("b", "u", "assignments"), ["x" * 10])
+    cache.put(("b", "v", "assignments"), ["y" * 10])
+    cache.put(("b", "w", "assignments"), ["z" * 10])
+    assert cache.get(("b", "u", "assignments")) is None
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.fixture
+def client(fake_moodle, monkeypatch):
+    """API client whose environment account is the fake site's student, served by the webservice engine"""
+    import main
+
+    monkeypatch.setenv("MOODLE_BASE_URL", fake_moodle)
+    monkeypatch.setenv("MOODLE_USERNAME", USERNAME)
+    monkeypatch.setenv("MOODLE_PASSWORD", PASSWORD)
+    monkeypatch.setattr(main, "MOODLE_WS_TOKEN", TOKEN)
+    monkeypatch.setattr(main, "snapshot_store", None)
+    main.result_cache.clear()
+    yield TestClient(main.app, headers={"X-API-Key": main.API_KEY})
+    main.result_cache.clear()
+
+
+def test_course_list_revalidates_with_304(client):
+    first = client.get("/api/moodle/courses")
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+    assert client.get("/api/moodle/courses", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/moodle/courses", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    other = client.get("/api/moodle/courses", headers={"If-None-Match": '"stale"'})
+    assert other.status_code == 200
+    assert other.headers["etag"] == etag
+
+
+def test_cached_sync_needs_the_accounts_credentials(client, fake_moodle):
+    synced = client.post("/api/moodle/sync", json={"base_url": fake_moodle, "username": USERNAME, "ws_token": TOKEN})
+    assert synced.json()["success"]
+
+    own = client.post("/api/moodle/sync/reconcile", json={"base_url": fake_moodle, "username": USERNAME, "ws_token": TOKEN})
+    assert own.json()["success"]
+    assert len(own.json()["courses"]) == 2
+
+    # A bad token for the same username must not read the cached sync
+    wrong_token = client.post(
+        "/api/moodle/sync/reconcile", json={"base_url": fake_moodle, "username": USERNAME, "ws_token": "wrong-token"}
+    )
+    assert not wrong_token.json()["success"]
+
+    # Nor may a valid token that belongs to another account
+    other_user = client.post(
+        "/api/moodle/sync/reconcile", json={"base_url": fake_moodle, "username": "other", "ws_token": TOKEN}
+    )
+    assert not other_user.json()["success"]
+
+
+def test_failed_scrape_is_an_error(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "MOODLE_WS_TOKEN", "wrong-token")
+
+    for path in ("/api/moodle/courses", "/api/moodle/assignments"):
+        response = client.get(path)
+        assert response.status_code == 500
+        assert "the scrape failed" in response.json()["detail"]
@@ -0,0 +1,34 @@
+import threading
+from concurrent.futures import Future
+from queue import Queue
+
+from scraper import moodle_scraper
+from scraper.moodle_scraper import MoodleScraper
+
+
+def exited_worker() -> Future:
+    run = Future()
+    run.set_result(None)
+    return run
+
+
+def test_courses_left_by_exited_workers_are_returned_with_an_error(monkeypatch):
+    monkeypatch.setattr(moodle_scraper, "WORKER_CHECK_SECONDS", 0.01)
+    finished, pending = Queue(), Queue()
+    finished.put((0, {"name": "done"}))
+    pending.put((1, {"name": "left behind"}))
+    runs = [exited_worker()]
+
+    assert MoodleScraper._next_finished(finished, pending, runs) == (0, {"name": "done"})
+    idx, course = MoodleScraper._next_finished(finished, pending, runs)
+    assert idx == 1 and course["error"]
+    assert MoodleScraper._next_finished(finished, pending, runs) is None
+
+
+def test_waits_while_a_worker_is_running(monkeypatch):
+    monkeypatch.setattr(moodle_scraper, "WORKER_CHECK_SECONDS", 0.01)
+    finished, pending = Queue(), Queue()
+    # Still running after several checks, then finishes its course
+    threading.Timer(0.05, finished.put, [(0, {"name": "slow"})]).start()
+
+    assert MoodleScraper._next_finished(finished, pending, [Future()]) == (0, {"name": "slow"})
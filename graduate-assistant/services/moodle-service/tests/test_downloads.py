@@ -0,0 +1,82 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scraper.downloads import ResourceDownloader
+from scraper.http_scraper import create_http_client
+
+FILE = b"%PDF-1.4 slides"
+
+
+@pytest.fixture
+def moodle():
+    """Local site recording the Cookie header of every request; 127.0.0.1 is Moodle, localhost is file storage"""
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            seen.append((self.headers["Host"].split(":")[0], self.path, self.headers.get("Cookie")))
+            port = self.server.server_port
+            if self.path == "/mod/resource/view.php?id=1&redirect=1":
+                self._redirect(f"http://localhost:{port}/files/slides.pdf")
+            elif self.path == "/mod/url/view.php?id=2":
+                self._redirect(f"http://localhost:{port}/article")
+            elif self.path == "/files/slides.pdf":
+                self._reply("application/pdf", FILE)
+            else:
+                self._reply("text/html", b"<html>An external article</html>")
+
+        def _redirect(self, location):
+            self.send_response(303)
+            self.send_header("Location", location)
+            self.end_headers()
+
+        def _reply(self, content_type, body):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", seen
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    with create_http_client() as client:
+        downloader = ResourceDownloader(str(tmp_path), client, concurrency=2)
+        yield downloader
+        downloader.shutdown()
+
+
+def test_session_cookie_stays_on_moodle(moodle, downloader):
+    base_url, seen = moodle
+    resources = [
+        {"url": f"{base_url}/mod/resource/view.php?id=1", "name": "Slides"},
+        {"url": f"{base_url}/mod/url/view.php?id=2", "name": "Article"},
+    ]
+
+    slides, article = downloader.download_all((base_url, "student"), resources, "MoodleSession=secret")
+
+    assert slides["status"] == "downloaded" and slides["size"] == len(FILE)
+    # An HTML page off Moodle is not a file, and not an expired session either
+    assert article["status"] == "failed" and article["error"].startswith("Not a file")
+    assert {(host, cookie) for host, _, cookie in seen} == {("127.0.0.1", "MoodleSession=secret"), ("localhost", None)}
+
+
+def test_url_locks_are_dropped_when_done(moodle, downloader):
+    base_url, _ = moodle
+    resource = {"url": f"{base_url}/mod/resource/view.php?id=1", "name": "Slides"}
+
+    downloader.download_all((base_url, "student"), [resource], "MoodleSession=secret")
+    downloader.download_all((base_url, "other"), [resource], "MoodleSession=other")
+
+    assert downloader._url_locks == {}
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from scraper.executor import ExecutorBusyError, ScrapeExecutor
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_thread_finishes():
+    executor = ScrapeExecutor(max_workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+
+    def scrape():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def cancel_while_running():
+        task = asyncio.create_task(executor.run(scrape))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The thread is still scraping, so there is no room for more work
+        assert executor.stats()["running"] == 1
+        with pytest.raises(ExecutorBusyError):
+            await executor.run(scrape)
+
+    asyncio.run(cancel_while_running())
+    release.set()
+    deadline = time.monotonic() + 5
+    while executor.stats()["running"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert executor.stats()["running"] == 0
+    executor.shutdown()
+
+
+def test_run_returns_result_and_raises_errors():
+    executor = ScrapeExecutor(max_workers=2, max_queue=0)
+
+    def fail():
+        raise ValueError("login failed")
+
+    async def calls():
+        assert await executor.run(lambda a, b: a + b, 1, b=2) == 3
+        with pytest.raises(ValueError, match="login failed"):
+            await executor.run(fail)
+
+    asyncio.run(calls())
+    assert executor.stats()["running"] == 0
+    executor.shutdown()
@@ -0,0 +1,103 @@
+import copy
+
+from scraper.fingerprint import build_snapshot, diff_snapshots, reconcile
+
+
+def course(course_id, name, sections):
+    return {
+        "id": course_id,
+        "name": name,
+        "url": f"https://moodle.example.edu/course/view.php?id={course_id}",
+        "contents": [
+            {"section_name": title, "activities": [
+                {"type": kind, "name": label, "url": f"https://moodle.example.edu/mod/{kind}/view.php?id={cmid}"}
+                for kind, label, cmid in activities
+            ]}
+            for title, activities in sections
+        ],
+    }
+
+
+def assignment(assignment_id, due_date):
+    return {"id": assignment_id, "course_id": "1", "name": f"Assignment {assignment_id}", "due_date": due_date}
+
+
+COURSES = [
+    course("1", "Econometrics", [
+        ("Week 1", [("resource", "Slides", 11), ("assign", "Essay", 12)]),
+        ("Week 2", [("quiz", "Quiz", 13)]),
+    ]),
+    course("2", "Statistics", [("Week 1", [("forum", "News", 21)])]),
+]
+ASSIGNMENTS = [assignment("12", "2026-10-20T23:59:00"), assignment("14", None)]
+
+
+def diff(courses, assignments):
+    previous = build_snapshot(COURSES, ASSIGNMENTS)
+    return diff_snapshots(previous, build_snapshot(courses, assignments), courses, assignments)
+
+
+def test_no_changes():
+    changes = diff(copy.deepcopy(COURSES), copy.deepcopy(ASSIGNMENTS))
+
+    for kind in ("courses", "activities", "assignments"):
+        assert changes[kind] == {"added": [], "changed": [], "removed": []}
+
+
+def test_changed_activity_only_in_its_section():
+    courses = copy.deepcopy(COURSES)
+    courses[0]["contents"][1]["activities"][0]["name"] = "Quiz (rescheduled)"
+    courses[0]["contents"][0]["activities"].append(
+        {"type": "url", "name": "Reading", "url": "https://moodle.example.edu/mod/url/view.php?id=15"}
+    )
+
+    changes = diff(courses, ASSIGNMENTS)
+
+    assert changes["courses"] == {"added": [], "changed": [], "removed": []}
+    assert [(a["section_name"], a["name"]) for a in changes["activities"]["added"]] == [("Week 1", "Reading")]
+    assert [(a["course_id"], a["name"]) for a in changes["activities"]["changed"]] == [("1", "Quiz (rescheduled)")]
+    assert changes["activities"]["removed"] == []
+
+
+def test_added_and_removed_courses_and_activities():
+    courses = copy.deepcopy(COURSES[:1])
+    del courses[0]["contents"][0]["activities"][0]
+    courses[0]["name"] = "Econometrics I"
+    courses.append(course("3", "Microeconomics", [("Week 1", [("assign", "Problem set", 31)])]))
+
+    changes = diff(courses, ASSIGNMENTS)
+
+    # Added and changed courses carry metadata only
+    assert [(c["id"], "contents" in c) for c in changes["courses"]["added"]] == [("3", False)]
+    assert [c["name"] for c in changes["courses"]["changed"]] == ["Econometrics I"]
+    # Activities of a removed course are not listed separately
+    assert changes["courses"]["removed"] == ["2"]
+    assert [(a["course_id"], a["name"]) for a in changes["activities"]["added"]] == [("3", "Problem set")]
+    assert changes["activities"]["removed"] == [
+        {"course_id": "1", "url": "https://moodle.example.edu/mod/resource/view.php?id=11"}
+    ]
+
+
+def test_assignment_changes():
+    assignments = [assignment("12", "2026-10-27T23:59:00"), assignment("16", None)]
+
+    changes = diff(COURSES, assignments)["assignments"]
+
+    assert [a["id"] for a in changes["added"]] == ["16"]
+    assert [a["due_date"] for a in changes["changed"]] == ["2026-10-27T23:59:00"]
+    assert changes["removed"] == ["14"]
+
+
+def test_reconcile_against_client_hashes():
+    current = reconcile({}, {}, COURSES, ASSIGNMENTS)
+    known_courses = {c["id"]: c["hash"] for c in current["courses"]}
+    known_assignments = {a["id"]: a["hash"] for a in current["assignments"]}
+    known_courses["9"] = "gone"
+
+    courses = copy.deepcopy(COURSES)
+    courses[1]["name"] = "Statistics II"
+    result = reconcile(known_courses, known_assignments, courses, ASSIGNMENTS)
+
+    assert [c["id"] for c in result["courses"]] == ["2"]
+    assert result["assignments"] == []
+    assert result["deleted_courses"] == ["9"]
@@ -0,0 +1,103 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from scraper.http_scraper import HttpMoodleScraper, SessionExpiredError, create_http_client, same_origin
+
+LOGGED_IN = b'<html><body><div class="usermenu">Student</div></body></html>'
+
+
+@pytest.fixture
+def moodle():
+    """Local site recording the Cookie header of every request; 127.0.0.1 is Moodle, localhost is foreign"""
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            seen.append((self.headers["Host"].split(":")[0], self.path, self.headers.get("Cookie")))
+            port = self.server.server_port
+            if self.path == "/hop":
+                self._redirect("/my/")
+            elif self.path == "/away":
+                self._redirect(f"http://localhost:{port}/my/")
+            elif self.path == "/loop":
+                self._redirect("/loop")
+            elif self.path == "/course/view.php?id=500":
+                self.send_response(500)
+                self.end_headers()
+            else:
+                self.send_response(200)
+                # A shared client must not keep this for the next account
+                self.send_header("Set-Cookie", "MoodleSession=server-set; Path=/")
+                self.end_headers()
+                self.wfile.write(LOGGED_IN if self.headers.get("Cookie") else b"<html>login</html>")
+
+        def _redirect(self, location):
+            self.send_response(303)
+            self.send_header("Location", location)
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", seen
+    server.shutdown()
+    server.server_close()
+
+
+def scraper(base_url, client, cookie, fallback=True):
+    instance = HttpMoodleScraper(base_url, "student", "password", client=client, fallback=fallback)
+    instance._use_cookies([{"name": "MoodleSession", "value": cookie}])
+    return instance
+
+
+def test_redirect_hops_keep_the_accounts_own_cookie(moodle):
+    base_url, seen = moodle
+    with create_http_client() as client:
+        html, url = scraper(base_url, client, "alice")._fetch(f"{base_url}/hop")
+        scraper(base_url, client, "bob")._fetch(f"{base_url}/hop")
+
+    assert url == f"{base_url}/my/"
+    assert [cookie for _, _, cookie in seen] == [
+        "MoodleSession=alice", "MoodleSession=alice", "MoodleSession=bob", "MoodleSession=bob"
+    ]
+    assert not client.cookies
+
+
+def test_cookie_is_not_sent_off_origin(moodle):
+    base_url, seen = moodle
+    with create_http_client() as client:
+        with pytest.raises(SessionExpiredError):
+            scraper(base_url, client, "alice")._fetch(f"{base_url}/away")
+
+    assert seen == [("127.0.0.1", "/away", "MoodleSession=alice"), ("localhost", "/my/", None)]
+
+
+def test_redirect_loops_stop(moodle):
+    base_url, _ = moodle
+    with create_http_client() as client:
+        with pytest.raises(httpx.TooManyRedirects):
+            scraper(base_url, client, "alice")._fetch(f"{base_url}/loop")
+
+
+def test_same_origin():
+    assert same_origin("https://moodle.example.edu/my/", "https://moodle.example.edu")
+    assert same_origin("https://moodle.example.edu:443/my/", "https://moodle.example.edu")
+    assert not same_origin("http://moodle.example.edu/my/", "https://moodle.example.edu")
+    assert not same_origin("https://moodle.example.edu.evil.test/", "https://moodle.example.edu")
+    assert not same_origin("https://moodle.example.edu:8443/", "https://moodle.example.edu")
+
+
+def test_missing_course_is_none_but_load_errors_raise(moodle):
+    base_url, _ = moodle
+    with create_http_client() as client:
+        # Logged-in page without sections: the course does not exist or is not enrolled
+        assert scraper(base_url, client, "alice", fallback=False).get_course("5") is None
+        with pytest.raises(httpx.HTTPStatusError):
+            scraper(base_url, client, "alice", fallback=False).get_course("500")
+        with pytest.raises(SessionExpiredError):
+            HttpMoodleScraper(base_url, "student", "password", client=client, fallback=False).get_course("5")
@@ -0,0 +1,71 @@
+import pytest
+
+from scraper.ical import iter_events, parse_ical_assignments, parse_ical_datetime, unfold_lines
+
+from .conftest import TOOLS_FIXTURES
+
+
+def read_lines(name: str):
+    return (TOOLS_FIXTURES / name).read_text(encoding="utf-8").splitlines()
+
+
+def test_english_export(utc):
+    assignments = parse_ical_assignments(read_lines("calendar_export.ics"), {"ECON501": "1201"})
+
+    assert [a["id"] for a in assignments] == ["52311", "52340", "4103@moodle.example.edu"]
+
+    essay, problem_set, proposal = assignments
+    assert essay == {
+        "id": "52311",
+        "course_id": "1201",
+        "course_name": "ECON501",
+        "name": "Essay 1",
+        "due_date": "2026-10-20T15:59:00",
+        "status": None,
+        "url": "https://moodle.example.edu/mod/assign/view.php?id=52311",
+        "description": "Write 1,500 words on the assigned reading.\nSubmit as PDF.",
+    }
+    # The link is found in a folded description line
+    assert problem_set["url"] == "https://moodle.example.edu/mod/assign/view.php?id=52340"
+    assert problem_set["course_id"] == ""
+    # TZID times are converted to local time, and the VALARM's DESCRIPTION does not leak in
+    assert proposal["due_date"] == "2026-10-31T15:59:00"
+    assert proposal["description"] == ""
+
+
+def test_chinese_export(utc):
+    assignments = parse_ical_assignments(read_lines("calendar_export_zh.ics"))
+
+    # 「小考一 關閉」 is a quiz closing, not an assignment deadline
+    assert [(a["id"], a["name"]) for a in assignments] == [
+        ("88012", "期中報告"),
+        ("7202@moodle45.nccu.edu.tw", "閱讀心得（第五週）"),
+    ]
+    assert assignments[0]["due_date"] == "2026-11-06T15:59:00"
+
+
+def test_events_skip_non_deadlines():
+    events = list(iter_events(read_lines("calendar_export.ics")))
+
+    assert len(events) == 5
+    assert [a["name"] for a in parse_ical_assignments(read_lines("calendar_export.ics"))] == [
+        "Essay 1", "Problem Set 3", "Term Paper Proposal"
+    ]
+
+
+def test_unfold_lines():
+    # Only the one whitespace character that marks a continuation is removed
+    assert list(unfold_lines(["SUMMARY:Problem", "  Set 3", "\tis due", "UID:1"])) == [
+        "SUMMARY:Problem Set 3is due", "UID:1"
+    ]
+
+
+@pytest.mark.parametrize("params, value, expected", [
+    ({}, "20261017T155900Z", "2026-10-17T15:59:00"),
+    ({}, "20261017T235900", "2026-10-17T23:59:00"),
+    ({"VALUE": "DATE"}, "20261017", "2026-10-17T00:00:00"),
+    ({"TZID": "Asia/Taipei"}, "20261017T235900", "2026-10-17T15:59:00"),
+    ({}, "not a date", None),
+])
+def test_ical_datetimes(utc, params, value, expected):
+    assert parse_ical_datetime(params, value) == expected
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+
+from scraper.parsers import (
+    ParseError,
+    is_logged_in,
+    parse_assign_index,
+    parse_calendar_upcoming,
+    parse_course_list,
+    parse_course_sections,
+    parse_course_title,
+    parse_moodle_date,
+)
+
+from .conftest import read_fixture
+
+BASE_URL = "https://moodle.example.edu"
+
+
+def test_dashboard_course_links():
+    html = read_fixture("dashboard.html")
+
+    assert is_logged_in(html)
+    courses = parse_course_list(html, f"{BASE_URL}/my/")
+
+    # The screen-reader prefix is dropped, relative links are resolved, and the link without text is skipped
+    assert courses == [
+        {"id": "1201", "name": "1141_753001001 計量經濟學", "url": f"{BASE_URL}/course/view.php?id=1201", "sections": []},
+        {"id": "1207", "name": "1141_753002001 統計方法", "url": f"{BASE_URL}/course/view.php?id=1207", "sections": []},
+    ]
+
+
+def test_course_page_sections_and_activities():
+    html = read_fixture("course_view.html")
+    sections = parse_course_sections(html, f"{BASE_URL}/course/view.php?id=1201")
+
+    assert parse_course_title(html) == "1141_753001001 計量經濟學"
+    assert [(s["index"], s["title"]) for s in sections] == [(0, "一般"), (1, "第一週：迴歸分析"), (2, "第二週：工具變數")]
+
+    # Labels have no link and are not activities
+    assert sections[0]["activities"] == [
+        {"name": "公告", "url": f"{BASE_URL}/mod/forum/view.php?id=52300", "type": "forum"},
+    ]
+    assert sections[1]["activities"] == [
+        {"name": "第一週講義", "url": f"{BASE_URL}/mod/resource/view.php?id=52310", "type": "resource"},
+        {"name": "作業一", "url": f"{BASE_URL}/mod/assign/view.php?id=52311", "type": "assignment"},
+        {"name": "補充閱讀", "url": f"{BASE_URL}/mod/url/view.php?id=52312", "type": "url"},
+    ]
+    assert sections[2]["activities"][0]["type"] == "quiz"
+
+
+def test_pages_without_expected_structure_raise():
+    login_page = "<html><body><form id='login'></form></body></html>"
+
+    assert not is_logged_in(login_page)
+    with pytest.raises(ParseError):
+        parse_course_list(login_page, f"{BASE_URL}/my/")
+    with pytest.raises(ParseError):
+        parse_course_sections(login_page, f"{BASE_URL}/course/view.php?id=1")
+    with pytest.raises(ParseError):
+        parse_assign_index(login_page)
+
+
+def test_assign_index_due_dates_and_status():
+    info = parse_assign_index(read_fixture("assign_index.html"), now=datetime(2026, 10, 17))
+
+    assert info == {
+        "52311": {"due_date": "2026-10-20T23:59:00", "status": "submitted"},
+        "52330": {"due_date": "2026-10-12T00:05:00", "status": "overdue"},
+        "52340": {"due_date": None, "status": "draft"},
+    }
+
+
+def test_calendar_upcoming_keeps_assignment_due_events(utc):
+    info = parse_calendar_upcoming(read_fixture("calendar_upcoming.html"))
+
+    # The quiz is not an assignment, and the last assignment has no dated day link
+    assert info == {"52311": {"due_date": "2026-10-20T15:59:00"}}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2026年 10月 17日(週五) 下午 11:59", "2026-10-17T23:59:00"),
+    ("2026年 10月 17日(星期五) 上午 12:30", "2026-10-17T00:30:00"),
+    ("2026年 10月 17日(星期五) 23:59", "2026-10-17T23:59:00"),
+    ("Saturday, 17 October 2026, 11:59 PM", "2026-10-17T23:59:00"),
+    ("17 October 2026, 09:00", "2026-10-17T09:00:00"),
+    ("-", None),
+    ("", None),
+])
+def test_moodle_dates(text, expected):
+    assert parse_moodle_date(text) == expected
@@ -0,0 +1,61 @@
+import time
+
+from scraper.adapter import MoodleService
+from scraper.moodle_scraper import MoodleScraper
+from scraper.session_store import SessionStore
+
+BASE_URL = "https://moodle.example.edu"
+COOKIES = [{"name": "MoodleSession", "value": "abc123"}]
+
+
+def test_password_verifier():
+    session = SessionStore().save(BASE_URL, "student", COOKIES, "secret")
+
+    assert session.verify("secret")
+    assert not session.verify("guess")
+    assert "secret" not in repr(vars(session))
+
+
+def test_every_login_issues_a_new_handle():
+    store = SessionStore()
+    first = store.save(BASE_URL, "student", COOKIES, "secret")
+    second = store.save(BASE_URL + "/", "student", COOKIES, "secret")
+
+    assert second.handle != first.handle
+    assert store.get_by_handle(first.handle) is None
+    assert store.get_by_handle(second.handle) is second
+    assert store.get(BASE_URL, "student") is second
+
+
+def test_sessions_expire_with_their_cookies():
+    store = SessionStore()
+    store.save(BASE_URL, "student", [{**COOKIES[0], "expiry": int(time.time()) - 1}], "secret")
+
+    assert store.get(BASE_URL, "student") is None
+
+
+def test_stored_cookies_need_the_matching_password():
+    store = SessionStore()
+    session = store.save(BASE_URL, "student", COOKIES, "secret")
+
+    def stored(password):
+        return MoodleScraper(BASE_URL, "student", password, session_store=store)._stored_session()
+
+    assert stored("secret") is session
+    assert stored("guess") is None
+    # Callers that came in through the session handle carry no password
+    assert stored("") is session
+    # A rejected password does not log the owner out
+    assert store.get(BASE_URL, "student") is session
+
+
+def test_cached_reads_need_the_sessions_password():
+    store = SessionStore()
+    store.save(BASE_URL, "student", COOKIES, "secret")
+
+    def verified(username, password):
+        return MoodleService(BASE_URL, username, password, engine="http", session_store=store).verify_credentials()
+
+    assert verified("student", "secret")
+    assert not verified("student", "guess")
+    assert not verified("other", "secret")
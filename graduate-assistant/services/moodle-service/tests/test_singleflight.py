@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from scraper.adapter import MoodleService
+from scraper.singleflight import SingleFlight
+
+
+def start_leader(flights, key, release, result=None, error=None):
+    """Run a call under key on a thread that blocks until release is set"""
+    started = threading.Event()
+    outcome = {}
+
+    def work(report):
+        started.set()
+        report("course_page", 1, 2)
+        release.wait(5)
+        if error:
+            raise error
+        return result
+
+    def run():
+        try:
+            outcome["result"] = flights.do(key, work)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert started.wait(5)
+    return thread, outcome
+
+
+def test_join_shares_the_running_result():
+    flights = SingleFlight()
+    release = threading.Event()
+    result = {"courses": [1, 2]}
+    thread, outcome = start_leader(flights, ("u", "scrape_all"), release, result=result)
+
+    flight = flights.join(("u", "scrape_all"))
+    assert flight is not None
+    assert flights.join(("other", "scrape_all")) is None
+
+    release.set()
+    thread.join(5)
+    assert flight.wait() is result
+    assert outcome["result"] is result
+    assert flights.stats() == {"in_flight": 0, "started": 1, "joined": 1, "coalesced_ratio": 0.5}
+
+
+def test_concurrent_calls_run_once():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+    thread, _ = start_leader(flights, "k", release, result="done")
+
+    follower_results = []
+    followers = [
+        threading.Thread(target=lambda: follower_results.append(flights.do("k", lambda report: calls.append(1))))
+        for _ in range(3)
+    ]
+    for follower in followers:
+        follower.start()
+    deadline = time.monotonic() + 5
+    while flights.stats()["joined"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for follower in followers + [thread]:
+        follower.join(5)
+
+    assert calls == []
+    assert follower_results == ["done"] * 3
+
+
+def test_error_reaches_every_waiter():
+    flights = SingleFlight()
+    release = threading.Event()
+    error = RuntimeError("login failed")
+    thread, outcome = start_leader(flights, "k", release, error=error)
+
+    flight = flights.join("k")
+    release.set()
+    thread.join(5)
+
+    assert outcome["error"] is error
+    with pytest.raises(RuntimeError, match="login failed"):
+        flight.wait()
+    # The failed call is unregistered; the next call starts fresh work
+    assert flights.do("k", lambda report: "retried") == "retried"
+
+
+def test_progress_fans_out_to_joined_callers():
+    flights = SingleFlight()
+    release = threading.Event()
+    seen = []
+    thread, _ = start_leader(flights, "k", release)
+
+    flight = flights.join("k", progress=lambda *args: seen.append(args))
+    flight.report("course_page", 2, 2)
+    release.set()
+    thread.join(5)
+
+    assert seen == [("course_page", 2, 2)]
+
+
+def test_flight_keys_hold_the_credential():
+    def key(username="student", password="secret", engine="http", ws_token=None):
+        service = MoodleService("https://moodle.example.edu", username, password, engine=engine, ws_token=ws_token)
+        return service._flight_key("scrape_all")
+
+    assert key() == key()
+    assert key(password="guess") != key()
+    assert key(username="other") != key()
+    assert key(engine="selenium") != key()
+    assert key(engine="webservice", ws_token="token") != key(engine="webservice", ws_token="other-token")
+    assert "secret" not in "".join(key())
@@ -0,0 +1,83 @@
+"""Snapshot store contents and the reads it serves"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from scraper.snapshots import SnapshotStore
+from tools.benchmark import PASSWORD, TOKEN, USERNAME, seed_session
+
+
+@pytest.fixture
+def client(fake_moodle, tmp_path, monkeypatch):
+    """API client for the fake site's student on the http engine, with a snapshot store and calendar export"""
+    import main
+
+    snapshot_store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    monkeypatch.setenv("MOODLE_BASE_URL", fake_moodle)
+    monkeypatch.setenv("MOODLE_USERNAME", USERNAME)
+    monkeypatch.setenv("MOODLE_PASSWORD", PASSWORD)
+    monkeypatch.setattr(main, "MOODLE_WS_TOKEN", None)
+    monkeypatch.setattr(main, "MOODLE_ICAL_URL", f"{fake_moodle}/calendar/export_execute.php?authtoken={TOKEN}")
+    # Due dates then only come from the calendar export
+    monkeypatch.setattr(main, "ENRICH_ASSIGNMENTS", False)
+    monkeypatch.setattr(main, "snapshot_store", snapshot_store)
+    seed_session(fake_moodle, main.session_store)
+    main.result_cache.clear()
+    yield TestClient(main.app, headers={"X-API-Key": main.API_KEY})
+    main.result_cache.clear()
+    main.session_store.invalidate(fake_moodle, USERNAME)
+    snapshot_store.close()
+
+
+def test_snapshot_assignments_include_calendar_deadlines(client, fake_moodle):
+    synced = client.post(
+        "/api/moodle/sync", json={"base_url": fake_moodle, "username": USERNAME, "password": PASSWORD, "engine": "http"}
+    )
+    assert synced.json()["success"]
+    # The sync itself reports what the course pages said
+    assert all(a["due_date"] is None for a in synced.json()["data"]["assignments"])
+
+    served = client.get("/api/moodle/assignments", params={"engine": "http"})
+    live = client.get("/api/moodle/assignments", params={"engine": "http", "fresh": 1})
+
+    assert served.status_code == 200
+    assert served.json() and all(a["due_date"] for a in served.json())
+    assert served.json() == live.json()
+
+
+def test_first_read_scrapes_once_into_the_snapshot(client, monkeypatch):
+    import main
+    from scraper.adapter import MoodleService
+
+    scrapes, refreshes = [], []
+    scrape_all = MoodleService._scrape_all
+    monkeypatch.setattr(MoodleService, "_scrape_all", lambda self, *args: scrapes.append(1) or scrape_all(self, *args))
+    monkeypatch.setattr(MoodleService, "get_courses", lambda self: pytest.fail("scraped live next to the sync"))
+    monkeypatch.setattr(main.sync_scheduler, "refresh", lambda *args, **kwargs: refreshes.append(args))
+
+    first = client.get("/api/moodle/courses", params={"engine": "http"})
+    second = client.get("/api/moodle/courses", params={"engine": "http"})
+
+    assert first.status_code == 200 and first.json()
+    assert "last-modified" in first.headers
+    assert second.json() == first.json()
+    assert len(scrapes) == 1 and not refreshes
+
+
+def course(course_id, name):
+    return {"id": course_id, "name": name, "contents": [{"section_name": "Week 1", "activities": [
+        {"type": "resource", "name": f"{name} slides", "url": f"https://moodle.example.edu/mod/resource/view.php?id={name}"}
+    ]}]}
+
+
+def test_courses_without_an_id_or_listed_twice_are_skipped():
+    store = SnapshotStore(":memory:")
+    store.save("https://moodle.example.edu", USERNAME, {
+        "courses": [course("1", "Econometrics"), course(None, "Orphan"), course("", "Blank"), course("1", "Again")],
+        "assignments": [],
+        "synced_at": "2026-10-17T12:00:00",
+    })
+
+    assert [c["name"] for c in store.courses("https://moodle.example.edu", USERNAME)] == ["Econometrics"]
+    assert [a["name"] for a in store.activities("https://moodle.example.edu", USERNAME)] == ["Econometrics slides"]
+    assert store.stats()["failed_writes"] == 0
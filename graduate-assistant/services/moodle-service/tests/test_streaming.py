@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+from scraper import streaming
+from scraper.executor import ScrapeExecutor
+from scraper.streaming import stream_in_executor
+
+
+def wait_idle(executor: ScrapeExecutor, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while executor.stats()["running"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return not executor.stats()["running"]
+
+
+def test_all_records_then_done():
+    executor = ScrapeExecutor(max_workers=1)
+
+    async def read():
+        stream = stream_in_executor(executor, lambda: ({"n": n} for n in range(5)), buffer_size=1)
+        return [line async for line in stream]
+
+    assert asyncio.run(read()) == [f'{{"n":{n}}}\n' for n in range(5)]
+    assert wait_idle(executor)
+
+
+def test_producer_stops_when_the_client_goes_away(monkeypatch):
+    monkeypatch.setattr(streaming, "PUT_CHECK_SECONDS", 0.01)
+    executor = ScrapeExecutor(max_workers=1)
+    produced = []
+
+    def records():
+        for n in range(1000):
+            produced.append(n)
+            yield {"n": n}
+
+    async def read_one():
+        stream = stream_in_executor(executor, records, buffer_size=1)
+        first = await stream.__anext__()
+        # Let the producer fill the buffer and block on the next record
+        await asyncio.sleep(0.1)
+        await stream.aclose()
+        await asyncio.sleep(0.1)
+        return first
+
+    assert asyncio.run(read_one()) == '{"n":0}\n'
+    assert wait_idle(executor)
+    assert len(produced) < 10
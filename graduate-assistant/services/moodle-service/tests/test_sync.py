@@ -0,0 +1,86 @@
+"""Full and incremental syncs against the fake Moodle site"""
+
+import pytest
+
+from scraper.adapter import MoodleService
+from scraper.cache import ResultCache
+from scraper.cursors import SyncCursorStore
+from scraper.session_store import SessionStore
+from scraper.snapshots import SnapshotStore
+from tools.benchmark import PASSWORD, TOKEN, USERNAME, seed_session
+
+
+@pytest.fixture
+def stores(tmp_path):
+    snapshot_store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    yield {
+        "session_store": SessionStore(),
+        "cursor_store": SyncCursorStore(),
+        "cache": ResultCache(),
+        "snapshot_store": snapshot_store,
+    }
+    snapshot_store.close()
+
+
+def webservice(base_url, stores, username=USERNAME, token=TOKEN):
+    return MoodleService(base_url, username, "", engine="webservice", ws_token=token, **stores)
+
+
+def test_cursor_round_trip(fake_moodle, stores):
+    full = webservice(fake_moodle, stores).sync_all()
+
+    assert full["success"] and not full["incremental"]
+    assert full["courses_count"] == 2
+    assert full["cursor"]
+
+    again = webservice(fake_moodle, stores).sync_all(since=full["cursor"])
+
+    assert again["success"] and again["incremental"]
+    assert again["cursor"] != full["cursor"]
+    for kind in ("courses", "activities", "assignments"):
+        assert again["data"][kind] == {"added": [], "changed": [], "removed": []}
+
+
+def test_unknown_or_foreign_cursor_gets_full_data(fake_moodle, stores):
+    cursor = webservice(fake_moodle, stores).sync_all()["cursor"]
+
+    assert not webservice(fake_moodle, stores).sync_all(since="no-such-cursor")["incremental"]
+    # Cursors are bound to the account that created them
+    assert stores["cursor_store"].get(cursor, fake_moodle, "someone-else") is None
+    assert stores["cursor_store"].get(cursor, fake_moodle, USERNAME) is not None
+
+
+def test_failed_login_keeps_cursor_and_snapshot(fake_moodle, stores):
+    first = webservice(fake_moodle, stores).sync_all()
+    synced_at = stores["snapshot_store"].snapshot(fake_moodle, USERNAME).synced_at
+
+    failed = webservice(fake_moodle, stores, token="wrong-token").sync_all(since=first["cursor"])
+
+    assert not failed["success"]
+    assert failed.get("cursor") is None
+    assert "Login failed" in failed["message"]
+    # Nothing from the failed sync replaced the last good one
+    assert stores["snapshot_store"].snapshot(fake_moodle, USERNAME).synced_at == synced_at
+    assert stores["cache"].get((fake_moodle, USERNAME, "sync")) is not None
+
+    resumed = webservice(fake_moodle, stores).sync_all(since=first["cursor"])
+    assert resumed["incremental"]
+
+
+def test_failed_http_login_without_password(fake_moodle, stores):
+    # No stored session and no password: the http engine gives up without a browser
+    service = MoodleService(fake_moodle, USERNAME, "", engine="http", **stores)
+
+    result = service.sync_all()
+
+    assert not result["success"]
+    assert stores["snapshot_store"].snapshot(fake_moodle, USERNAME) is None
+
+
+def test_http_engine_reuses_stored_session(fake_moodle, stores):
+    seed_session(fake_moodle, stores["session_store"])
+
+    result = MoodleService(fake_moodle, USERNAME, PASSWORD, engine="http", **stores).sync_all()
+
+    assert result["success"]
+    assert result["courses_count"] == 2
@@ -0,0 +1,69 @@
+import pytest
+
+from scraper.adapter import MoodleService
+from scraper.webservice import WebServiceScraper
+from tools.fake_webservice import serve
+
+TOKEN = "test-token"
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = serve(token=TOKEN, courses=2)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def login(base_url, username, token=TOKEN):
+    with WebServiceScraper(base_url, username, token) as scraper:
+        return scraper.login()
+
+
+def test_token_of_the_claimed_user(base_url):
+    assert login(base_url, "student")
+    assert login(base_url, "Student")
+
+
+def test_token_of_another_user_is_rejected(base_url):
+    assert not login(base_url, "other")
+    assert not MoodleService(base_url, "other", "", engine="webservice", ws_token=TOKEN).login()["success"]
+
+
+def test_invalid_token_is_rejected(base_url):
+    assert not login(base_url, "student", "wrong-token")
+
+
+def test_courses_from_web_services(base_url):
+    courses = MoodleService(base_url, "student", "", engine="webservice", ws_token=TOKEN).get_courses()
+
+    assert [course["name"] for course in courses] == ["Course 100", "Course 101"]
+
+
+def test_missing_course_is_none_but_load_errors_raise(base_url):
+    assert MoodleService(base_url, "student", "", engine="webservice", ws_token=TOKEN).get_course_detail("999") is None
+
+    server = serve(token=TOKEN, courses=2)
+    server.shutdown()
+    server.server_close()
+    unreachable = MoodleService(f"http://127.0.0.1:{server.server_port}", "student", "", engine="webservice", ws_token=TOKEN)
+    with pytest.raises(Exception):
+        unreachable.get_course_detail("100")
+
+
+def test_failed_scrape_is_not_an_empty_list(base_url):
+    service = MoodleService(base_url, "student", "", engine="webservice", ws_token="wrong-token")
+
+    assert service.get_courses() is None
+    assert service.get_assignments() is None
+
+
+def test_account_without_courses():
+    server = serve(token=TOKEN, courses=0)
+    try:
+        service = MoodleService(f"http://127.0.0.1:{server.server_port}", "student", "", engine="webservice", ws_token=TOKEN)
+        assert service.get_courses() == []
+        assert service.get_assignments() == []
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1 @@
+"""Local development and benchmarking tools for the Moodle service"""
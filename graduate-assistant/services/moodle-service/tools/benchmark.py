@@ -0,0 +1,211 @@
+"""
+Offline scraper benchmarks against the local fake Moodle (tools.fake_moodle)
+
+Times MoodleScraper.login, get_courses and get_course_content, and
+MoodleService.sync_all, for every combination of course count, engine and
+concurrency, and writes the results as JSON so runs can be compared:
+
+    python -m tools.benchmark --courses 5,50,500 --engines http,webservice --output bench.json
+    python -m tools.benchmark --engines selenium --concurrency 1,3 --latency 0.05
+
+The selenium engine needs Chrome and ChromeDriver. The http engine also uses
+Chrome for its SSO login unless --seed-session logs in over plain HTTP first;
+with it, "login" measures restoring the stored session instead.
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from scraper.adapter import ENGINES, MoodleService
+from scraper.session_store import SessionStore
+from tools.fake_moodle import serve
+
+USERNAME = "student"
+PASSWORD = "password"
+TOKEN = "test-token"
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    """Min, median, mean, p95 and max of timings in seconds"""
+    ordered = sorted(samples)
+    return {
+        "min": round(ordered[0], 6),
+        "median": round(statistics.median(ordered), 6),
+        "mean": round(statistics.fmean(ordered), 6),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6),
+        "max": round(ordered[-1], 6),
+    }
+
+
+def _timed(fn: Callable[[], Any]) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def seed_session(base_url: str, store: SessionStore):
+    """Log in to the fake SSO form over HTTP and store its cookies, so no browser is needed"""
+    with httpx.Client(follow_redirects=True) as client:
+        client.post(f"{base_url}/login", data={"UserName": USERNAME, "Password": PASSWORD}).raise_for_status()
+        store.save(
+            base_url, USERNAME, [{"name": name, "value": value} for name, value in client.cookies.items()], PASSWORD
+        )
+
+
+def run_case(
+    base_url: str,
+    engine: str,
+    concurrency: int,
+    repeat: int,
+    sample: int,
+    seed: bool,
+    enrich: bool,
+    profile: str
+) -> List[Dict[str, Any]]:
+    """
+    Benchmark one engine and concurrency setting against a running fake Moodle
+
+    Returns:
+        One record per operation with its timing summary
+    """
+    timings: Dict[str, List[float]] = {"login": [], "get_courses": [], "get_course_content": [], "sync_all": []}
+    counts: Dict[str, int] = {}
+
+    def service(store: SessionStore) -> MoodleService:
+        return MoodleService(
+            base_url, USERNAME, PASSWORD,
+            session_store=store,
+            engine=engine,
+            ws_token=TOKEN if engine == "webservice" else None,
+            concurrency=concurrency,
+            profile=profile,
+            enrich_assignments=enrich
+        )
+
+    for _ in range(repeat):
+        store = SessionStore()
+        if seed and engine == "http":
+            seed_session(base_url, store)
+
+        with service(store)._scraper() as scraper:
+            seconds, ok = _timed(scraper.login)
+            if not ok:
+                raise RuntimeError(f"{engine} engine could not log in to {base_url}")
+            timings["login"].append(seconds)
+
+            seconds, courses = _timed(scraper.get_courses)
+            timings["get_courses"].append(seconds)
+            counts["get_courses"] = len(courses)
+
+            for course in courses[:sample]:
+                seconds, _ = _timed(lambda: scraper.get_course_content(course))
+                timings["get_course_content"].append(seconds)
+            counts["get_course_content"] = min(sample, len(courses))
+
+        # A fresh sync per run; the stored session makes its login cheap like in production
+        seconds, result = _timed(service(store).sync_all)
+        if not result["success"]:
+            raise RuntimeError(f"sync_all failed: {result['message']}")
+        timings["sync_all"].append(seconds)
+        counts["sync_all"] = result["courses_count"]
+
+    return [
+        {"operation": operation, "items": counts.get(operation, 1), "runs": len(samples), "seconds": _summary(samples)}
+        for operation, samples in timings.items()
+        if samples
+    ]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=_int_list, default=[5, 50, 500], help="comma-separated course counts")
+    parser.add_argument("--engines", default="http,webservice", help=f"comma-separated, of: {', '.join(ENGINES)}")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4], help="comma-separated SCRAPE_CONCURRENCY values")
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--activities", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay per request")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case")
+    parser.add_argument("--sample", type=int, default=20, help="courses timed individually with get_course_content")
+    parser.add_argument("--profile", default="lean", help="browser profile for scraping pages")
+    parser.add_argument("--no-enrich", action="store_true", help="skip assignment due date and status enrichment")
+    parser.add_argument("--seed-session", action="store_true", help="log in over HTTP so the http engine needs no browser")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    for engine in engines:
+        if engine not in ENGINES:
+            parser.error(f"unknown engine: {engine}")
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "started_at": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sections": args.sections,
+            "activities": args.activities,
+            "latency": args.latency,
+            "repeat": args.repeat,
+            "profile": args.profile,
+            "enrich_assignments": not args.no_enrich,
+            "seed_session": args.seed_session,
+        },
+        "results": [],
+    }
+
+    for courses in args.courses:
+        server = serve(courses=courses, sections=args.sections, activities=args.activities, latency=args.latency)
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        try:
+            for engine in engines:
+                for concurrency in args.concurrency:
+                    print(f"→ {engine} engine, {courses} courses, concurrency {concurrency}", file=sys.stderr)
+                    case = {"engine": engine, "courses": courses, "concurrency": concurrency}
+                    try:
+                        # The scrapers report progress on stdout, which may carry the JSON results
+                        with contextlib.redirect_stdout(sys.stderr):
+                            records = run_case(
+                                base_url, engine, concurrency, args.repeat, args.sample,
+                                args.seed_session, not args.no_enrich, args.profile
+                            )
+                    except Exception as e:
+                        report["results"].append({**case, "error": str(e)})
+                        continue
+                    report["results"].extend({**case, **record} for record in records)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    encoded = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+    return report
+
+
+if __name__ == "__main__":
+    main()
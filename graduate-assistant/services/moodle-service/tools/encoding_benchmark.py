@@ -0,0 +1,166 @@
+"""
+Encode-time and size benchmarks of sync payloads per format and compression
+
+Runs a webservice-engine sync against the local fake Moodle (tools.fake_moodle)
+for every course count, then times encoding the SyncResponse payload as:
+
+- json-indent: json.dumps with indent=2 (the old save_to_json output)
+- json: compact json.dumps
+- orjson: compact orjson (what the API sends when orjson is installed)
+- msgpack: MessagePack (Accept: application/msgpack)
+
+and compressing each with gzip and brotli (the CompressionMiddleware
+settings). save_to_json is timed for the old indented and the new compact
+output. Formats whose optional package is missing are skipped.
+
+    python -m tools.encoding_benchmark --courses 50,500 --output encoding.json
+"""
+
+import argparse
+import contextlib
+import gzip
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from scraper.adapter import MoodleService
+from scraper.encoding import brotli, compress, msgpack, orjson
+from scraper.moodle_scraper import MoodleScraper
+from tools.benchmark import TOKEN, USERNAME, _git_commit, _int_list
+from tools.fake_moodle import serve
+
+
+def _median_seconds(fn: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples), 6)
+
+
+def encoders() -> Dict[str, Callable[[Any], bytes]]:
+    """Available payload encoders by format name"""
+    formats: Dict[str, Callable[[Any], bytes]] = {
+        "json-indent": lambda value: json.dumps(value, ensure_ascii=False, indent=2).encode("utf-8"),
+        "json": lambda value: json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+    }
+    if orjson is not None:
+        formats["orjson"] = lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    if msgpack is not None:
+        formats["msgpack"] = lambda value: msgpack.packb(value, use_bin_type=True)
+    return formats
+
+
+def sync_payload(base_url: str) -> Dict[str, Any]:
+    """SyncResponse payload of one sync against the fake Moodle"""
+    service = MoodleService(base_url, USERNAME, "", engine="webservice", ws_token=TOKEN)
+    with contextlib.redirect_stdout(sys.stderr):
+        result = service.sync_all()
+    if not result["success"]:
+        raise RuntimeError(f"sync_all failed: {result['message']}")
+    return result
+
+
+def run_case(payload: Dict[str, Any], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Time every format and compression of one payload
+
+    Returns:
+        One record per format and coding with encode seconds and bytes
+    """
+    codings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    records = []
+    for name, encode in encoders().items():
+        body = encode(payload)
+        encode_seconds = _median_seconds(lambda: encode(payload), repeat)
+        for coding in codings:
+            record = {"format": name, "coding": coding, "encode_seconds": encode_seconds}
+            if coding == "identity":
+                record.update(bytes=len(body), compress_seconds=0.0)
+            else:
+                record.update(
+                    bytes=len(compress(body, coding)),
+                    compress_seconds=_median_seconds(lambda: compress(body, coding), repeat)
+                )
+            record["total_seconds"] = round(record["encode_seconds"] + record["compress_seconds"], 6)
+            records.append(record)
+    return records
+
+
+def run_save_to_json(data: Dict[str, Any], repeat: int) -> List[Dict[str, Any]]:
+    """Time save_to_json with the old indented output and the compact (optionally gzipped) one"""
+    scraper = MoodleScraper("http://localhost", USERNAME, "")
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        for label, filename, indent in (
+            ("indent=2", "indent.json", 2),
+            ("compact", "compact.json", None),
+            ("compact-gzip", "compact.json.gz", None),
+        ):
+            path = os.path.join(directory, filename)
+            with contextlib.redirect_stdout(sys.stderr):
+                seconds = _median_seconds(lambda: scraper.save_to_json(data, path, indent=indent), repeat)
+            records.append({"format": f"save_to_json {label}", "seconds": seconds, "bytes": os.path.getsize(path)})
+
+        with gzip.open(os.path.join(directory, "compact.json.gz"), "rt", encoding="utf-8") as f:
+            if json.load(f) != data:
+                raise RuntimeError("save_to_json output does not round-trip")
+    return records
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=_int_list, default=[5, 50, 500], help="comma-separated course counts")
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--activities", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (median is reported)")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "started_at": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sections": args.sections,
+            "activities": args.activities,
+            "repeat": args.repeat,
+            "orjson": orjson is not None,
+            "msgpack": msgpack is not None,
+            "brotli": brotli is not None,
+        },
+        "results": [],
+    }
+
+    for courses in args.courses:
+        server = serve(courses=courses, sections=args.sections, activities=args.activities)
+        try:
+            print(f"→ {courses} courses", file=sys.stderr)
+            payload = sync_payload(f"http://127.0.0.1:{server.server_port}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        case = {"courses": courses, "assignments": payload["assignments_count"]}
+        report["results"].extend({**case, **record} for record in run_case(payload, args.repeat))
+        report["results"].extend({**case, **record} for record in run_save_to_json(payload["data"], args.repeat))
+
+    encoded = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+    return report
+
+
+if __name__ == "__main__":
+    main()
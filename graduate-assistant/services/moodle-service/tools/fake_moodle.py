@@ -0,0 +1,396 @@
+"""
+Local fake of the Moodle web site (SSO login, dashboard and course pages)
+
+Serves templated HTML for every page the scraping engines visit, so the
+selenium and http engines can run without a real Moodle:
+
+    python -m tools.fake_moodle --port 8200 --courses 50 --sections 6 --activities 4 --latency 0.05
+
+Pages:
+    /                                  landing page with the "SSO 單一登入" link
+    /login                             SSO form (#userNameInput, #passwordInput, #submitButton)
+    /my/                               dashboard with .coursename links and M.cfg.sesskey
+    /course/view.php?id=               li.section.main sections with .activity modtype_* items
+    /mod/assign/index.php?id=          assignment index with due dates and submission status
+    /calendar/view.php?view=upcoming   upcoming assignment due events
+    /lib/ajax/service.php              course overview and timeline AJAX functions
+    /mod/resource/view.php?id=         resource page linking its file (redirect=1 redirects to it)
+    /pluginfile.php/                   resource files with ETag and Range support
+
+Resource files depend only on the activity's position in its course, so every
+course links the same files, like a slide deck shared between courses.
+
+Any password is accepted. The web service endpoint of tools.fake_webservice
+is served as well, so the webservice engine can run against the same data.
+"""
+
+import argparse
+import functools
+import html
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import parse_qsl, quote, unquote, urlparse
+
+from tools.fake_webservice import FakeMoodleData, make_handler
+
+SESSION_COOKIE = "MoodleSession"
+
+_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<script>var M = {{cfg: {cfg}, util: {{pending_js: []}}}};</script>
+</head><body>
+{usermenu}
+<div id="page-header"><div class="page-header-headings"><h1>{title}</h1></div></div>
+<div id="region-main">{body}</div>
+</body></html>"""
+
+
+def _due_text(timestamp: int) -> str:
+    """Due date as Moodle's English interface shows it"""
+    return time.strftime("%A, %d %B %Y, %I:%M %p", time.localtime(timestamp))
+
+
+class FakeMoodleSite:
+    """HTML renderings of FakeMoodleData"""
+
+    def __init__(self, data: FakeMoodleData, resource_bytes: int = 64 * 1024):
+        self.data = data
+        self.resource_bytes = resource_bytes
+        self.sessions: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def create_session(self) -> str:
+        session = secrets.token_hex(16)
+        with self._lock:
+            self.sessions.add(session)
+        return session
+
+    def is_valid(self, session: Optional[str]) -> bool:
+        with self._lock:
+            return session in self.sessions
+
+    @staticmethod
+    def sesskey(session: str) -> str:
+        return session[:10]
+
+    def page(self, title: str, body: str, session: Optional[str] = None) -> str:
+        cfg = json.dumps({"wwwroot": self.data.base_url, "sesskey": self.sesskey(session)} if session else {})
+        usermenu = '<div class="usermenu"><span class="usertext">Fake Student</span></div>' if session else ""
+        return _PAGE.format(title=html.escape(title), cfg=cfg, usermenu=usermenu, body=body)
+
+    def landing(self) -> str:
+        return self.page("Fake Moodle", '<a href="/login">SSO 單一登入</a>')
+
+    def login_form(self) -> str:
+        return self.page("Sign in", (
+            '<form method="post" action="/login">'
+            '<input id="userNameInput" name="UserName" type="text">'
+            '<input id="passwordInput" name="Password" type="password">'
+            '<span id="submitButton" onclick="this.parentNode.submit()">Sign in</span>'
+            '</form>'
+        ))
+
+    def dashboard(self, session: str) -> str:
+        items = "".join(
+            f'<div class="coursebox"><h3 class="coursename"><a href="{self.data.base_url}/course/view.php?id={c["id"]}">'
+            f'{html.escape(c["fullname"])}</a></h3></div>'
+            for c in self.data.users_courses()
+        )
+        return self.page("Dashboard", f'<div class="courses">{items}</div>', session)
+
+    def course(self, course_id: int, session: str) -> str:
+        sections = []
+        for section in self.data.course_contents(course_id):
+            activities = "".join(
+                f'<li class="activity {m["modname"]} modtype_{m["modname"]}">'
+                f'<a href="{m["url"]}"><span class="instancename">{html.escape(m["name"])}'
+                f'<span class="accesshide"> {m["modname"]}</span></span></a></li>'
+                for m in section["modules"]
+            )
+            sections.append(
+                f'<li class="section main" id="section-{section["section"]}">'
+                f'<h3 class="sectionname">{html.escape(section["name"])}</h3>'
+                f'<ul class="section">{activities}</ul></li>'
+            )
+        return self.page(f"Course {course_id}", f'<ul class="topics">{"".join(sections)}</ul>', session)
+
+    def _assignments(self, course_ids: List[int]) -> List[Dict[str, Any]]:
+        return [
+            {**assignment, "course_id": course["id"]}
+            for course in self.data.assignments(course_ids)["courses"]
+            for assignment in course["assignments"]
+        ]
+
+    @staticmethod
+    def submitted(assignment: Dict[str, Any]) -> bool:
+        """Every other assignment has been submitted"""
+        return assignment["cmid"] % 2 == 0
+
+    def assign_index(self, course_id: int, session: str) -> str:
+        rows = "".join(
+            f'<tr><td>{(a["cmid"] % 1000) // self.data.activities}</td>'
+            f'<td><a href="{self.data.base_url}/mod/assign/view.php?id={a["cmid"]}">{html.escape(a["name"])}</a></td>'
+            f'<td>{_due_text(a["duedate"])}</td>'
+            f'<td>{"Submitted for grading" if self.submitted(a) else "No submission"}</td><td>-</td></tr>'
+            for a in self._assignments([course_id])
+        )
+        table = (
+            '<table class="generaltable"><thead><tr><th>Topic</th><th>Assignments</th>'
+            f'<th>Due date</th><th>Submission</th><th>Grade</th></tr></thead><tbody>{rows}</tbody></table>'
+        )
+        return self.page("Assignments", table, session)
+
+    def calendar_upcoming(self, session: str) -> str:
+        events = "".join(
+            f'<div class="event" data-type="event" data-event-component="mod_assign">'
+            f'<a href="{self.data.base_url}/calendar/view.php?view=day&amp;time={a["duedate"]}">{_due_text(a["duedate"])}</a>'
+            f'<a href="{self.data.base_url}/mod/assign/view.php?id={a["cmid"]}">Go to activity</a></div>'
+            for a in self._assignments(self.data.course_ids())
+        )
+        return self.page("Upcoming events", events, session)
+
+    def resource_path(self, cmid: int) -> str:
+        """pluginfile.php path of a resource activity's file"""
+        return f"/pluginfile.php/{cmid}/mod_resource/content/1/{quote(self.resource_name(cmid))}"
+
+    def resource_name(self, cmid: int) -> str:
+        index = cmid % 1000
+        return f"Week {index // self.data.activities} handout {index % self.data.activities}.pdf"
+
+    @functools.lru_cache(maxsize=256)
+    def resource_file(self, name: str) -> bytes:
+        """Deterministic file content, the same for every course"""
+        return random.Random(name).randbytes(self.resource_bytes)
+
+    def resource_page(self, cmid: int, session: str) -> str:
+        link = self.data.base_url + self.resource_path(cmid)
+        return self.page("Resource", (
+            f'<div class="resourceworkaround">Click <a href="{link}">{html.escape(self.resource_name(cmid))}</a>'
+            ' link to view the file.</div>'
+        ), session)
+
+    def ajax(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        responses = []
+        for call in calls:
+            args = call.get("args", {})
+            if call.get("methodname") == "core_course_get_enrolled_courses_by_timeline_classification":
+                offset, limit = int(args.get("offset", 0)), int(args.get("limit", 0)) or len(self.data.course_ids())
+                courses = [
+                    {"id": c["id"], "fullname": c["fullname"], "shortname": c["shortname"],
+                     "viewurl": f"{self.data.base_url}/course/view.php?id={c['id']}"}
+                    for c in self.data.users_courses()[offset:offset + limit]
+                ]
+                responses.append({"error": False, "data": {"courses": courses, "nextoffset": offset + len(courses)}})
+            elif call.get("methodname") == "core_calendar_get_action_events_by_timesort":
+                pending = [a for a in self._assignments(self.data.course_ids()) if not self.submitted(a)]
+                pending.sort(key=lambda a: a["id"])
+                after = int(args.get("aftereventid", 0))
+                if after:
+                    pending = [a for a in pending if a["id"] > after]
+                page = pending[:int(args.get("limitnum", 50))]
+                events = [
+                    {"id": a["id"], "modulename": "assign", "timesort": a["duedate"], "overdue": a["duedate"] < time.time(),
+                     "url": f"{self.data.base_url}/mod/assign/view.php?id={a['cmid']}"}
+                    for a in page
+                ]
+                responses.append({"error": False, "data": {"events": events, "lastid": page[-1]["id"] if page else None}})
+            else:
+                responses.append({"error": True, "exception": {"errorcode": "invalidfunction"}})
+        return responses
+
+
+def make_site_handler(site: FakeMoodleSite, token: str, latency: float = 0.0):
+    """Build a request handler serving the fake site and the fake web service"""
+
+    class FakeMoodleHandler(make_handler(site.data, token, latency)):
+        def _session(self) -> Optional[str]:
+            for part in self.headers.get("Cookie", "").split(";"):
+                name, _, value = part.strip().partition("=")
+                if name == SESSION_COOKIE and site.is_valid(value):
+                    return value
+            return None
+
+        def _send_html(self, body: str, status: int = 200, headers: Optional[Dict[str, str]] = None):
+            encoded = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(encoded)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def _redirect(self, location: str, headers: Optional[Dict[str, str]] = None):
+            self.send_response(303)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+
+        def _send_file(self, name: str, body: bytes):
+            """Serve a file like pluginfile.php, honouring single byte ranges and If-Range"""
+            etag = f'"{len(body)}-{sum(body[:64])}"'
+            headers = {
+                "Content-Type": "application/pdf",
+                "Content-Disposition": f"inline; filename*=UTF-8''{quote(name)}",
+                "Accept-Ranges": "bytes",
+                "ETag": etag,
+                "Last-Modified": "Thu, 01 Jan 2026 00:00:00 GMT",
+            }
+            status, start, end = 200, 0, len(body)
+            ranges = self.headers.get("Range", "")
+            if_range = self.headers.get("If-Range")
+            if ranges.startswith("bytes=") and (if_range is None or if_range in (etag, headers["Last-Modified"])):
+                first, _, last = ranges[len("bytes="):].partition("-")
+                if first.isdigit():
+                    start = int(first)
+                    end = min(int(last) + 1, len(body)) if last.isdigit() else len(body)
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(body)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+                    headers["Content-Range"] = f"bytes {start}-{end - 1}/{len(body)}"
+
+            self.send_response(status)
+            for header, value in headers.items():
+                self.send_header(header, value)
+            self.send_header("Content-Length", str(end - start))
+            self.end_headers()
+            self.wfile.write(body[start:end])
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path in ("/webservice/rest/server.php", "/calendar/export_execute.php"):
+                super().do_GET()
+                return
+
+            if latency:
+                time.sleep(latency)
+            params = dict(parse_qsl(url.query))
+            session = self._session()
+
+            if url.path == "/":
+                self._send_html(site.landing())
+            elif url.path == "/login":
+                self._send_html(site.login_form())
+            elif session is None:
+                # Moodle sends anonymous visitors to the login page
+                self._redirect("/login")
+            elif url.path == "/my/":
+                self._send_html(site.dashboard(session))
+            elif url.path == "/course/view.php" and params.get("id", "").isdigit() \
+                    and int(params["id"]) in site.data.course_ids():
+                self._send_html(site.course(int(params["id"]), session))
+            elif url.path == "/mod/assign/index.php" and params.get("id", "").isdigit():
+                self._send_html(site.assign_index(int(params["id"]), session))
+            elif url.path == "/calendar/view.php":
+                self._send_html(site.calendar_upcoming(session))
+            elif url.path == "/mod/resource/view.php" and params.get("id", "").isdigit():
+                if params.get("redirect") == "1":
+                    self._redirect(site.data.base_url + site.resource_path(int(params["id"])))
+                else:
+                    self._send_html(site.resource_page(int(params["id"]), session))
+            elif url.path.startswith("/pluginfile.php/"):
+                name = unquote(url.path.rsplit("/", 1)[-1])
+                self._send_file(name, site.resource_file(name))
+            elif url.path == "/course/view.php":
+                self._redirect("/my/")
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path == "/webservice/rest/server.php":
+                super().do_POST()
+                return
+
+            if latency:
+                time.sleep(latency)
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length).decode("utf-8")
+
+            if url.path == "/login":
+                form = dict(parse_qsl(body))
+                if not form.get("UserName") or not form.get("Password"):
+                    self._send_html(site.login_form())
+                    return
+                session = site.create_session()
+                self._redirect("/my/", {"Set-Cookie": f"{SESSION_COOKIE}={session}; Path=/; HttpOnly"})
+            elif url.path == "/lib/ajax/service.php":
+                session = self._session()
+                if session is None or dict(parse_qsl(url.query)).get("sesskey") != site.sesskey(session):
+                    self._send_json({"error": "servicerequireslogin", "errorcode": "servicerequireslogin"})
+                    return
+                self._send_json(site.ajax(json.loads(body or "[]")))
+            else:
+                self.send_error(404)
+
+    return FakeMoodleHandler
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    token: str = "test-token",
+    courses: int = 5,
+    sections: int = 4,
+    activities: int = 3,
+    latency: float = 0.0,
+    background: bool = True,
+    resource_bytes: int = 64 * 1024
+) -> ThreadingHTTPServer:
+    """
+    Start the fake Moodle site
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        token: Web services token and calendar export authtoken
+        courses: Number of enrolled courses
+        sections: Sections per course
+        activities: Activities per section (every third one is an assignment)
+        latency: Artificial delay per request in seconds
+        background: Serve from a daemon thread and return immediately
+        resource_bytes: Size of every resource file
+
+    Returns:
+        The running server; its base URL is http://host:server.server_port
+    """
+    server = ThreadingHTTPServer((host, port), None)
+    base_url = f"http://{host}:{server.server_port}"
+    site = FakeMoodleSite(FakeMoodleData(base_url, courses, sections, activities), resource_bytes)
+    server.RequestHandlerClass = make_site_handler(site, token, latency)
+
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--token", default="test-token")
+    parser.add_argument("--courses", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--activities", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay per request")
+    parser.add_argument("--resource-bytes", type=int, default=64 * 1024, help="size of every resource file")
+    args = parser.parse_args()
+
+    print(f"Fake Moodle on http://{args.host}:{args.port} (any password, token: {args.token})")
+    serve(
+        args.host, args.port, args.token, args.courses, args.sections, args.activities, args.latency,
+        background=False, resource_bytes=args.resource_bytes
+    )
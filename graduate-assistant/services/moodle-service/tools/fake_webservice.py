@@ -0,0 +1,256 @@
+"""
+Local fake of Moodle's REST web service endpoint
+
+Serves deterministic data for the web service functions used by
+scraper.webservice so the backend can be exercised without a real Moodle:
+
+    python -m tools.fake_webservice --port 8100 --courses 5 --token test-token
+
+Then point the service at it with MOODLE_BASE_URL=http://127.0.0.1:8100
+and MOODLE_WS_TOKEN=test-token. The same data is also served as a calendar
+export at /calendar/export_execute.php?authtoken=test-token (MOODLE_ICAL_URL).
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+# Unix timestamp used as the base for generated due dates
+DUE_DATE_BASE = 1767225600  # 2026-01-01T00:00:00Z
+
+
+class FakeMoodleData:
+    """Deterministic course, section and assignment fixtures"""
+
+    def __init__(self, base_url: str, courses: int = 5, sections: int = 4, activities: int = 3):
+        self.base_url = base_url.rstrip('/')
+        self.courses = courses
+        self.sections = sections
+        self.activities = activities
+
+    def course_ids(self) -> List[int]:
+        return [100 + i for i in range(self.courses)]
+
+    def cmid(self, course_id: int, section: int, activity: int) -> int:
+        return course_id * 1000 + section * self.activities + activity
+
+    def site_info(self) -> Dict[str, Any]:
+        return {"userid": 2, "username": "student", "fullname": "Fake Student", "sitename": "Fake Moodle"}
+
+    def users_courses(self) -> List[Dict[str, Any]]:
+        return [
+            {"id": course_id, "shortname": f"C{course_id}", "fullname": f"Course {course_id}", "summary": ""}
+            for course_id in self.course_ids()
+        ]
+
+    def courses_by_field(self, field: str, value: str) -> Dict[str, Any]:
+        if field == 'id':
+            wanted = {int(value)} if value.isdigit() else set()
+        elif field == 'ids':
+            wanted = {int(v) for v in value.split(',') if v.strip().isdigit()}
+        else:
+            wanted = set(self.course_ids())
+        return {
+            "courses": [course for course in self.users_courses() if course["id"] in wanted],
+            "warnings": []
+        }
+
+    def course_contents(self, course_id: int) -> List[Dict[str, Any]]:
+        sections = []
+        for section in range(self.sections):
+            modules = []
+            for activity in range(self.activities):
+                cmid = self.cmid(course_id, section, activity)
+                modname = ("resource", "assign", "forum")[activity % 3]
+                modules.append({
+                    "id": cmid,
+                    "name": f"{modname.title()} {section}.{activity}",
+                    "modname": modname,
+                    "url": f"{self.base_url}/mod/{modname}/view.php?id={cmid}",
+                })
+            sections.append({"id": course_id * 100 + section, "section": section, "name": f"Week {section}", "modules": modules})
+        return sections
+
+    def assignments(self, course_ids: List[int]) -> Dict[str, Any]:
+        courses = []
+        for course_id in course_ids:
+            assignments = []
+            for section in range(self.sections):
+                for activity in range(self.activities):
+                    if activity % 3 != 1:
+                        continue
+                    cmid = self.cmid(course_id, section, activity)
+                    assignments.append({
+                        "id": cmid + 500000,
+                        "cmid": cmid,
+                        "name": f"Assign {section}.{activity}",
+                        "duedate": DUE_DATE_BASE + (course_id % 100) * 86400 + section * 7 * 86400,
+                    })
+            courses.append({"id": course_id, "assignments": assignments})
+        return {"courses": courses, "warnings": []}
+
+    def calendar_export(self) -> str:
+        """Assignment due events of all courses in Moodle's iCalendar export format"""
+        host = urlparse(self.base_url).netloc
+        lines = ["BEGIN:VCALENDAR", "METHOD:PUBLISH", "PRODID:-//Fake Moodle//NONSGML Moodle//EN", "VERSION:2.0"]
+        for course in self.assignments(self.course_ids())["courses"]:
+            for assignment in course["assignments"]:
+                due = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(assignment["duedate"]))
+                lines += [
+                    "BEGIN:VEVENT",
+                    f"UID:{assignment['id']}@{host}",
+                    f"SUMMARY:{assignment['name']} is due",
+                    "DESCRIPTION:",
+                    "CLASS:PUBLIC",
+                    f"DTSTAMP:{due}",
+                    f"DTSTART:{due}",
+                    f"DTEND:{due}",
+                    f"CATEGORIES:C{course['id']}",
+                    f"URL:{self.base_url}/mod/assign/view.php?id={assignment['cmid']}",
+                    "END:VEVENT",
+                ]
+        lines.append("END:VCALENDAR")
+        return "\r\n".join(lines) + "\r\n"
+
+
+def _parse_indexed(params: Dict[str, str], name: str) -> List[str]:
+    """Collect courseids[0]=..&courseids[1]=.. style parameters in index order"""
+    pattern = re.compile(re.escape(name) + r"\[(\d+)\]$")
+    indexed: List[Tuple[int, str]] = []
+    for key, value in params.items():
+        match = pattern.match(key)
+        if match:
+            indexed.append((int(match.group(1)), value))
+    return [value for _, value in sorted(indexed)]
+
+
+def make_handler(data: FakeMoodleData, token: str, latency: float = 0.0):
+    """Build a request handler class bound to the given fixtures"""
+
+    class FakeWebServiceHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload: Any):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, errorcode: str, message: str):
+            # Moodle reports web service errors with HTTP 200 and an exception body
+            self._send_json({"exception": "moodle_exception", "errorcode": errorcode, "message": message})
+
+        def do_GET(self):
+            params = dict(parse_qsl(urlparse(self.path).query))
+            if urlparse(self.path).path == '/calendar/export_execute.php':
+                self._calendar_export(params)
+                return
+            self._dispatch(params)
+
+        def _calendar_export(self, params: Dict[str, str]):
+            if latency:
+                time.sleep(latency)
+            if params.get('authtoken') != token:
+                self.send_error(403)
+                return
+
+            body = data.calendar_export().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/calendar; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length).decode('utf-8')
+            params = dict(parse_qsl(urlparse(self.path).query))
+            params.update(parse_qsl(body))
+            self._dispatch(params)
+
+        def _dispatch(self, params: Dict[str, str]):
+            if urlparse(self.path).path != '/webservice/rest/server.php':
+                self.send_error(404)
+                return
+
+            if latency:
+                time.sleep(latency)
+
+            if params.get('wstoken') != token:
+                self._error('invalidtoken', 'Invalid token - token not found')
+                return
+
+            function = params.get('wsfunction')
+            if function == 'core_webservice_get_site_info':
+                self._send_json(data.site_info())
+            elif function == 'core_enrol_get_users_courses':
+                self._send_json(data.users_courses())
+            elif function == 'core_course_get_courses_by_field':
+                self._send_json(data.courses_by_field(params.get('field', ''), params.get('value', '')))
+            elif function == 'core_course_get_contents':
+                course_id = int(params.get('courseid', 0))
+                if course_id not in data.course_ids():
+                    self._error('invalidrecord', 'Can not find data record in database table course.')
+                    return
+                self._send_json(data.course_contents(course_id))
+            elif function == 'mod_assign_get_assignments':
+                course_ids = [int(c) for c in _parse_indexed(params, 'courseids')] or data.course_ids()
+                self._send_json(data.assignments(course_ids))
+            else:
+                self._error('invalidfunction', f'Function {function} does not exist')
+
+    return FakeWebServiceHandler
+
+
+def serve(
+    host: str = '127.0.0.1',
+    port: int = 0,
+    token: str = 'test-token',
+    courses: int = 5,
+    latency: float = 0.0,
+    background: bool = True
+) -> ThreadingHTTPServer:
+    """
+    Start the fake web service
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        token: Token clients must send as wstoken
+        courses: Number of enrolled courses to serve
+        latency: Artificial delay per request in seconds
+        background: Serve from a daemon thread and return immediately
+
+    Returns:
+        The running server; its base URL is http://host:server.server_port
+    """
+    server = ThreadingHTTPServer((host, port), None)
+    base_url = f"http://{host}:{server.server_port}"
+    server.RequestHandlerClass = make_handler(FakeMoodleData(base_url, courses), token, latency)
+
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--token', default='test-token')
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of delay per request')
+    args = parser.parse_args()
+
+    print(f"Fake Moodle web service on http://{args.host}:{args.port} (token: {args.token})")
+    serve(args.host, args.port, args.token, args.courses, args.latency, background=False)
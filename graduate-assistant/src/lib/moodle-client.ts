@@ -49,6 +49,9 @@ export interface MoodleSyncResponse {
   message: string
   courses_count: number
   assignments_count: number
+  /** Pass to syncChanges() to receive only what changed after this sync */
+  cursor?: string | null
+  incremental?: false
   data: {
     courses: MoodleCourseDetail[]
     assignments: MoodleAssignment[]
@@ -56,10 +59,88 @@ export interface MoodleSyncResponse {
   }
 }
 
+export interface MoodleChangeSet<T, R> {
+  added: T[]
+  changed: T[]
+  removed: R[]
+}
+
+export type MoodleActivityChange = MoodleCourseContent['activities'][number] & {
+  course_id: string
+  section_name: string
+}
+
+export interface MoodleIncrementalSyncResponse {
+  success: boolean
+  message: string
+  courses_count: number
+  assignments_count: number
+  cursor: string | null
+  incremental: true
+  data: {
+    courses: MoodleChangeSet<MoodleCourse, string>
+    activities: MoodleChangeSet<MoodleActivityChange, { course_id: string; url: string }>
+    assignments: MoodleChangeSet<MoodleAssignment, string>
+    synced_at: string
+  }
+}
+
+export interface MoodleReconciledEntity<T> {
+  id: string
+  /** Store with the record and send back in the next reconcile call */
+  hash: string
+  data: T
+}
+
+export interface MoodleReconcileResponse {
+  success: boolean
+  message: string
+  courses: MoodleReconciledEntity<MoodleCourseDetail>[]
+  assignments: MoodleReconciledEntity<MoodleAssignment>[]
+  deleted_courses: string[]
+  deleted_assignments: string[]
+  unchanged_courses: number
+  unchanged_assignments: number
+  synced_at: string | null
+}
+
+export type MoodleSyncStreamRecord =
+  | { type: 'course'; index: number; data: MoodleCourseDetail }
+  | { type: 'assignment'; data: MoodleAssignment }
+  | {
+      type: 'summary'
+      success: boolean
+      message: string
+      courses_count: number
+      assignments_count: number
+      synced_at: string
+      cursor?: string
+    }
+
+export interface MoodleSyncJobSubmitted {
+  job_id: string
+  status: string
+  status_url: string
+  result_url: string
+}
+
+export interface MoodleSyncJobStatus {
+  job_id: string
+  status: 'queued' | 'running' | 'succeeded' | 'failed'
+  phase: string
+  courses_done: number
+  courses_total: number
+  elapsed_seconds: number
+  created_at: string
+  error?: string | null
+}
+
 export interface MoodleLoginResponse {
   success: boolean
   message: string
+  /** Handle for reusing the Moodle login (X-Moodle-Session header / sync session_id) */
   session_id?: string
+  expires_at?: string
 }
 
 /**
@@ -148,16 +229,130 @@ export class MoodleClient {
   }
 
   /**
-   * Perform full sync of Moodle data
+   * Stream a full sync as NDJSON records
+   *
+   * Yields each course as soon as it has been scraped, then the assignments,
+   * then a summary record, so callers can persist data while scraping runs.
+   */
+  async *streamSync(credentials: MoodleCredentials): AsyncGenerator<MoodleSyncStreamRecord> {
+    const response = await fetch(`${this.baseUrl}/api/moodle/sync/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'X-API-Key': this.apiKey,
+      },
+      body: JSON.stringify(credentials),
+    })
+
+    if (!response.ok || !response.body) {
+      const error = await response.json().catch(() => ({ detail: 'Unknown error' }))
+      throw new Error(error.detail || `HTTP ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+
+    while (true) {
+      const { done, value } = await reader.read()
+      buffer += decoder.decode(value, { stream: !done })
+
+      let newline: number
+      while ((newline = buffer.indexOf('\n')) >= 0) {
+        const line = buffer.slice(0, newline).trim()
+        buffer = buffer.slice(newline + 1)
+        if (line) yield JSON.parse(line) as MoodleSyncStreamRecord
+      }
+
+      if (done) break
+    }
+  }
+
+  /**
+   * Sync only what changed since an earlier sync
+   *
+   * Returns the full dataset (incremental: false) when the cursor is unknown
+   * or expired, so callers must handle both shapes.
+   */
+  async syncChanges(
+    credentials: MoodleCredentials,
+    since: string
+  ): Promise<MoodleSyncResponse | MoodleIncrementalSyncResponse> {
+    return this.fetchWithAuth(`/api/moodle/sync?since=${encodeURIComponent(since)}`, {
+      method: 'POST',
+      body: JSON.stringify(credentials),
+    })
+  }
+
+  /**
+   * Get only the courses and assignments whose content hash differs from the stored ones
    *
-   * This operation may take several minutes depending on the number of courses.
+   * @param known moodleId -> hash maps of what the caller has stored
+   */
+  async reconcile(
+    credentials: MoodleCredentials,
+    known: { courses: Record<string, string>; assignments: Record<string, string> },
+    fresh: boolean = false
+  ): Promise<MoodleReconcileResponse> {
+    return this.fetchWithAuth(`/api/moodle/sync/reconcile${fresh ? '?fresh=1' : ''}`, {
+      method: 'POST',
+      body: JSON.stringify({
+        ...credentials,
+        known_courses: known.courses,
+        known_assignments: known.assignments,
+      }),
+    })
+  }
+
+  /**
+   * Start a background sync job
    */
-  async syncAll(credentials: MoodleCredentials): Promise<MoodleSyncResponse> {
-    return this.fetchWithAuth('/api/moodle/sync', {
+  async startSyncJob(credentials: MoodleCredentials): Promise<MoodleSyncJobSubmitted> {
+    return this.fetchWithAuth('/api/moodle/sync/jobs', {
       method: 'POST',
       body: JSON.stringify(credentials),
     })
   }
+
+  /**
+   * Get progress of a background sync job
+   */
+  async getSyncJobStatus(jobId: string): Promise<MoodleSyncJobStatus> {
+    return this.fetchWithAuth(`/api/moodle/sync/jobs/${jobId}`)
+  }
+
+  /**
+   * Get the result of a finished background sync job
+   */
+  async getSyncJobResult(jobId: string): Promise<MoodleSyncResponse> {
+    return this.fetchWithAuth(`/api/moodle/sync/jobs/${jobId}/result`)
+  }
+
+  /**
+   * Perform full sync of Moodle data
+   *
+   * This operation may take several minutes depending on the number of courses,
+   * so it runs as a background job that is polled instead of holding the
+   * connection open.
+   */
+  async syncAll(
+    credentials: MoodleCredentials,
+    onProgress?: (status: MoodleSyncJobStatus) => void,
+    pollIntervalMs: number = 2000
+  ): Promise<MoodleSyncResponse> {
+    const job = await this.startSyncJob(credentials)
+
+    while (true) {
+      const status = await this.getSyncJobStatus(job.job_id)
+      onProgress?.(status)
+
+      if (status.status === 'succeeded' || status.status === 'failed') {
+        return this.getSyncJobResult(job.job_id)
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, pollIntervalMs))
+    }
+  }
 }
 
 // Singleton instance
@@ -6,7 +6,12 @@
  */
 
 import { db } from '~/server/db'
-import { moodleClient, type MoodleSyncResponse } from '~/lib/moodle-client'
+import {
+  moodleClient,
+  type MoodleAssignment,
+  type MoodleCourseDetail,
+  type MoodleSyncResponse,
+} from '~/lib/moodle-client'
 
 export interface SyncResult {
   success: boolean
@@ -32,43 +37,11 @@ export class SyncService {
 
     for (const course of syncData.data.courses) {
       try {
-        // Check if course already exists
-        const existingCourse = await db.course.findFirst({
-          where: {
-            userId,
-            moodleId: course.id,
-          },
-        })
-
-        if (existingCourse) {
-          // Update existing course
-          await db.course.update({
-            where: { id: existingCourse.id },
-            data: {
-              name: course.name,
-              description: course.description || '',
-              moodleUrl: course.url,
-              lastSyncedAt: new Date(),
-            },
-          })
-          updated++
-        } else {
-          // Create new course
-          await db.course.create({
-            data: {
-              userId,
-              moodleId: course.id,
-              name: course.name,
-              description: course.description || '',
-              moodleUrl: course.url,
-              lastSyncedAt: new Date(),
-            },
-          })
+        if (await this.syncCourse(userId, course)) {
           created++
+        } else {
+          updated++
         }
-
-        // Sync course contents
-        await this.syncCourseContents(userId, course.id, course.contents)
       } catch (error) {
         console.error(`Error syncing course ${course.id}:`, error)
         errors.push(`Course ${course.name}: ${error instanceof Error ? error.message : 'Unknown error'}`)
@@ -78,6 +51,51 @@ export class SyncService {
     return { created, updated, errors }
   }
 
+  /**
+   * Create or update one course and its contents
+   *
+   * @returns true if the course was created, false if it was updated
+   */
+  private async syncCourse(userId: string, course: MoodleCourseDetail): Promise<boolean> {
+    // Check if course already exists
+    const existingCourse = await db.course.findFirst({
+      where: {
+        userId,
+        moodleId: course.id,
+      },
+    })
+
+    if (existingCourse) {
+      // Update existing course
+      await db.course.update({
+        where: { id: existingCourse.id },
+        data: {
+          name: course.name,
+          description: course.description || '',
+          moodleUrl: course.url,
+          lastSyncedAt: new Date(),
+        },
+      })
+    } else {
+      // Create new course
+      await db.course.create({
+        data: {
+          userId,
+          moodleId: course.id,
+          name: course.name,
+          description: course.description || '',
+          moodleUrl: course.url,
+          lastSyncedAt: new Date(),
+        },
+      })
+    }
+
+    // Sync course contents
+    await this.syncCourseContents(userId, course.id, course.contents)
+
+    return !existingCourse
+  }
+
   /**
    * Sync course contents
    */
@@ -135,67 +153,10 @@ export class SyncService {
 
     for (const assignment of syncData.data.assignments) {
       try {
-        // Find the course this assignment belongs to
-        const course = await db.course.findFirst({
-          where: {
-            userId,
-            moodleId: assignment.course_id,
-          },
-        })
-
-        if (!course) {
-          errors.push(`Assignment ${assignment.name}: Course not found`)
-          continue
-        }
-
-        // Parse due date
-        let dueDate: Date | null = null
-        if (assignment.due_date) {
-          try {
-            dueDate = new Date(assignment.due_date)
-          } catch (e) {
-            console.error('Error parsing due date:', assignment.due_date)
-          }
-        }
-
-        // Determine status
-        const status = assignment.status || 'pending'
-
-        // Check if assignment already exists
-        const existingAssignment = await db.assignment.findFirst({
-          where: {
-            userId,
-            courseId: course.id,
-            title: assignment.name,
-          },
-        })
-
-        if (existingAssignment) {
-          // Update existing assignment
-          await db.assignment.update({
-            where: { id: existingAssignment.id },
-            data: {
-              description: assignment.description || '',
-              dueDate,
-              status,
-              moodleUrl: assignment.url,
-            },
-          })
-          updated++
-        } else {
-          // Create new assignment
-          await db.assignment.create({
-            data: {
-              userId,
-              courseId: course.id,
-              title: assignment.name,
-              description: assignment.description || '',
-              dueDate,
-              status,
-              moodleUrl: assignment.url,
-            },
-          })
+        if (await this.syncAssignment(userId, assignment)) {
           created++
+        } else {
+          updated++
         }
       } catch (error) {
         console.error(`Error syncing assignment ${assignment.id}:`, error)
@@ -206,6 +167,75 @@ export class SyncService {
     return { created, updated, errors }
   }
 
+  /**
+   * Create or update one assignment
+   *
+   * @returns true if the assignment was created, false if it was updated
+   */
+  private async syncAssignment(userId: string, assignment: MoodleAssignment): Promise<boolean> {
+    // Find the course this assignment belongs to
+    const course = await db.course.findFirst({
+      where: {
+        userId,
+        moodleId: assignment.course_id,
+      },
+    })
+
+    if (!course) {
+      throw new Error('Course not found')
+    }
+
+    // Parse due date
+    let dueDate: Date | null = null
+    if (assignment.due_date) {
+      try {
+        dueDate = new Date(assignment.due_date)
+      } catch (e) {
+        console.error('Error parsing due date:', assignment.due_date)
+      }
+    }
+
+    // Determine status
+    const status = assignment.status || 'pending'
+
+    // Check if assignment already exists
+    const existingAssignment = await db.assignment.findFirst({
+      where: {
+        userId,
+        courseId: course.id,
+        title: assignment.name,
+      },
+    })
+
+    if (existingAssignment) {
+      // Update existing assignment
+      await db.assignment.update({
+        where: { id: existingAssignment.id },
+        data: {
+          description: assignment.description || '',
+          dueDate,
+          status,
+          moodleUrl: assignment.url,
+        },
+      })
+      return false
+    }
+
+    // Create new assignment
+    await db.assignment.create({
+      data: {
+        userId,
+        courseId: course.id,
+        title: assignment.name,
+        description: assignment.description || '',
+        dueDate,
+        status,
+        moodleUrl: assignment.url,
+      },
+    })
+    return true
+  }
+
   /**
    * Perform full sync from Moodle
    */
@@ -281,6 +311,78 @@ export class SyncService {
     }
   }
 
+  /**
+   * Perform full sync from Moodle, writing each record as it is streamed
+   *
+   * Courses are persisted while the Moodle service is still scraping the
+   * remaining ones, and neither side holds the full dataset in memory.
+   */
+  async performStreamingSync(
+    userId: string,
+    credentials: { username: string; password: string; baseUrl?: string }
+  ): Promise<SyncResult> {
+    const result: SyncResult = {
+      success: false,
+      message: 'Sync stream ended without a summary',
+      coursesCreated: 0,
+      coursesUpdated: 0,
+      assignmentsCreated: 0,
+      assignmentsUpdated: 0,
+      errors: [],
+    }
+
+    try {
+      for await (const record of moodleClient.streamSync(credentials)) {
+        if (record.type === 'course') {
+          try {
+            if (await this.syncCourse(userId, record.data)) {
+              result.coursesCreated++
+            } else {
+              result.coursesUpdated++
+            }
+          } catch (error) {
+            console.error(`Error syncing course ${record.data.id}:`, error)
+            result.errors.push(`Course ${record.data.name}: ${error instanceof Error ? error.message : 'Unknown error'}`)
+          }
+        } else if (record.type === 'assignment') {
+          try {
+            if (await this.syncAssignment(userId, record.data)) {
+              result.assignmentsCreated++
+            } else {
+              result.assignmentsUpdated++
+            }
+          } catch (error) {
+            console.error(`Error syncing assignment ${record.data.id}:`, error)
+            result.errors.push(`Assignment ${record.data.name}: ${error instanceof Error ? error.message : 'Unknown error'}`)
+          }
+        } else {
+          result.success = record.success
+          result.message = record.success
+            ? `Synced ${record.courses_count} courses and ${record.assignments_count} assignments`
+            : record.message
+          if (!record.success) result.errors.push(record.message)
+        }
+      }
+    } catch (error) {
+      console.error('Sync error:', error)
+      result.success = false
+      result.message = error instanceof Error ? error.message : 'Sync failed'
+      result.errors.push(error instanceof Error ? error.message : 'Unknown error')
+    }
+
+    await db.syncLog.create({
+      data: {
+        userId,
+        source: 'moodle',
+        status: !result.success ? 'error' : result.errors.length === 0 ? 'success' : 'partial',
+        itemsSynced: result.coursesCreated + result.coursesUpdated + result.assignmentsCreated + result.assignmentsUpdated,
+        errors: result.errors,
+      },
+    })
+
+    return result
+  }
+
   /**
    * Get recent sync logs
    */